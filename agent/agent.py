@@ -1,19 +1,38 @@
 import os
+import json
 import asyncio
-import contextlib
-from agents import Agent, Runner, function_tool, set_default_openai_client
+import contextvars
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from agents import Agent, Runner, RunContextWrapper, function_tool, set_default_openai_client
 from agents.agent import ModelSettings
 from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
 from openai import AsyncOpenAI
-from agents.mcp import MCPServerSse
+from agents.mcp import MCPServer, MCPServerSse
 from mcp.types import CallToolResult
 from typing import Any
 from utils.logger import InteractionLogger
 from utils.config import Config
+from utils.skill_registry import get_skill_registry
+from utils.skill_index import SkillIndex
+from utils.metrics import get_metrics
 from agents.models.chatcmpl_converter import Converter
-from agents.memory import SQLiteSession
+from agent.mcp_pool import MCPConnectionPool
+from agent.inprocess_mcp import InProcessMCPServer
+from agent.health import MCPHealthProber
+from agent.tool_cache import ToolResultCache
+from agent.session_pool import SessionCheckpoint, SessionPool, checkpoint, rollback
+from agent.history import CompactingSession, HistoryCompactor
+from agent.workflow import WorkflowEngine, match_intent, missing_slots, parse_tool_output
+from agent.speculation import SpeculativeExecutor, predict_followups
+from agent.batch import INDUSTRY_BATCH, BatchSpec, has_error_records, merge_records, parse_batch_records
+from agent.answer_cache import CACHEABLE_OUTCOMES, AnswerCache, EntityExtractor, record_answer, record_outcome, record_tool_use
+from agent.retry import CircuitBreaker, CircuitOpenError, DeadlineExceeded, RetryPolicy, call_with_retry, is_transient, request_deadline
+
+class ToolCallLoggingMixin:
+    """Logs every MCP tool call and its result, independent of the transport."""
 
-class LoggingMCPServerSse(MCPServerSse):
     def __init__(self, logger: InteractionLogger, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.logger = logger
@@ -36,6 +55,14 @@ class LoggingMCPServerSse(MCPServerSse):
             self.logger.log_interaction("mcp_server", "agent", "error", f"Tool {tool_name} failed: {e}")
             raise e
 
+
+class LoggingMCPServerSse(ToolCallLoggingMixin, MCPServerSse):
+    pass
+
+
+class LoggingInProcessMCPServer(ToolCallLoggingMixin, InProcessMCPServer):
+    pass
+
 # Monkey-patch Converter.items_to_messages to fix missing content in assistant messages
 # This is required for Qwen/DashScope compatibility which demands non-null content
 import agents.models.openai_chatcompletions as chat_mod
@@ -44,8 +71,9 @@ from agents.models.chatcmpl_converter import Converter
 original_items_to_messages = Converter.items_to_messages
 
 @classmethod
-def patched_items_to_messages(cls, items, model=None, preserve_thinking_blocks=False, preserve_tool_output_all_content=False):
-    messages = original_items_to_messages(items, model, preserve_thinking_blocks, preserve_tool_output_all_content)
+def patched_items_to_messages(cls, items, *args, **kwargs):
+    # 透传所有参数，兼容不同版本 SDK 新增的关键字参数
+    messages = original_items_to_messages(items, *args, **kwargs)
     for msg in messages:
         if msg.get("role") == "assistant":
             if "tool_calls" in msg and msg.get("tool_calls"):
@@ -58,23 +86,176 @@ Converter.items_to_messages = patched_items_to_messages
 if hasattr(chat_mod, 'Converter'):
     chat_mod.Converter.items_to_messages = patched_items_to_messages
 
+DEFAULT_SESSION_ID = "industry_analyst_session"
+
+_metrics = get_metrics()
+QUERY_SECONDS = _metrics.histogram("agent_query_seconds", "End-to-end latency of one user query")
+QUERIES = _metrics.counter("agent_queries_total", "User queries by execution path and outcome")
+WARMUP_SECONDS = _metrics.gauge("agent_warmup_seconds", "Duration of each startup warm-up step")
+# 预热中执行的固定问题不计入用户查询指标
+_warmup_query: contextvars.ContextVar[bool] = contextvars.ContextVar("warmup_query", default=False)
+RETRIES = _metrics.counter("agent_retries_total", "Model-loop retries and auto-healing resets")
+MODEL_SECONDS = _metrics.histogram("agent_model_call_seconds", "Latency of one model call (one agent turn)")
+MODEL_FIRST_TOKEN_SECONDS = _metrics.histogram("agent_model_first_event_seconds", "Time to the first streamed model event")
+MODEL_ERRORS = _metrics.counter("agent_model_errors_total", "Failed model calls")
+MODEL_TOKENS = _metrics.counter("agent_model_tokens_total", "Model tokens by direction (input/output)")
+TOOL_SECONDS = _metrics.histogram("agent_mcp_tool_seconds", "Latency of call_mcp_tool, including cache and speculation hits")
+TOOL_CALLS = _metrics.counter("agent_mcp_tool_calls_total", "MCP tool calls by where the result came from")
+TOOL_ERRORS = _metrics.counter("agent_mcp_tool_errors_total", "Failed MCP tool calls")
+
+
+def _record_usage(usage: Any, model: str):
+    if usage is None:
+        return
+    MODEL_TOKENS.inc(getattr(usage, "input_tokens", 0) or 0, model=model, direction="input")
+    MODEL_TOKENS.inc(getattr(usage, "output_tokens", 0) or 0, model=model, direction="output")
+
+
+class MeteredChatCompletionsModel(OpenAIChatCompletionsModel):
+    """记录每次模型调用的耗时、首个流式事件延迟与 token 用量。
+
+    设置了 `retry_policy` 时，每次模型调用在请求时限内按策略重试，并经 `breaker` 熔断；
+    流式调用只在收到第一个事件之前重试。
+    """
+
+    def __init__(self, *args, retry_policy: RetryPolicy | None = None, breaker: CircuitBreaker | None = None,
+                 retry_hooks: dict | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+        self.retry_hooks = retry_hooks or {}
+
+    async def get_response(self, *args, **kwargs):
+        if self.retry_policy is None:
+            return await self._metered_response(*args, **kwargs)
+        return await call_with_retry(lambda: self._metered_response(*args, **kwargs), self.retry_policy, self.breaker, **self.retry_hooks)
+
+    async def stream_response(self, *args, **kwargs):
+        if self.retry_policy is None:
+            async for event in self._metered_stream(*args, **kwargs):
+                yield event
+            return
+
+        stream = None
+
+        async def open_stream():
+            nonlocal stream
+            stream = self._metered_stream(*args, **kwargs)
+            try:
+                return await stream.__anext__()
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        try:
+            # 流需在当前任务中迭代，因此不以 wait_for 包装，时限只在两次尝试之间检查
+            first = await call_with_retry(open_stream, self.retry_policy, self.breaker, bound_to_deadline=False, **self.retry_hooks)
+        except StopAsyncIteration:
+            return
+        yield first
+        async for event in stream:
+            yield event
+
+    async def _metered_response(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await super().get_response(*args, **kwargs)
+        except Exception:
+            MODEL_ERRORS.inc(model=self.model)
+            raise
+        finally:
+            MODEL_SECONDS.observe(time.perf_counter() - start, model=self.model, mode="blocking")
+        _record_usage(getattr(response, "usage", None), self.model)
+        return response
+
+    async def _metered_stream(self, *args, **kwargs):
+        start = time.perf_counter()
+        first = True
+        try:
+            async for event in super().stream_response(*args, **kwargs):
+                if first:
+                    MODEL_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, model=self.model)
+                    first = False
+                if getattr(event, "type", "") == "response.completed":
+                    _record_usage(getattr(event.response, "usage", None), self.model)
+                yield event
+        except Exception:
+            MODEL_ERRORS.inc(model=self.model)
+            raise
+        finally:
+            MODEL_SECONDS.observe(time.perf_counter() - start, model=self.model, mode="stream")
+
+
+@dataclass
+class QueryContext:
+    """单次查询的运行上下文，通过 `RunContextWrapper` 传给工具和动态指令。"""
+    session_id: str
+    skills_prompt: str | None = None
+    # 用户原始问题，用于按相关性挑选注入提示词的技能
+    query: str | None = None
+    # 技能工作流执行完毕后，撰写报告所需的指令（含已获取的数据）
+    report_instructions: str | None = None
+
+
 class IndustryAgent:
     def __init__(self, initial_skills_system_prompt: str, dynamic_skills_dict: dict, auto_reset: bool = True):
         self.config = Config()
         # ... (OpenAI client configuration stays same)
+        self.logger = InteractionLogger(self.config.LOG_PATH)
+        # 重试策略与按后端划分的熔断器（模型端点、每个 MCP 服务器）
+        self.retry_policy = RetryPolicy(
+            max_attempts=self.config.RETRY_MAX_ATTEMPTS,
+            base_delay=self.config.RETRY_BASE_DELAY,
+            max_delay=self.config.RETRY_MAX_DELAY,
+        )
+        self.breakers: dict[str, CircuitBreaker] = {}
+
         openai_client = AsyncOpenAI(
             api_key=self.config.OPENAI_API_KEY,
             base_url=self.config.OPENAI_BASE_URL,
+            # 由 retry_policy 统一重试，避免客户端内置重试绕过时限和熔断
+            max_retries=0,
         )
         set_default_openai_client(openai_client)
-        openai_model = OpenAIChatCompletionsModel(
+        self.openai_client = openai_client
+        openai_model = MeteredChatCompletionsModel(
             model=self.config.MODEL_NAME,
             openai_client=openai_client,
+            retry_policy=self.retry_policy,
+            breaker=self._breaker("openai"),
+            retry_hooks=self._retry_hooks("openai"),
         )
+        self.openai_model = openai_model
         
-        self.logger = InteractionLogger(self.config.LOG_PATH)
-        self.mcp_servers = []
-        self.loaded_skills = set()
+        self.mcp_pool = None
+        self.tool_cache = ToolResultCache(
+            max_entries=self.config.MCP_CACHE_MAX_ENTRIES if self.config.MCP_CACHE_ENABLED else 0,
+            default_ttl=self.config.MCP_CACHE_DEFAULT_TTL,
+            tool_ttls=self.config.MCP_CACHE_TOOL_TTLS,
+            exclude_tools=self.config.MCP_CACHE_EXCLUDE,
+        )
+        # 投机执行：触发工具返回后提前发起技能工作流预测的后续调用
+        self.speculator = SpeculativeExecutor(
+            logger=self.logger,
+            invoke=self._invoke_mcp_tool,
+            ttl=self.config.SPECULATION_TTL,
+            max_pending=self.config.SPECULATION_MAX_PENDING,
+        )
+        # 查询级回答缓存：重复的问题（按规范化文本与实体匹配）直接返回上次的回答
+        self.answer_cache = AnswerCache(
+            max_entries=self.config.ANSWER_CACHE_MAX_ENTRIES if self.config.ANSWER_CACHE_ENABLED else 0,
+            default_ttl=self.config.ANSWER_CACHE_TTL,
+        )
+        self._entity_extractor: tuple[tuple, EntityExtractor] | None = None
+        # 启动预热进度：state 为 idle/running/done，steps 记录每一步的耗时或错误
+        self.warmup_status: dict = {"state": "idle", "steps": {}}
+        # 批量工具：按单条记录查缓存，未命中的部分分片并发请求后合并
+        self.batch_specs = {(spec.server, spec.batch_tool): spec for spec in [INDUSTRY_BATCH]}
+        # 每个会话各自的已加载技能
+        self._loaded_skills: dict[str, set] = {}
+        self.skill_registry = get_skill_registry(self.config.SKILLS_PATH)
+        # 技能目录 -> BM25 索引；技能列表内容不变时复用同一个索引
+        self._skill_indexes: OrderedDict[str, SkillIndex] = OrderedDict()
         
         # 1. Initialize Persistent Session with Auto-Cleanup
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -98,14 +279,19 @@ class IndustryAgent:
             except Exception as e:
                 print(f"WARNING: Failed to auto-reset session database: {e}")
                 # 尝试使用一个新的文件名作为 fallback，避免启动失败
-                import time
                 self.db_path = f"{self.db_path}_{int(time.time())}"
                 print(f"WARNING: Fallback to new database path: {self.db_path}")
                 
-        self.session = SQLiteSession(
-            session_id="industry_analyst_session",
-            db_path=self.db_path
-        )
+        # 所有会话共用一个数据库文件，按 session_id 隔离；句柄由会话池按 LRU 复用
+        # 句柄被淘汰时一并释放该会话的已加载技能记录，避免随会话数无限增长
+        self.session_pool = SessionPool(self.db_path, max_sessions=self.config.SESSION_POOL_SIZE,
+                                        on_evict=lambda session_id: self._loaded_skills.pop(session_id, None))
+        # 送入模型前压缩历史：近几轮原样保留，更早的工具输出压缩为摘要，并限制总 token 数
+        self.history_compactor = HistoryCompactor(
+            keep_turns=self.config.HISTORY_KEEP_TURNS,
+            summary_chars=self.config.HISTORY_SUMMARY_CHARS,
+            token_budget=self.config.HISTORY_TOKEN_BUDGET,
+        ) if self.config.HISTORY_COMPACTION_ENABLED else None
         
         # 2. Initialize MCP Servers
         self._init_mcp_servers()
@@ -116,7 +302,7 @@ class IndustryAgent:
 
         # 4. Define Tools (load_skill, mcp_call)
         @function_tool
-        def load_skill(skill_name: str) -> str:
+        def load_skill(ctx: RunContextWrapper[QueryContext], skill_name: str) -> str:
             """
             加载特定产业或领域的详细操作指南。
             当用户询问某个行业（如旅游、金融、IT等）时，必须首先调用此工具。
@@ -124,22 +310,20 @@ class IndustryAgent:
             self.logger.log_interaction("agent", "skill_manager", f"loading_skill: {skill_name}")
             print(f"DEBUG: load_skill called with {skill_name}")
             
-            # 无论是否已加载，都读取最新的技能内容以刷新上下文指令
-            skill_path = os.path.join(self.config.SKILLS_PATH, skill_name, "SKILL.md")
-            content = ""
-            if os.path.exists(skill_path):
-                with open(skill_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-            else:
+            # 无论是否已加载，都返回最新的技能内容以刷新上下文指令（注册表仅在文件变更时重新读取）
+            skill = self.skill_registry.get(skill_name)
+            if skill is None:
                 return f"未找到技能 '{skill_name}'。"
+            content = skill.content
 
-            if skill_name in self.loaded_skills:
+            loaded_skills = self.get_loaded_skills(ctx.context.session_id)
+            if skill_name in loaded_skills:
                 # 即使已加载，也要返回核心指令，防止模型遗忘
                 msg = f"技能 '{skill_name}' 已加载。为了确保执行准确性，再次显示指南内容：\n\n{content}\n\n系统提示：请严格遵循指南中的逻辑分支！"
                 self.logger.log_interaction("skill_manager", "agent", "skill_already_loaded", f"refreshed content for {skill_name}")
                 return msg
                 
-            self.loaded_skills.add(skill_name)
+            loaded_skills.add(skill_name)
             self.logger.log_interaction("skill_manager", "agent", f"loaded content for {skill_name} ({len(content)} chars)")
             return f"已加载 '{skill_name}' 技能指南：\n\n{content}\n\n系统提示：【严重警告】必须立即调用 'mcp_call' 工具获取数据！在未获取到真实数据前，严禁向用户输出任何分析结论或借口！"
 
@@ -154,59 +338,25 @@ class IndustryAgent:
                 tool_name: 技能指南中指定的工具名称。
                 arguments: 工具参数 (Dict)。
             """
-            import json
             print(f"DEBUG: mcp_call -> server: {server_name}, tool: {tool_name}, args: {arguments}")
-            target_server = next((s for s in self.mcp_servers if s.name == server_name), None)
-            if not target_server:
-                # 统一抛出异常，触发外部的自愈逻辑
-                raise ValueError(f"CRITICAL_MCP_ERROR: 未找到或未连接 MCP 服务器 '{server_name}'。请检查技能指南中的 server_name 是否正确。")
-            
-            try:
-                if isinstance(arguments, dict):
-                    args = arguments
-                elif isinstance(arguments, str):
-                    args = json.loads(arguments) if arguments else {}
-                else:
-                    args = arguments if arguments else {}
-                
-                # 参数自适应修正：处理 deep_analysis 工具参数名不一致问题
-                if tool_name == "deep_analysis":
-                    if "industry_data" in args and "data" not in args:
-                        print(f"DEBUG: Auto-correcting deep_analysis param: industry_data -> data")
-                        args = {"data": args["industry_data"]}
-                    elif "annual_output" in args and "data" not in args:
-                        # 如果模型直接传了 annual_output 没包在 data 里
-                        print(f"DEBUG: Auto-wrapping deep_analysis param: annual_output -> data")
-                        args = {"data": args}
-                    
-                result = await target_server.call_tool(tool_name, args)
-                content_list = []
-                for content in result.content:
-                    if hasattr(content, 'text'):
-                        content_list.append(content.text)
-                    else:
-                        content_list.append(str(content))
-                
-                output = "\n".join(content_list)
-                
-                # 核心改进：如果 MCP 返回 Unknown tool，直接抛出异常触发自愈
-                if "Unknown tool" in output:
-                    raise ValueError(f"CRITICAL_MCP_ERROR: {output}")
+            output = await self.call_mcp_tool(server_name, tool_name, arguments)
+            if self.config.SPECULATION_ENABLED:
+                self._speculate_followups(server_name, tool_name, output)
 
-                # 针对 industry_query 的特殊增强提示，解决 Agent 拿到数据后不进行深度分析的问题
-                system_hint = ""
-                if server_name == "industry_query":
-                    system_hint = "\n\n【系统强制指令】\n1. 立即检查 'annual_output' 数值。\n2. 逻辑分支判断：\n   - 若数值 > 1000：**CRITICAL**：必须立即调用 'deep_analysis' 工具！\n   - 参数规范：`arguments={'data': {'annual_output': [具体产值]}}`（注意必须包含 'data' 键）。\n   **不要**输出“接下来我将...”、“稍候...”等文字。\n   **直接**输出工具调用 JSON。\n   - 若数值 <= 1000：仅输出建议。"
+            # 针对 industry_query 的特殊增强提示，解决 Agent 拿到数据后不进行深度分析的问题
+            system_hint = ""
+            if server_name == "industry_query":
+                system_hint = "\n\n【系统强制指令】\n1. 立即检查 'annual_output' 数值。\n2. 逻辑分支判断：\n   - 若数值 > 1000：**CRITICAL**：必须立即调用 'deep_analysis' 工具！\n   - 参数规范：`arguments={'data': {'annual_output': [具体产值]}}`（注意必须包含 'data' 键）。\n   **不要**输出“接下来我将...”、“稍候...”等文字。\n   **直接**输出工具调用 JSON。\n   - 若数值 <= 1000：仅输出建议。"
 
-                return f"【工具调用成功】从 {server_name} 获取到的原始数据如下，请根据手册逻辑进行判断处理：\n{output}{system_hint}"
-            except Exception as e:
-                # 确保异常向上传递，而不是被包装成普通的错误消息返回给模型
-                raise e
+            return f"【工具调用成功】从 {server_name} 获取到的原始数据如下，请根据手册逻辑进行判断处理：\n{output}{system_hint}"
         
         # 5. Initialize Persistent Agent
-        self.agent = Agent(
-            name="IndustryAnalyst",
-            instructions=f"""你是一个专业的产业分析助手。你的唯一目标是利用工具获取真实数据并生成报告。
+        # 指令按查询动态生成，使同一个 Agent 定义可以服务技能列表不同的多个会话
+        def instructions(ctx: RunContextWrapper[QueryContext], agent: Agent) -> str:
+            skills_prompt = ctx.context.skills_prompt if ctx.context and ctx.context.skills_prompt else self.skills_system_prompt
+            if self.config.SKILL_RETRIEVAL_ENABLED and ctx.context and ctx.context.query:
+                skills_prompt = self._select_skills_prompt(skills_prompt, ctx.context.query, ctx.context.session_id)
+            return f"""你是一个专业的产业分析助手。你的唯一目标是利用工具获取真实数据并生成报告。
 
 ## 核心法则
 1. **工具优先**: 遇到任何问题，**第一步永远是调用工具**。在没有工具返回的数据前，**严禁**向用户发送任何分析性文字。
@@ -227,12 +377,31 @@ class IndustryAgent:
 - 你的输出应该主要是工具调用（Tool Calls），直到最后一步才是给用户的文本。
 
 ## 可用技能列表:
-{self.skills_system_prompt}
-            """,
+{skills_prompt}
+            """
+
+        self.agent = Agent(
+            name="IndustryAnalyst",
+            instructions=instructions,
             tools=[load_skill, mcp_call],
             model=openai_model
         )
 
+        # 6. Workflow mode: 技能声明了工作流时直接执行工具链，模型只负责意图补全和撰写报告
+        self.workflow_engine = WorkflowEngine(self.call_mcp_tool)
+        self.intent_agent = Agent(
+            name="IntentExtractor",
+            instructions="你负责从用户问题中抽取结构化参数。只输出一个 JSON 对象，不要输出任何其他文字；无法确定的字段填 null。",
+            model=openai_model
+        )
+        self.report_agent = Agent(
+            name="IndustryReporter",
+            instructions=lambda ctx, agent: ctx.context.report_instructions or "",
+            model=openai_model
+        )
+
+        _metrics.add_collector(self._collect_metrics)
+
         self.logger.log_interaction("system", "agent", "initialized", "IndustryAnalyst initialized with skills (dynamic MCP mode)")
 
     def update_skills(self, new_skills_prompt: str, new_dynamic_skills: dict):
@@ -240,102 +409,666 @@ class IndustryAgent:
         self.skills_system_prompt = new_skills_prompt
         self.dynamic_skills_dict = new_dynamic_skills
         self.logger.log_interaction("agent", "system", "skills_updated", f"Loaded {len(new_dynamic_skills)} dynamic skills")
+        self.answer_cache.invalidate()
+
+    def invalidate_data(self, server_name: str | None = None):
+        """数据源更新后调用：清除该服务器（不传时为全部）的工具结果缓存和依赖它的回答缓存。"""
+        self.tool_cache.invalidate(server_name)
+        removed = self.answer_cache.invalidate(server_name)
+        self.logger.log_interaction("agent", "answer_cache", "invalidated", f"server: {server_name or 'all'}, {removed} answers")
+
+    async def call_mcp_tool(self, server_name: str, tool_name: str, arguments: Any) -> str:
+        """经连接池与结果缓存调用 MCP 工具，返回工具输出的原始文本。
+
+        `mcp_call` 工具与技能工作流共用此入口，参数修正、缓存、日志和指标行为保持一致。
+        """
+        start = time.perf_counter()
+        record_tool_use(server_name, tool_name)
+        try:
+            source, output = await self._dispatch_mcp_tool(server_name, tool_name, arguments)
+        except Exception:
+            TOOL_ERRORS.inc(server=server_name, tool=tool_name)
+            raise
+        finally:
+            TOOL_SECONDS.observe(time.perf_counter() - start, server=server_name, tool=tool_name)
+        TOOL_CALLS.inc(server=server_name, tool=tool_name, source=source)
+        return output
+
+    async def _dispatch_mcp_tool(self, server_name: str, tool_name: str, arguments: Any) -> tuple[str, str]:
+        """规范化参数后依次尝试批量合并、缓存、投机结果和实际调用，返回 (结果来源, 输出)。"""
+        if server_name not in self.mcp_pool.server_names:
+            # 统一抛出异常，触发外部的自愈逻辑
+            raise ValueError(f"CRITICAL_MCP_ERROR: 未找到或未连接 MCP 服务器 '{server_name}'。请检查技能指南中的 server_name 是否正确。")
+        
+        if isinstance(arguments, dict):
+            args = arguments
+        elif isinstance(arguments, str):
+            args = json.loads(arguments) if arguments else {}
+        else:
+            args = arguments if arguments else {}
+        
+        # 参数自适应修正：处理 deep_analysis 工具参数名不一致问题
+        if tool_name == "deep_analysis":
+            if "industry_data" in args and "data" not in args:
+                print(f"DEBUG: Auto-correcting deep_analysis param: industry_data -> data")
+                args = {"data": args["industry_data"]}
+            elif "annual_output" in args and "data" not in args:
+                # 如果模型直接传了 annual_output 没包在 data 里
+                print(f"DEBUG: Auto-wrapping deep_analysis param: annual_output -> data")
+                args = {"data": args}
+
+        batch_spec = self.batch_specs.get((server_name, tool_name))
+        if batch_spec is not None and isinstance(args, dict):
+            return "batch", await self._call_batch(batch_spec, args)
+
+        # 参数规范化之后再查缓存，保证等价调用命中同一条记录
+        output = self.tool_cache.get(server_name, tool_name, args)
+        if output is not None:
+            self.logger.log_interaction("agent", "tool_cache", f"cache_hit: {server_name}.{tool_name}", f"arguments: {args}")
+            return "cache", output
+
+        if self.config.MCP_FAIL_FAST and not self.health.is_up(server_name):
+            # 健康检查已判定离线：立即失败，不再等待连接超时
+            raise ConnectionError(f"MCP 服务器 '{server_name}' 当前不可用（{self.health.last_error(server_name)}），请稍后重试。")
+
+        speculative = self.speculator.take(server_name, tool_name, args)
+        if speculative is not None:
+            try:
+                return "speculative", await speculative
+            except Exception as e:
+                # 投机调用失败时按正常路径重试一次，错误由正常调用抛出
+                self.logger.log_interaction("agent", "speculation", "error", f"{server_name}.{tool_name} failed speculatively ({e}), calling again")
+
+        return "remote", await self._invoke_mcp_tool(server_name, tool_name, args)
+
+    async def _invoke_mcp_tool(self, server_name: str, tool_name: str, args: dict) -> str:
+        """经连接池实际调用 MCP 工具（参数已规范化），成功的结果写入缓存。
+
+        连接失败和超时在请求时限内按重试策略重试；该服务器熔断期间直接失败。
+        """
+        result = await call_with_retry(
+            lambda: self._call_pooled_tool(server_name, tool_name, args),
+            self.retry_policy,
+            self._breaker(f"mcp:{server_name}"),
+            **self._retry_hooks(f"mcp:{server_name}"),
+        )
+        content_list = []
+        for content in result.content:
+            if hasattr(content, 'text'):
+                content_list.append(content.text)
+            else:
+                content_list.append(str(content))
+
+        output = "\n".join(content_list)
+
+        # 核心改进：如果 MCP 返回 Unknown tool，直接抛出异常触发自愈
+        if "Unknown tool" in output:
+            raise ValueError(f"CRITICAL_MCP_ERROR: {output}")
+
+        # mcp 1.x 为 isError，2.x 为 is_error
+        is_error = result.isError if hasattr(result, "isError") else getattr(result, "is_error", False)
+        if not is_error:
+            self.tool_cache.put(server_name, tool_name, args, output)
+
+        return output
+
+    async def _call_pooled_tool(self, server_name: str, tool_name: str, args: dict):
+        # 从连接池获取长连接，避免每次查询重新握手
+        target_server = await self.mcp_pool.get(server_name)
+        try:
+            return await target_server.call_tool(tool_name, args)
+        except Exception as e:
+            # 只有传输层异常才交给连接池在后台重连（重试时会等待新连接）；工具自身的错误不影响连接
+            if is_transient(e):
+                self.mcp_pool.mark_broken(server_name, str(e))
+            raise
+
+    async def _call_batch(self, spec: BatchSpec, args: dict) -> str:
+        """执行批量工具调用：逐条查缓存，缺失的记录分片并发请求，最后按请求顺序合并。
+
+        服务器未提供批量工具时，退化为并发调用单条工具。
+        """
+        items = spec.expand(args)
+        outputs = [self.tool_cache.get(spec.server, spec.single_tool, item) for item in items]
+        missing = [i for i, output in enumerate(outputs) if output is None]
+        if missing:
+            self.logger.log_interaction("agent", "batch", f"{spec.server}.{spec.batch_tool}", f"{len(items)} records, {len(missing)} to fetch")
+            await self.mcp_pool.get(spec.server)
+            tool_names = {tool.name for tool in self.mcp_pool.cached_tools(spec.server)}
+            if spec.batch_tool in tool_names:
+                chunk_values = list(dict.fromkeys(spec.single_to_chunk_value(items[i]) for i in missing))
+                batch_requests = spec.chunks(args, chunk_values, self.config.MCP_BATCH_MAX_SIZE)
+                results = await asyncio.gather(*(self._invoke_mcp_tool(spec.server, spec.batch_tool, request) for request in batch_requests))
+                fetched = {}
+                for request, output in zip(batch_requests, results):
+                    records = parse_batch_records(output)
+                    # 含错误记录的批次整批不缓存，避免错误结果在 TTL 内被当作成功数据复用
+                    cacheable = not has_error_records(records)
+                    for item, record in zip(spec.expand(request), records):
+                        record_output = json.dumps(record, ensure_ascii=False)
+                        # 拆成单条记录写入缓存，之后的单条查询也能命中
+                        if cacheable:
+                            self.tool_cache.put(spec.server, spec.single_tool, item, record_output)
+                        fetched[ToolResultCache.make_key(spec.server, spec.single_tool, item)] = record_output
+                for i in missing:
+                    outputs[i] = fetched.get(ToolResultCache.make_key(spec.server, spec.single_tool, items[i]))
+            else:
+                results = await asyncio.gather(*(self.call_mcp_tool(spec.server, spec.single_tool, items[i]) for i in missing))
+                for i, output in zip(missing, results):
+                    outputs[i] = output
+        return merge_records([parse_tool_output(output) for output in outputs if output is not None])
+
+    def _speculate_followups(self, server_name: str, tool_name: str, output: str):
+        """按技能工作流预测模型的下一次工具调用，并在后台提前发起。"""
+        workflows = [skill.workflow for skill in self.skill_registry.workflows().values()]
+        for next_server, next_tool, next_args in predict_followups(workflows, server_name, tool_name, output):
+            if next_server not in self.mcp_pool.server_names:
+                continue
+            if self.tool_cache.get(next_server, next_tool, next_args) is not None:
+                continue
+            self.speculator.speculate(next_server, next_tool, next_args)
+
+    async def _select_workflow(self, query: str):
+        """为查询挑选可直接执行的技能工作流，返回 (技能目录名, 技能, 槽位) 或 None。"""
+        candidates = []
+        for dir_name, skill in self.skill_registry.workflows().items():
+            applicable, slots = match_intent(skill.workflow, query)
+            if applicable:
+                candidates.append((len(slots), dir_name, skill, slots))
+        if not candidates:
+            return None
+        # 别名命中最多的工作流优先
+        _, dir_name, skill, slots = max(candidates, key=lambda c: c[0])
+
+        missing = missing_slots(skill.workflow, slots)
+        if missing:
+            slots.update(await self._extract_intent(query, skill.workflow, missing))
+            if missing_slots(skill.workflow, slots):
+                return None
+        return dir_name, skill, slots
+
+    async def _extract_intent(self, query: str, workflow: dict, slot_names: list[str]) -> dict:
+        """别名无法识别时，用一次模型调用补全缺失的槽位。"""
+        specs = workflow.get("intent", {})
+        fields = "\n".join(f"- {name}: {specs[name].get('description', '')}" for name in slot_names)
+        prompt = f"用户问题：{query}\n\n需要抽取的字段：\n{fields}"
+        result = await Runner.run(self.intent_agent, input=prompt, max_turns=1)
+        text = str(result.final_output).strip().strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+        try:
+            extracted = json.loads(text)
+        except ValueError:
+            self.logger.log_interaction("agent", "workflow", "intent_parse_failed", text[:200])
+            return {}
+        return {name: extracted.get(name) for name in slot_names if isinstance(extracted, dict) and extracted.get(name)}
+
+    def _build_report_instructions(self, skill, scope: dict) -> str:
+        workflow = skill.workflow
+        data_sections = []
+        for step in workflow.get("steps", []):
+            if step["id"] in scope["steps"]:
+                data = json.dumps(scope["steps"][step["id"]], ensure_ascii=False, indent=2)
+                data_sections.append(f"### {step['id']} ({step['server']}.{step['tool']})\n{data}")
+        return f"""你是一名资深产业经济分析师。系统已按技能「{skill.name}」的流程获取了全部所需数据，你不需要也不能再调用任何工具，请直接撰写给用户的最终回复。
+
+## 报告要求
+{workflow.get("report") or skill.body}
+
+## 已获取的数据
+{chr(10).join(data_sections)}
+"""
+
+    async def _workflow_events(self, query: str, session, context: QueryContext, stream: bool = False):
+        """执行匹配到的技能工作流并撰写报告，产出与 `process_query_stream` 相同格式的事件。
+
+        没有适用的工作流时不产出任何事件，调用方应回退到模型驱动的流程。
+        """
+        selected = await self._select_workflow(query)
+        if selected is None:
+            return
+        dir_name, skill, slots = selected
+        self.get_loaded_skills(context.session_id).add(dir_name)
+        self.logger.log_interaction("agent", "workflow", f"running workflow: {dir_name}", f"intent: {slots}")
+
+        scope = {"intent": slots}
+        async for event in self.workflow_engine.run(skill.workflow, scope):
+            yield event
+
+        context.report_instructions = self._build_report_instructions(skill, scope)
+        if stream:
+            result = Runner.run_streamed(self.report_agent, input=query, max_turns=1, session=session, context=context)
+            async for event in result.stream_events():
+                if event.type == "raw_response_event" and getattr(event.data, "type", "") == "response.output_text.delta" and event.data.delta:
+                    yield {"type": "delta", "text": event.data.delta}
+        else:
+            result = await Runner.run(self.report_agent, input=query, max_turns=1, session=session, context=context)
+        yield {"type": "final", "text": str(result.final_output)}
 
     def _init_mcp_servers(self):
-        """Initialize all configured MCP servers."""
+        """Initialize the pooled connections to all configured MCP servers."""
         server_configs = [
-            {"name": "industry_query", "url": self.config.MCP_TOURISM_QUERY_URL},
-            {"name": "deep_analysis", "url": self.config.MCP_DEEP_ANALYSIS_URL}
+            {"name": "industry_query", "url": self.config.MCP_TOURISM_QUERY_URL, "script": "mcp_servers/industry_query/server.py"},
+            {"name": "deep_analysis", "url": self.config.MCP_DEEP_ANALYSIS_URL, "script": "mcp_servers/deep_analysis/server.py"}
         ]
-        
-        for config in server_configs:
-            try:
-                server = LoggingMCPServerSse(
+        inprocess = self.config.MCP_TRANSPORT == "inprocess"
+
+        def create_server(config: dict) -> MCPServer:
+            if inprocess:
+                # 同机部署：经内存流直接挂载 FastMCP 应用，不经过 HTTP/SSE
+                return LoggingInProcessMCPServer(
                     logger=self.logger,
                     name=config["name"],
-                    params={"url": config["url"]}
+                    script=config["script"],
+                    cache_tools_list=True,
                 )
-                self.mcp_servers.append(server)
-            except Exception as e:
-                self.logger.log_interaction("agent", "system", "error", f"Failed to connect to MCP server {config['name']}: {e}")
-        
-        self.logger.log_interaction("agent", "mcp_servers", "connected", f"Connected to {len(self.mcp_servers)} MCP servers")
+            return LoggingMCPServerSse(
+                logger=self.logger,
+                name=config["name"],
+                params={"url": config["url"]},
+                cache_tools_list=True,
+            )
+
+        self.mcp_pool = MCPConnectionPool(
+            logger=self.logger,
+            server_configs=server_configs,
+            server_factory=create_server,
+            connect_timeout=self.config.MCP_CONNECT_TIMEOUT,
+        )
+        self.logger.log_interaction("agent", "mcp_servers", "pool_created", f"Registered {len(server_configs)} MCP servers in connection pool ({self.config.MCP_TRANSPORT} transport)")
+        # 进程级健康探测：经连接池发送 MCP ping，结果供界面和 mcp_call 快速失败使用
+        self.health = MCPHealthProber(
+            logger=self.logger,
+            pool=self.mcp_pool,
+            interval=self.config.HEALTH_PROBE_INTERVAL,
+            timeout=self.config.HEALTH_PROBE_TIMEOUT,
+            history_size=self.config.HEALTH_HISTORY_SIZE,
+        )
 
     def _load_skills_system_prompt(self) -> str:
-        """Read the AGENTS.md content."""
-        agents_file = os.path.join(self.config.SKILLS_PATH, "AGENTS.md")
-        if os.path.exists(agents_file):
-            with open(agents_file, "r", encoding="utf-8") as f:
-                return f.read()
+        """从技能注册表读取 AGENTS.md 中的技能块。"""
+        skills_xml = self.skill_registry.agents_md_skills_xml()
+        if skills_xml:
+            return f"<available_skills>\n{skills_xml}\n</available_skills>"
         return "No skills available."
 
+    def _skill_index(self, skills_prompt: str) -> SkillIndex:
+        index = self._skill_indexes.get(skills_prompt)
+        if index is None:
+            index = self._skill_indexes[skills_prompt] = SkillIndex.from_xml(skills_prompt)
+            while len(self._skill_indexes) > 32:
+                self._skill_indexes.popitem(last=False)
+        self._skill_indexes.move_to_end(skills_prompt)
+        return index
+
+    def _select_skills_prompt(self, skills_prompt: str, query: str, session_id: str) -> str:
+        """只把与问题最相关的 top-k 个技能（以及声明了工作流的核心技能、本会话已加载的技能）注入提示词。
 
+        技能数量不超过 k 时原样返回；问题与任何技能都没有词面重合（如“旅游怎么样”或英文提问）时
+        以目录前 k 个技能兜底，提示词大小始终不随技能目录增长。
+        """
+        top_k = self.config.SKILL_RETRIEVAL_TOP_K
+        index = self._skill_index(skills_prompt)
+        if len(index.docs) <= top_k:
+            return skills_prompt
+        pinned = [*self.skill_registry.workflows(), *self.get_loaded_skills(session_id)]
+        selected, matched = index.select(query, top_k, pinned)
+        if not matched:
+            self.logger.log_interaction("agent", "skill_index", "no_match", f"No skill matched, injecting {len(selected)} default skills")
+        self.logger.log_interaction("agent", "skill_index", "skills_selected", f"{[doc.name for doc in selected]} of {len(index.docs)}")
+        blocks = "\n".join(doc.xml for doc in selected)
+        return f"<available_skills>\n{blocks}\n</available_skills>"
 
-    def clear_session(self):
-        """显式清空当前 Session 的所有历史记录。"""
+    def _history_view(self, session):
+        """返回本次查询使用的会话视图；开启压缩时读取到的是压缩后的历史。"""
+        if self.history_compactor is None:
+            return session
+        return CompactingSession(session, self.history_compactor)
+
+    def get_loaded_skills(self, session_id: str = DEFAULT_SESSION_ID) -> set:
+        """返回指定会话已加载的技能集合。"""
+        return self._loaded_skills.setdefault(session_id, set())
+
+    async def clear_session(self, session_id: str = DEFAULT_SESSION_ID):
+        """显式清空指定 Session 的所有历史记录（不影响其他会话）。"""
         try:
             # 清除内存中的加载状态
-            self.loaded_skills.clear()
-            # 重新初始化 Session (由于 SQLiteSession 库限制，直接删除文件是最彻底的)
-            for ext in ["", "-wal", "-shm"]:
-                fpath = self.db_path + ext
-                if os.path.exists(fpath):
-                    os.remove(fpath)
-            
-            self.session = SQLiteSession(
-                session_id="industry_analyst_session",
-                db_path=self.db_path
-            )
-            self.logger.log_interaction("system", "agent", "session_cleared", "Session history and loaded skills cleared.")
+            self._loaded_skills.pop(session_id, None)
+            # 只删除该会话的记录；数据库文件由所有会话共享，不能整体删除
+            await self.session_pool.get(session_id).clear_session()
+            self.logger.log_interaction("system", "agent", "session_cleared", f"Session history and loaded skills cleared: {session_id}")
             return True
         except Exception as e:
             self.logger.log_interaction("system", "agent", "error", f"Failed to clear session: {e}")
             return False
 
-    async def process_query(self, query: str, is_retry: bool = False):
-        """使用持久化的 Agent 和 Session 处理用户查询。"""
+    async def aclose(self):
+        """取消未被取用的投机调用、停止健康探测，并关闭连接池持有的所有 MCP 长连接。"""
+        self.speculator.cancel_all()
+        await self.health.stop()
+        if self.mcp_pool:
+            await self.mcp_pool.close()
+
+    async def warm_up(self, queries: list[str] | None = None):
+        """预热首个请求会走到的冷路径，各步骤互不阻塞、失败只记录不抛出。
+
+        1. 技能：扫描 SKILL.md / workflow.json / AGENTS.md，构建 BM25 索引和实体别名表；
+        2. 模型：发一个轻量请求（`models.list`），让 httpx 连接池完成 DNS 与 TLS 握手；
+        3. MCP：等待所有服务器连接就绪（握手与 list_tools 随连接完成）；
+        4. 依次执行 `queries` 中的固定问题，回答写入回答缓存，会话记录随后清除。这些查询不计入
+           `agent_queries_total` / `agent_query_seconds`；回答只在 `ANSWER_CACHE_TTL`（及所用工具的缓存 TTL）内有效，
+           不会定期刷新。
+        """
+        self.warmup_status = {"state": "running", "steps": {}}
+        start = time.perf_counter()
+
+        async def step(name: str, coro):
+            step_start = time.perf_counter()
+            try:
+                await coro
+                elapsed = time.perf_counter() - step_start
+                self.warmup_status["steps"][name] = round(elapsed, 3)
+                WARMUP_SECONDS.set(elapsed, step=name)
+                self.logger.log_interaction("system", "warmup", "step_done", f"{name}: {elapsed:.2f}s")
+            except Exception as e:
+                self.warmup_status["steps"][name] = f"error: {e}"
+                self.logger.log_interaction("system", "warmup", "warning", f"{name} failed: {e}")
+
+        await asyncio.gather(
+            step("skills", self._warm_skills()),
+            step("model", asyncio.wait_for(self.openai_client.models.list(), self.config.WARMUP_TIMEOUT)),
+            *(step(f"mcp:{name}", self.mcp_pool.get(name)) for name in self.mcp_pool.server_names),
+        )
+        # 固定问题依赖上面的连接，串行执行以免与首批用户请求争抢模型配额
+        token = _warmup_query.set(True)
+        try:
+            for i, query in enumerate(queries or []):
+                session_id = f"warmup-{i}"
+                await step(f"query:{query}", asyncio.wait_for(self.process_query(query, session_id=session_id), self.config.WARMUP_TIMEOUT))
+                await self.clear_session(session_id)
+        finally:
+            _warmup_query.reset(token)
+
+        elapsed = time.perf_counter() - start
+        WARMUP_SECONDS.set(elapsed, step="total")
+        self.warmup_status["state"] = "done"
+        self.logger.log_interaction("system", "warmup", "finished", f"{elapsed:.2f}s, {len(queries or [])} canned queries")
+
+    async def _warm_skills(self):
+        """读入所有技能文件（在线程中执行，文件 IO 不占用事件循环），再构建检索索引与实体别名表。"""
+        await asyncio.to_thread(self.skill_registry.all)
+        await asyncio.to_thread(self.skill_registry.agents_md_skills_xml)
+        self._skill_index(self.skills_system_prompt)
+        self._answer_key("", None)
+
+    def _collect_metrics(self, metrics):
+        """把缓存、投机执行和会话池自带的统计同步到指标中（仅在导出时调用）。"""
+        for prefix, stats in (
+            ("agent_tool_cache", self.tool_cache.stats()),
+            ("agent_speculation", self.speculator.stats()),
+            ("agent_session_pool", self.session_pool.stats()),
+            ("agent_answer_cache", self.answer_cache.stats()),
+        ):
+            for key, value in stats.items():
+                metrics.gauge(f"{prefix}_{key}").set(value)
+        for name, status in self.mcp_pool.status().items():
+            metrics.gauge("agent_mcp_connected", "Whether the pooled MCP connection is up").set(1 if status["connected"] else 0, server=name)
+        for name, health in self.health.snapshot().items():
+            if health["up"] is not None:
+                metrics.gauge("agent_mcp_up", "Result of the latest MCP health ping").set(1 if health["up"] else 0, server=name)
+        for backend, breaker in list(self.breakers.items()):
+            stats = breaker.stats()
+            metrics.gauge("agent_circuit_open", "Whether the backend circuit breaker rejects calls").set(1 if stats["state"] == "open" else 0, backend=backend)
+            metrics.gauge("agent_circuit_trips", "Times the backend circuit breaker opened").set(stats["trips"], backend=backend)
+
+    def _breaker(self, backend: str) -> CircuitBreaker:
+        breaker = self.breakers.get(backend)
+        if breaker is None:
+            breaker = self.breakers[backend] = CircuitBreaker(
+                backend,
+                failure_threshold=self.config.BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=self.config.BREAKER_RESET_TIMEOUT,
+            )
+        return breaker
+
+    def _retry_hooks(self, backend: str) -> dict:
+        """重试与熔断时记录日志和指标的回调，供 `call_with_retry` 使用。"""
+        def on_retry(attempt: int, delay: float, error: BaseException):
+            RETRIES.inc(reason="transient_error", backend=backend)
+            self.logger.log_interaction("agent", "system", "warning", f"{backend} 第 {attempt} 次调用失败 ({error})，{delay:.2f} 秒后重试")
+
+        def on_trip(breaker: CircuitBreaker):
+            self.logger.log_interaction("agent", "system", "circuit_open", f"{backend} 连续失败，熔断 {breaker.reset_timeout:.0f} 秒")
+
+        return {"on_retry": on_retry, "on_trip": on_trip}
+
+    def _observe_query(self, start: float, path: str, outcome: str):
+        record_outcome(outcome)
+        if _warmup_query.get():
+            return
+        QUERY_SECONDS.observe(time.perf_counter() - start, path=path)
+        QUERIES.inc(path=path, outcome=outcome)
+
+    def _answer_key(self, query: str, skills_prompt: str | None) -> tuple | None:
+        """回答缓存的键：(别名规范化后的查询, 实体, 技能版本)。未识别出实体的查询可能依赖上下文，不缓存。"""
+        signature = self.skill_registry.signature()
+        if self._entity_extractor is None or self._entity_extractor[0] != signature:
+            workflows = [skill.workflow for skill in self.skill_registry.workflows().values()]
+            self._entity_extractor = (signature, EntityExtractor.from_workflows(workflows))
+        text, entities = self._entity_extractor[1].extract(query)
+        if not entities:
+            return None
+        return text, entities, signature, hash(skills_prompt or self.skills_system_prompt)
+
+    async def _cached_answer(self, query: str, session_id: str, skills_prompt: str | None) -> tuple[tuple | None, str | None]:
+        """返回 (缓存键, 命中的回答)。命中时把问答写入该会话的历史，保持多轮对话连贯。"""
+        if not self.answer_cache.enabled:
+            return None, None
+        start = time.perf_counter()
+        key = self._answer_key(query, skills_prompt)
+        answer = self.answer_cache.get(key) if key is not None else None
+        if answer is not None:
+            self.logger.log_interaction("user", "agent", query, f"Session ID: {session_id}")
+            self.logger.log_interaction("agent", "answer_cache", "cache_hit", f"entities: {key[1]}")
+            async with self.session_pool.lease(session_id) as session:
+                await session.add_items([
+                    {"role": "user", "content": query},
+                    {"role": "assistant", "content": answer},
+                ])
+            self.logger.log_interaction("agent", "user", answer)
+            self._observe_query(start, "answer_cache", "ok")
+        return key, answer
+
+    def _store_answer(self, key: tuple | None, answer: str, recording):
+        """成功的回答按所用工具中最短的缓存 TTL 写入；用到不可缓存的工具时不缓存。"""
+        if key is None or recording.outcome not in CACHEABLE_OUTCOMES:
+            return
+        # 工具缓存关闭（如基准测试的冷路径）或用到不可缓存的工具时，回答也不缓存
+        if not all(self.tool_cache.is_cacheable(tool) for _, tool in recording.tools):
+            return
+        ttls = [self.tool_cache.ttl_for(tool) for _, tool in recording.tools]
+        self.answer_cache.put(key, answer, {server for server, _ in recording.tools}, min(ttls, default=None))
+
+    async def process_query(self, query: str, is_retry: bool = False, session_id: str = DEFAULT_SESSION_ID, skills_prompt: str | None = None):
+        """使用共享的 Agent 和按 session_id 隔离的 Session 处理用户查询。
+
+        整个查询（含自愈重试）受 `REQUEST_DEADLINE` 约束，模型与 MCP 调用在时限内各自重试。
+        """
+        with request_deadline(self.config.REQUEST_DEADLINE):
+            if is_retry:
+                return await self._process_query(query, is_retry, session_id, skills_prompt)
+            key, answer = await self._cached_answer(query, session_id, skills_prompt)
+            if answer is not None:
+                return answer
+            with record_answer() as recording:
+                answer = await self._process_query(query, is_retry, session_id, skills_prompt)
+            self._store_answer(key, answer, recording)
+            return answer
+
+    async def _process_query(self, query: str, is_retry: bool, session_id: str, skills_prompt: str | None):
+        start = time.perf_counter()
         if not is_retry:
-            self.logger.log_interaction("user", "agent", query, f"Session ID: {self.session.session_id}")
+            self.logger.log_interaction("user", "agent", query, f"Session ID: {session_id}")
         
-        # 确保 MCP 服务器在调用时是连接状态
-        async with contextlib.AsyncExitStack() as stack:
-            for server in self.mcp_servers:
-                await stack.enter_async_context(server)
-            
-            max_retries = 3
-            for attempt in range(max_retries):
+        # 确保连接池和健康探测在当前事件循环中运行（已运行时为空操作，不会重新握手）
+        await self.mcp_pool.start()
+        self.health.start()
+
+        context = QueryContext(session_id=session_id, skills_prompt=skills_prompt, query=query)
+        async with self.session_pool.lease(session_id) as pooled_session:
+            session = self._history_view(pooled_session)
+            if self.config.WORKFLOW_ENABLED and not is_retry:
+                final_output = None
+                # 报告 Agent 可能已写入会话后才失败，回退前需回滚，避免用户输入重复
+                point = await checkpoint(pooled_session, self.logger)
+                loaded_before = set(self.get_loaded_skills(session_id))
                 try:
-                    # 使用 self.session 保持多轮对话上下文
-                    result = await Runner.run(self.agent, input=query, max_turns=30, session=self.session)
-                    
-                    # 优化：自动检测“Unknown tool”错误并触发自愈重置
-                    # 如果返回内容中包含工具找不到的提示，说明模型可能在用过时的记忆
-                    if ("Unknown tool" in result.final_output or "未找到" in result.final_output and "工具" in result.final_output) and not is_retry:
-                        self.logger.log_interaction("agent", "system", "auto_healing", "Detected stale tool reference, clearing session and retrying...")
-                        self.clear_session()
-                        return await self.process_query(query, is_retry=True)
+                    async for event in self._workflow_events(query, session, context):
+                        if event["type"] == "final":
+                            final_output = event["text"]
+                except Exception as e:
+                    self.logger.log_interaction("agent", "workflow", "error", f"Workflow failed ({e}), falling back to agent loop")
+                    await self._rollback_run(pooled_session, point, loaded_before, f"workflow failure ({e})")
+                if final_output is not None:
+                    self.logger.log_interaction("agent", "user", final_output)
+                    self._observe_query(start, "workflow", "ok")
+                    return final_output
 
-                    if not is_retry:
-                        self.logger.log_interaction("agent", "user", result.final_output)
-                    return result.final_output
+            # 自愈：运行前记录检查点，出现过时工具引用或关键 MCP 错误时只回滚本次追加的条目并重跑一次
+            for attempt in range(2):
+                point = await checkpoint(pooled_session, self.logger)
+                loaded_before = set(self.get_loaded_skills(session_id))
+                try:
+                    # 使用会话池中的 session 保持该用户的多轮对话上下文；瞬时错误已在每次模型/MCP 调用内重试
+                    result = await Runner.run(self.agent, input=query, max_turns=30, session=session, context=context)
                 except Exception as e:
                     error_msg = str(e)
-                    # 自动检测关键 MCP 错误并触发重置
-                    if ("CRITICAL_MCP_ERROR" in error_msg or "Unknown tool" in error_msg) and not is_retry:
-                        self.logger.log_interaction("agent", "system", "auto_healing", f"Detected tool failure ({error_msg}), resetting session...")
-                        self.clear_session()
-                        return await self.process_query(query, is_retry=True)
-
-                    if "500" in error_msg and "internal_server_error" in error_msg:
-                        self.logger.log_interaction("agent", "system", "warning", f"尝试 {attempt + 1} API 暂时不可用 (500), 正在重试...")
-                    else:
-                        self.logger.log_interaction("agent", "system", "error", f"尝试 {attempt + 1} 失败: {error_msg}")
-                        
-                    if any(code in error_msg for code in ["429", "500", "502", "503", "504", "timeout"]) and attempt < max_retries - 1:
-                        await asyncio.sleep((attempt + 1) * 2)
+                    if ("CRITICAL_MCP_ERROR" in error_msg or "Unknown tool" in error_msg) and attempt == 0:
+                        await self._rollback_run(pooled_session, point, loaded_before, f"tool failure ({error_msg})")
+                        RETRIES.inc(reason="tool_failure")
                         continue
-                    
-                    if "500" in error_msg:
+
+                    self.logger.log_interaction("agent", "system", "error", f"查询失败: {error_msg}")
+                    if not is_retry:
+                        self._observe_query(start, "agent", "error")
+                    if isinstance(e, (CircuitOpenError, DeadlineExceeded)) or "500" in error_msg:
                         return "抱歉，服务压力较大，请稍后再试。"
                     return f"系统繁忙 ({error_msg})，请稍后重试。"
 
+                # 优化：自动检测“Unknown tool”错误并触发自愈
+                # 如果返回内容中包含工具找不到的提示，说明模型可能在用过时的记忆
+                if ("Unknown tool" in result.final_output or "未找到" in result.final_output and "工具" in result.final_output) and attempt == 0:
+                    await self._rollback_run(pooled_session, point, loaded_before, "stale tool reference")
+                    RETRIES.inc(reason="stale_tool")
+                    continue
+
+                if not is_retry:
+                    self.logger.log_interaction("agent", "user", result.final_output)
+                    self._observe_query(start, "agent", "healed" if attempt else "ok")
+                return result.final_output
+
+    async def _rollback_run(self, session, point: SessionCheckpoint, loaded_skills: set, reason: str):
+        """把会话回滚到运行前的检查点，并恢复该会话的已加载技能。"""
+        removed = await rollback(session, point, self.logger)
+        self._loaded_skills[point.session_id] = set(loaded_skills)
+        self.logger.log_interaction("agent", "system", "auto_healing", f"Detected {reason}, rolled back {removed} session items and retrying...")
+
+    async def process_query_stream(self, query: str, session_id: str = DEFAULT_SESSION_ID, skills_prompt: str | None = None):
+        """流式处理用户查询，按到达顺序产出运行事件。
+
+        事件为 dict，`type` 取值：
+        - "tool_call": 模型发起工具调用（`name`、`arguments`）
+        - "tool_output": 工具返回（`name`、`output`）
+        - "delta": 回答文本增量（`text`）
+        - "final": 最终回答全文（`text`），总是最后一个事件
+        出错且尚未输出任何文本时，回退到带重试/自愈逻辑的 `process_query`。
+        """
+        with request_deadline(self.config.REQUEST_DEADLINE):
+            key, answer = await self._cached_answer(query, session_id, skills_prompt)
+            if answer is not None:
+                yield {"type": "final", "text": answer}
+                return
+            with record_answer() as recording:
+                async for event in self._process_query_stream(query, session_id, skills_prompt):
+                    if event["type"] == "final":
+                        answer = event["text"]
+                    yield event
+            if answer is not None:
+                self._store_answer(key, answer, recording)
+
+    async def _process_query_stream(self, query: str, session_id: str, skills_prompt: str | None):
+        start = time.perf_counter()
+        self.logger.log_interaction("user", "agent", query, f"Session ID: {session_id} (stream)")
+        await self.mcp_pool.start()
+        self.health.start()
+
+        context = QueryContext(session_id=session_id, skills_prompt=skills_prompt, query=query)
+        emitted_text = False
+        # 工具输出事件只带 call_id，借助调用事件还原工具名
+        tool_names = {}
+        fallback_error = None
+        async with self.session_pool.lease(session_id) as pooled_session:
+            session = self._history_view(pooled_session)
+            # 检查点先于工作流记录，工作流或流式运行失败后回退时都能回滚到本次查询之前
+            point = await checkpoint(pooled_session, self.logger)
+            loaded_before = set(self.get_loaded_skills(session_id))
+            if self.config.WORKFLOW_ENABLED:
+                try:
+                    async for event in self._workflow_events(query, session, context, stream=True):
+                        if event["type"] == "delta":
+                            emitted_text = True
+                        if event["type"] == "final":
+                            self.logger.log_interaction("agent", "user", event["text"])
+                            self._observe_query(start, "stream_workflow", "ok")
+                        yield event
+                        if event["type"] == "final":
+                            return
+                except Exception as e:
+                    if emitted_text:
+                        # 报告已输出一部分，不再回退，否则用户会看到两份回答
+                        self.logger.log_interaction("agent", "system", "error", f"Workflow stream interrupted: {e}")
+                        self._observe_query(start, "stream_workflow", "error")
+                        yield {"type": "final", "text": f"系统繁忙 ({e})，请稍后重试。"}
+                        return
+                    self.logger.log_interaction("agent", "workflow", "error", f"Workflow failed ({e}), falling back to agent loop")
+                    await self._rollback_run(pooled_session, point, loaded_before, f"workflow failure ({e})")
+
+            try:
+                result = Runner.run_streamed(self.agent, input=query, max_turns=30, session=session, context=context)
+                async for event in result.stream_events():
+                    if event.type == "raw_response_event":
+                        if getattr(event.data, "type", "") == "response.output_text.delta" and event.data.delta:
+                            emitted_text = True
+                            yield {"type": "delta", "text": event.data.delta}
+                    elif event.type == "run_item_stream_event":
+                        if event.name == "tool_called":
+                            raw = event.item.raw_item
+                            tool_names[getattr(raw, "call_id", None)] = getattr(raw, "name", "")
+                            yield {"type": "tool_call", "name": getattr(raw, "name", ""), "arguments": getattr(raw, "arguments", "")}
+                        elif event.name == "tool_output":
+                            raw = event.item.raw_item
+                            call_id = raw.get("call_id") if isinstance(raw, dict) else getattr(raw, "call_id", None)
+                            yield {"type": "tool_output", "name": tool_names.get(call_id, ""), "output": str(event.item.output)}
+            except Exception as e:
+                if emitted_text:
+                    self.logger.log_interaction("agent", "system", "error", f"Stream interrupted: {e}")
+                    self._observe_query(start, "stream", "error")
+                    yield {"type": "final", "text": f"系统繁忙 ({e})，请稍后重试。"}
+                    return
+                self.logger.log_interaction("agent", "system", "warning", f"Stream failed before output ({e}), falling back to non-streaming run")
+                RETRIES.inc(reason="stream_fallback")
+                # 丢弃失败的流式运行已写入的条目，避免非流式重跑时出现重复的用户输入
+                await self._rollback_run(pooled_session, point, loaded_before, f"stream failure ({e})")
+                fallback_error = e
+
+        if fallback_error is not None:
+            # 非流式重跑会重新租用会话，须在释放本次租约之后进行
+            final_output = await self.process_query(query, is_retry=True, session_id=session_id, skills_prompt=skills_prompt)
+            self._observe_query(start, "stream", "fallback")
+            yield {"type": "final", "text": final_output}
+            return
+
+        final_output = str(result.final_output)
+        self.logger.log_interaction("agent", "user", final_output)
+        self._observe_query(start, "stream", "ok")
+        yield {"type": "final", "text": final_output}
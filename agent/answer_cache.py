@@ -0,0 +1,173 @@
+import contextvars
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from agent.workflow import AliasMatcher, fold_text
+
+# 只有这些结果的回答才会被缓存（失败、降级的回答不缓存）
+CACHEABLE_OUTCOMES = {"ok", "healed"}
+# 不影响问题含义的开头客套语与句末语气词，规范化时去掉
+FILLER_PREFIXES = ("请问",)
+FILLER_SUFFIXES = "吗呢啊呀"
+# 紧挨在实体前的“的”（“本地的旅游”）
+_POSSESSIVE_RE = re.compile(r"的(?=<)")
+
+
+def _strip(text: str) -> str:
+    """去掉所有空白、标点、符号和控制字符。"""
+    return "".join(ch for ch in text if unicodedata.category(ch)[0] not in "PZSC")
+
+
+def _trim_fillers(text: str) -> str:
+    for prefix in FILLER_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+    return text.rstrip(FILLER_SUFFIXES)
+
+
+def normalize_query(query: str) -> str:
+    """全角转半角、转小写，去掉空白、标点、符号、开头客套语和句末语气词。"""
+    return _trim_fillers(_strip(fold_text(query)))
+
+
+class EntityExtractor:
+    """按技能工作流声明的别名识别查询中的实体，并把别名替换为规范值。
+
+    “本地的旅游产业发展如何？”与“本地文旅产业发展如何”都会规范为 `本地<tourism>产业发展如何`
+    这一文本。别名匹配与工作流意图识别共用 `AliasMatcher`。
+    """
+
+    def __init__(self, aliases: dict[str, str]):
+        self.matcher = AliasMatcher(aliases)
+
+    @classmethod
+    def from_workflows(cls, workflows: list[dict]) -> "EntityExtractor":
+        aliases = {}
+        for workflow in workflows:
+            for spec in workflow.get("intent", {}).values():
+                aliases.update(spec.get("aliases", {}))
+        return cls(aliases)
+
+    def extract(self, query: str) -> tuple[str, tuple[str, ...]]:
+        """返回 (规范化后的文本, 按出现顺序去重的实体)。
+
+        先在保留空白和标点的文本上匹配别名（ASCII 别名依赖词边界），再把别名替换为 `<规范值>`，
+        最后只对别名之间的片段去掉空白和标点。
+        """
+        text = fold_text(query)
+        parts, entities, position = [], [], 0
+        for start, end, value in self.matcher.finditer(text):
+            parts.append(_strip(text[position:start]))
+            parts.append(f"<{value}>")
+            if value not in entities:
+                entities.append(value)
+            position = end
+        parts.append(_strip(text[position:]))
+        return _trim_fillers(_POSSESSIVE_RE.sub("", "".join(parts))), tuple(entities)
+
+
+@dataclass
+class AnswerRecording:
+    """一次查询中用到的工具与最终结果，决定回答能否缓存以及缓存多久。"""
+    tools: set = field(default_factory=set)
+    outcome: str | None = None
+
+
+_recording: contextvars.ContextVar[AnswerRecording | None] = contextvars.ContextVar("answer_recording", default=None)
+
+
+@contextmanager
+def record_answer():
+    recording = AnswerRecording()
+    token = _recording.set(recording)
+    try:
+        yield recording
+    finally:
+        try:
+            _recording.reset(token)
+        except ValueError:
+            pass
+
+
+def record_tool_use(server_name: str, tool_name: str):
+    recording = _recording.get()
+    if recording is not None:
+        recording.tools.add((server_name, tool_name))
+
+
+def record_outcome(outcome: str):
+    recording = _recording.get()
+    if recording is not None and recording.outcome is None:
+        recording.outcome = outcome
+
+
+class AnswerCache:
+    """查询级回答缓存（TTL + LRU）。
+
+    键由调用方给出（规范化查询、实体、技能版本），每条记录同时保存回答依赖的 MCP 服务器，
+    `invalidate(server_name)` 只清除依赖该服务器数据的回答。
+    """
+
+    def __init__(self, max_entries: int = 256, default_ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: OrderedDict[tuple, tuple[float, str, frozenset]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.default_ttl > 0
+
+    def get(self, key: tuple) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, answer: str, servers: set[str], ttl: float | None = None):
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        if not self.enabled or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, answer, frozenset(servers))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, server_name: str | None = None) -> int:
+        """清除依赖 `server_name` 数据的回答；不传参数时清空全部。返回清除数量。"""
+        with self._lock:
+            if server_name is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            stale = [key for key, entry in self._entries.items() if server_name in entry[2]]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,71 @@
+import itertools
+import json
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class BatchSpec:
+    """描述一个批量工具与其对应的单条工具。
+
+    批量工具对 `list_params` 中的各个列表参数取笛卡尔积（按声明顺序嵌套），每个组合等价于
+    一次单条工具调用，返回的 `records` 与组合一一对应、顺序相同。第一个列表参数为分片维度。
+    """
+    server: str
+    batch_tool: str
+    single_tool: str
+    # 批量参数名 -> 单条参数名，如 {"industries": "industry"}
+    list_params: tuple[tuple[str, str], ...]
+
+    @property
+    def chunk_param(self) -> str:
+        return self.list_params[0][0]
+
+    def expand(self, args: dict) -> list[dict]:
+        """把批量参数展开为单条调用的参数列表；未提供的可选列表不出现在单条参数中。"""
+        axes = []
+        for batch_name, single_name in self.list_params:
+            values = args.get(batch_name)
+            if isinstance(values, (str, int)):
+                values = [values]
+            axes.append([(single_name, value) for value in values] if values else [None])
+        return [
+            {pair[0]: pair[1] for pair in combo if pair is not None}
+            for combo in itertools.product(*axes)
+        ]
+
+    def chunks(self, args: dict, values: list, max_size: int) -> list[dict]:
+        """按分片维度把 `values` 切成不超过 `max_size` 的批量请求，其余参数保持不变。"""
+        size = max(1, max_size)
+        return [
+            {**args, self.chunk_param: values[i:i + size]}
+            for i in range(0, len(values), size)
+        ]
+
+    def single_to_chunk_value(self, single_args: dict) -> Any:
+        return single_args.get(self.list_params[0][1])
+
+
+INDUSTRY_BATCH = BatchSpec(
+    server="industry_query",
+    batch_tool="get_industry_data_batch",
+    single_tool="get_industry_data",
+    list_params=(("industries", "industry"), ("regions", "region"), ("years", "year")),
+)
+
+
+def parse_batch_records(output: str) -> list:
+    """解析批量工具输出中的 `records`；格式不符时抛出 ValueError。"""
+    data = json.loads(output)
+    if not isinstance(data, dict) or not isinstance(data.get("records"), list):
+        raise ValueError(f"批量工具返回格式不正确: {output[:200]}")
+    return data["records"]
+
+
+def has_error_records(records: list) -> bool:
+    """批量结果中是否有单条记录返回了错误（服务端以 `{"error": ...}` 表示），这样的批次不写入缓存。"""
+    return any(isinstance(record, dict) and record.get("error") for record in records)
+
+
+def merge_records(records: list) -> str:
+    return json.dumps({"records": records, "count": len(records)}, ensure_ascii=False)
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from agent.mcp_pool import MCPConnectionPool
+from utils.logger import InteractionLogger
+from utils.metrics import get_metrics
+
+PROBE_SECONDS = get_metrics().histogram(
+    "agent_mcp_probe_seconds", "Latency of MCP-level health pings", buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+
+class MCPHealthProber:
+    """进程级 MCP 健康探测器。
+
+    在 Agent 的事件循环中常驻一个协程，每隔 `interval` 秒通过连接池中的长连接发送 MCP `ping`
+    （SDK 不支持时退化为 `list_tools`），记录延迟历史与上下线状态。结果保存在线程安全的快照中，
+    界面的各个组件和 Agent 都只读快照，因此探测开销与打开的页面数量无关。
+    探测失败时把连接标记为损坏，由连接池在后台重连。
+    """
+
+    def __init__(self, logger: InteractionLogger, pool: MCPConnectionPool, interval: float = 5.0,
+                 timeout: float = 2.0, history_size: int = 60):
+        self.logger = logger
+        self.pool = pool
+        self.interval = interval
+        self.timeout = timeout
+        self.history_size = history_size
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._lock = threading.Lock()
+        self._state: dict[str, dict] = {}
+        self._history: dict[str, deque] = {}
+
+    def start(self):
+        """在当前事件循环中启动探测协程（幂等）。"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._task = loop.create_task(self._run(), name="mcp-health-prober")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def is_up(self, name: str) -> bool:
+        """尚未探测过的服务器视为可用，避免启动阶段误判；探测失败后连接池已重连的也视为可用。"""
+        with self._lock:
+            state = self._state.get(name)
+        if state is None or state["up"]:
+            return True
+        connected_at = self.pool.connected_at(name)
+        return self.pool.connected_server(name) is not None and connected_at is not None and connected_at > state["checked_at"]
+
+    def last_error(self, name: str) -> str | None:
+        with self._lock:
+            state = self._state.get(name)
+        return state["error"] if state else None
+
+    def snapshot(self) -> dict[str, dict]:
+        """每个服务器的最近状态、延迟历史（毫秒，失败为 None）与可用率。"""
+        with self._lock:
+            result = {}
+            for name in self.pool.server_names:
+                state = self._state.get(name, {"up": None, "latency_ms": None, "checked_at": None, "error": None})
+                history = list(self._history.get(name, ()))
+                ok = sum(1 for _, latency in history if latency is not None)
+                result[name] = {
+                    **state,
+                    "history": history,
+                    "availability": ok / len(history) if history else None,
+                }
+            return result
+
+    async def probe_once(self):
+        await asyncio.gather(*(self._probe(name) for name in self.pool.server_names))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.log_interaction("health", "mcp_server", "error", f"Probe round failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _probe(self, name: str):
+        server = self.pool.connected_server(name)
+        start = time.perf_counter()
+        error = None
+        if server is None:
+            error = self.pool.status().get(name, {}).get("last_error")
+            if error is None:
+                # 仍在首次连接中，暂不判定
+                return
+        else:
+            try:
+                session = getattr(server, "session", None)
+                if session is not None and hasattr(session, "send_ping"):
+                    await asyncio.wait_for(session.send_ping(), self.timeout)
+                else:
+                    await asyncio.wait_for(server.list_tools(), self.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                self.pool.mark_broken(name, f"health probe failed: {error}")
+        latency = time.perf_counter() - start
+        self._record(name, None if error else latency, error)
+
+    def _record(self, name: str, latency: float | None, error: str | None):
+        now = time.time()
+        up = error is None
+        if latency is not None:
+            PROBE_SECONDS.observe(latency, server=name)
+        with self._lock:
+            previous = self._state.get(name)
+            self._state[name] = {
+                "up": up,
+                "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+                "checked_at": now,
+                "error": error,
+            }
+            history = self._history.setdefault(name, deque(maxlen=self.history_size))
+            history.append((now, self._state[name]["latency_ms"]))
+        if previous is None or previous["up"] != up:
+            self.logger.log_interaction("health", "mcp_server", "up" if up else "down", f"{name}: {error or 'ok'}")
@@ -0,0 +1,109 @@
+import json
+import re
+from typing import Any
+
+from agents.memory.session import SessionABC
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文按每字 1 个，其余字符按每 4 个 1 个。"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def item_tokens(item: Any) -> int:
+    return estimate_tokens(json.dumps(item, ensure_ascii=False, default=str))
+
+
+def _is_user_message(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("role") == "user" and item.get("type", "message") == "message"
+
+
+def split_turns(items: list) -> list[list]:
+    """按用户消息把历史切分为轮次；第一条用户消息之前的条目归入第一轮。"""
+    turns: list[list] = []
+    seen_user = False
+    for item in items:
+        if not turns or (_is_user_message(item) and seen_user):
+            turns.append([])
+        seen_user = seen_user or _is_user_message(item)
+        turns[-1].append(item)
+    return turns
+
+
+class HistoryCompactor:
+    """在历史送入模型前压缩它，数据库中保存的完整历史不受影响。
+
+    最近 `keep_turns` 轮原样保留；更早的轮次中，`load_skill` 返回的技能全文替换为一行说明，
+    其他工具输出截断为 `summary_chars` 字的摘要。压缩后仍超过 `token_budget` 时，从最早的
+    轮次开始整轮丢弃（保证工具调用与其输出成对出现），但至少保留最近一轮。
+    """
+
+    def __init__(self, keep_turns: int = 3, summary_chars: int = 200, token_budget: int = 6000):
+        self.keep_turns = keep_turns
+        self.summary_chars = summary_chars
+        self.token_budget = token_budget
+
+    def compact(self, items: list) -> list:
+        turns = split_turns(items)
+        older = max(len(turns) - self.keep_turns, 0)
+        turns = [self._compact_turn(turn) for turn in turns[:older]] + turns[older:]
+
+        if self.token_budget > 0:
+            sizes = [sum(item_tokens(item) for item in turn) for turn in turns]
+            total = sum(sizes)
+            while len(turns) > 1 and total > self.token_budget:
+                total -= sizes.pop(0)
+                turns.pop(0)
+        return [item for turn in turns for item in turn]
+
+    def _compact_turn(self, turn: list) -> list:
+        tool_names = {
+            item.get("call_id"): item.get("name")
+            for item in turn
+            if isinstance(item, dict) and item.get("type") == "function_call"
+        }
+        return [
+            self._summarize_output(item, tool_names.get(item.get("call_id")))
+            if isinstance(item, dict) and item.get("type") == "function_call_output"
+            else item
+            for item in turn
+        ]
+
+    def _summarize_output(self, item: dict, tool_name: str | None) -> dict:
+        output = item.get("output")
+        text = output if isinstance(output, str) else json.dumps(output, ensure_ascii=False, default=str)
+        if tool_name == "load_skill":
+            summary = "[技能指南已在之前加载，如需完整内容请重新调用 load_skill]"
+        elif len(text) > self.summary_chars:
+            summary = f"{text[:self.summary_chars]}…[已压缩，原文 {len(text)} 字]"
+        else:
+            return item
+        return {**item, "output": summary}
+
+
+class CompactingSession(SessionABC):
+    """包装一个会话，读取历史时经 `HistoryCompactor` 压缩，写入和清空原样委托。"""
+
+    def __init__(self, session: Any, compactor: HistoryCompactor):
+        self.session = session
+        self.session_id = session.session_id
+        self.compactor = compactor
+
+    async def get_items(self, limit: int | None = None) -> list:
+        return self.compactor.compact(await self.session.get_items(limit))
+
+    async def add_items(self, items: list) -> None:
+        await self.session.add_items(items)
+
+    async def pop_item(self) -> Any:
+        return await self.session.pop_item()
+
+    async def clear_session(self) -> None:
+        await self.session.clear_session()
+
+    def __getattr__(self, name: str) -> Any:
+        # 其余属性（如新版 SDK 的 session_settings）沿用被包装的会话
+        return getattr(self.session, name)
@@ -0,0 +1,67 @@
+import importlib.util
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Any
+
+import anyio
+from agents.mcp.server import _MCPServerWithClientSession
+from mcp.shared.memory import create_client_server_memory_streams
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_apps: dict[str, Any] = {}
+_apps_lock = threading.Lock()
+
+
+def load_fastmcp_app(script: str, attr: str = "mcp") -> Any:
+    """Import a FastMCP server script once per process and return its app object.
+
+    `script` is relative to the repository root. The scripts are not packages (both are
+    named server.py), so each is loaded under a module name derived from its path.
+    """
+    path = script if os.path.isabs(script) else os.path.join(REPO_ROOT, script)
+    with _apps_lock:
+        app = _apps.get(path)
+        if app is None:
+            module_name = "_inprocess_" + os.path.relpath(path, REPO_ROOT).replace(os.sep, "_").removesuffix(".py")
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            app = _apps[path] = getattr(module, attr)
+        return app
+
+
+class InProcessMCPServer(_MCPServerWithClientSession):
+    """进程内 MCP 服务器：通过内存流把 FastMCP 应用直接挂到客户端会话上。
+
+    与 SSE 相同走完整的 MCP 协议（initialize、list_tools、call_tool、ping），因此连接池、
+    健康探测与日志无需区分传输方式；只是省去了 HTTP、uvicorn 子进程和网络往返。
+    服务端协程运行在建立连接的任务里，随 `cleanup()` 一起结束。
+    基类 `_MCPServerWithClientSession` 和 FastMCP 的 `_mcp_server` 都是内部接口，
+    requirements.txt 固定了验证过的版本范围，test_inprocess_mcp.py 覆盖握手与工具调用。
+    """
+
+    def __init__(self, name: str, script: str, cache_tools_list: bool = False,
+                 client_session_timeout_seconds: float | None = 5):
+        super().__init__(cache_tools_list, client_session_timeout_seconds)
+        self._name = name
+        self.script = script
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @asynccontextmanager
+    async def create_streams(self):
+        app = load_fastmcp_app(self.script)
+        # FastMCP 的底层协议服务器
+        server = app._mcp_server
+        async with create_client_server_memory_streams() as (client_streams, server_streams):
+            server_read, server_write = server_streams
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(lambda: server.run(server_read, server_write, server.create_initialization_options(), raise_exceptions=False))
+                try:
+                    yield client_streams
+                finally:
+                    tg.cancel_scope.cancel()
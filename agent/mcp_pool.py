@@ -0,0 +1,176 @@
+import asyncio
+import time
+from typing import Any, Callable
+
+from agents.mcp import MCPServer
+
+from utils.logger import InteractionLogger
+
+
+class MCPConnectionPool:
+    """长连接 MCP 连接池。
+
+    每个 MCP 服务器由一个常驻的守护协程持有连接：建立 SSE 会话后拉取并缓存工具列表，
+    之后所有查询共享同一个会话；连接失败或被标记为损坏时在后台按指数退避重连，每次重连成功后
+    重新拉取工具列表，服务端重启后变更的工具不会沿用旧的 schema。
+
+    MCP 会话绑定在创建它的事件循环上。若调用方切换了事件循环（例如每次请求都 `asyncio.run`），
+    连接池会在新循环中重建连接。
+    """
+
+    def __init__(
+        self,
+        logger: InteractionLogger,
+        server_configs: list[dict],
+        server_factory: Callable[[dict], MCPServer],
+        connect_timeout: float = 10.0,
+        min_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+    ):
+        self.logger = logger
+        self.server_configs = server_configs
+        self.server_factory = server_factory
+        self.connect_timeout = connect_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._servers: dict[str, MCPServer] = {}
+        self._ready: dict[str, asyncio.Event] = {}
+        self._broken: dict[str, asyncio.Event] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        # 最近一次连接成功时拉取的工具列表；重连期间保留旧值供状态展示
+        self._tools_cache: dict[str, list[Any]] = {}
+        self._connected_at: dict[str, float] = {}
+        self._last_error: dict[str, str] = {}
+
+    @property
+    def server_names(self) -> list[str]:
+        return [config["name"] for config in self.server_configs]
+
+    async def start(self):
+        """在当前事件循环中启动所有服务器的守护协程（幂等，不等待连接完成）。"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        if self._loop is not None and self._loop is not loop:
+            # 旧循环上的会话已随循环一起销毁，只能在新循环中重建
+            self.logger.log_interaction("agent", "mcp_pool", "loop_changed", "Event loop changed, rebuilding MCP connections")
+
+        self._loop = loop
+        self._servers.clear()
+        self._tasks.clear()
+        for config in self.server_configs:
+            name = config["name"]
+            try:
+                self._servers[name] = self.server_factory(config)
+            except Exception as e:
+                self._last_error[name] = str(e)
+                self.logger.log_interaction("agent", "system", "error", f"Failed to create MCP server {name}: {e}")
+                continue
+            self._ready[name] = asyncio.Event()
+            self._broken[name] = asyncio.Event()
+            self._tasks[name] = loop.create_task(self._supervise(name), name=f"mcp-pool-{name}")
+
+    async def get(self, name: str) -> MCPServer:
+        """获取已连接的服务器；若正在(重)连接则最多等待 `connect_timeout` 秒。"""
+        await self.start()
+        if name not in self._servers:
+            raise KeyError(name)
+
+        ready = self._ready[name]
+        if not ready.is_set():
+            try:
+                await asyncio.wait_for(ready.wait(), timeout=self.connect_timeout)
+            except asyncio.TimeoutError:
+                reason = self._last_error.get(name, "connect timeout")
+                raise ConnectionError(f"MCP 服务器 '{name}' 暂不可用: {reason}") from None
+        return self._servers[name]
+
+    def mark_broken(self, name: str, reason: str = ""):
+        """标记连接已损坏，由守护协程在后台重连。"""
+        broken = self._broken.get(name)
+        if broken is not None and not broken.is_set():
+            self._last_error[name] = reason
+            # 立即让后续 get() 等待重连，而不是拿到正在关闭的会话
+            self._ready[name].clear()
+            self.logger.log_interaction("agent", "mcp_pool", "connection_broken", f"{name}: {reason}")
+            broken.set()
+
+    def connected_server(self, name: str) -> MCPServer | None:
+        """不等待地返回已连接的服务器；未连接或正在重连时返回 None。"""
+        ready = self._ready.get(name)
+        if ready is None or not ready.is_set():
+            return None
+        return self._servers.get(name)
+
+    def connected_at(self, name: str) -> float | None:
+        return self._connected_at.get(name)
+
+    def cached_tools(self, name: str) -> list[Any]:
+        return self._tools_cache.get(name, [])
+
+    def status(self) -> dict[str, dict]:
+        """返回每个服务器的连接状态快照。"""
+        return {
+            name: {
+                "connected": name in self._ready and self._ready[name].is_set(),
+                "connected_at": self._connected_at.get(name),
+                "tools": [tool.name for tool in self._tools_cache.get(name, [])],
+                "last_error": self._last_error.get(name),
+            }
+            for name in self.server_names
+        }
+
+    async def close(self):
+        """关闭所有连接并停止守护协程。"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._servers.clear()
+        self._loop = None
+
+    async def _supervise(self, name: str):
+        server = self._servers[name]
+        ready = self._ready[name]
+        broken = self._broken[name]
+        backoff = self.min_backoff
+
+        while True:
+            try:
+                await server.connect()
+                # SDK 在服务器对象上也缓存了工具列表，重连后须作废才会真正重新拉取
+                invalidate = getattr(server, "invalidate_tools_cache", None)
+                if invalidate is not None:
+                    invalidate()
+                self._tools_cache[name] = await server.list_tools()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error[name] = str(e)
+                self.logger.log_interaction("mcp_pool", "mcp_server", "connect_failed", f"{name}: {e}, retry in {backoff:.1f}s")
+                await self._safe_cleanup(server)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = self.min_backoff
+            self._connected_at[name] = time.time()
+            self._last_error.pop(name, None)
+            ready.set()
+            self.logger.log_interaction("mcp_pool", "mcp_server", "connected", f"{name} ({len(self._tools_cache[name])} tools)")
+            try:
+                await broken.wait()
+            finally:
+                ready.clear()
+                broken.clear()
+                # 必须在建立连接的同一个任务里关闭，否则 anyio 的 cancel scope 会报错
+                await self._safe_cleanup(server)
+
+    async def _safe_cleanup(self, server: MCPServer):
+        try:
+            await server.cleanup()
+        except Exception:
+            pass
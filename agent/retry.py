@@ -0,0 +1,235 @@
+import asyncio
+import contextvars
+import email.utils
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable
+
+# 可重试的 HTTP 状态码（限流、超时与服务端错误）
+TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+# 不同 SDK 版本下传输层异常的类型名（openai/httpx/anyio/mcp），按名称匹配以免依赖具体模块
+TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+    "ConnectError", "ReadError", "ReadTimeout", "RemoteProtocolError",
+    "ClosedResourceError", "BrokenResourceError", "EndOfStream",
+}
+# 异常被包装后只剩文本时的兜底匹配
+TRANSIENT_MARKERS = ("429", "500", "502", "503", "504", "timeout", "timed out", "Connection closed", "Connection lost")
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """本次请求的整体时限已用完。"""
+
+
+class CircuitOpenError(ConnectionError):
+    """后端熔断中，调用被立即拒绝。"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"后端 '{name}' 连续失败已熔断，约 {retry_in:.0f} 秒后重试")
+        self.name = name
+        self.retry_in = retry_in
+
+
+@contextmanager
+def request_deadline(seconds: float | None):
+    """为当前请求设置整体时限（monotonic 时间）。已有时限时沿用外层的，嵌套调用不会延长。"""
+    if not seconds or _deadline.get() is not None:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # 异步生成器在其他上下文中被关闭时，时限随该上下文一起失效
+            pass
+
+
+def time_remaining() -> float | None:
+    """当前请求剩余的秒数；未设置时限时为 None。"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_transient(exc: BaseException) -> bool:
+    """判断异常是否值得重试：限流、超时、5xx 与连接中断。"""
+    if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS
+    if isinstance(exc, (TimeoutError, ConnectionError)) or type(exc).__name__ in TRANSIENT_ERROR_NAMES:
+        return True
+    message = str(exc)
+    return any(marker in message for marker in TRANSIENT_MARKERS)
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """读取响应头中的 `retry-after-ms` / `Retry-After`（秒数或 HTTP 日期）。"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动（full jitter）；服务端给出 Retry-After 时以其为准，但不超过 `max_delay`。"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, server_hint: float | None = None) -> float:
+        """第 `attempt` 次失败（从 1 开始）后应等待的秒数。"""
+        if server_hint is not None:
+            return min(server_hint, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """单个后端的熔断器。
+
+    连续 `failure_threshold` 次可重试的失败后进入 open 状态，期间调用立即抛出 `CircuitOpenError`；
+    `reset_timeout` 秒后进入 half_open，只放行一个探测调用，成功则恢复，失败则重新计时。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        """放行调用或抛出 `CircuitOpenError`。"""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """记录一次失败，返回本次是否触发熔断。"""
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                self.trips += 1
+                return True
+            return False
+
+    def release(self):
+        """调用未得出结论（如被取消）时释放 half_open 的探测名额。"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self._state(), "failures": self._failures, "trips": self.trips, "rejected": self.rejected}
+
+
+async def call_with_retry(
+    fn: Callable[[], Awaitable[Any]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker | None = None,
+    on_retry: Callable[[int, float, BaseException], None] | None = None,
+    on_trip: Callable[[CircuitBreaker], None] | None = None,
+    bound_to_deadline: bool = True,
+) -> Any:
+    """在请求时限内按 `policy` 重试 `fn`，并维护 `breaker` 的状态。
+
+    每次尝试都以剩余时限为超时（`bound_to_deadline=False` 时只在两次尝试之间检查时限，
+    用于必须在调用方任务中执行的调用）；剩余时间不足以等待下一次退避时直接抛出最后一次的异常。
+    不可重试的异常说明后端仍能正常响应，不计入熔断。
+    """
+    attempt = 0
+    while True:
+        remaining = time_remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("请求已超过整体时限")
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            if remaining is None or not bound_to_deadline:
+                result = await fn()
+            else:
+                try:
+                    result = await asyncio.wait_for(fn(), remaining)
+                except asyncio.TimeoutError:
+                    if time_remaining() > 0:
+                        # fn 自身的超时，按普通的可重试异常处理
+                        raise
+                    raise DeadlineExceeded("请求已超过整体时限") from None
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release()
+            raise
+        except Exception as e:
+            # 时限耗尽时后端也没有按时响应，同样计入熔断
+            transient = is_transient(e) or isinstance(e, DeadlineExceeded)
+            if breaker is not None:
+                if not transient:
+                    breaker.record_success()
+                elif breaker.record_failure() and on_trip is not None:
+                    on_trip(breaker)
+            attempt += 1
+            if not is_transient(e) or attempt >= policy.max_attempts:
+                raise
+            delay = policy.delay(attempt, retry_after(e))
+            remaining = time_remaining()
+            if remaining is not None and delay >= remaining:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, delay, e)
+            await asyncio.sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
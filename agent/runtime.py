@@ -0,0 +1,134 @@
+import asyncio
+import atexit
+import queue
+import threading
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Coroutine, Iterator
+
+from utils.metrics import get_metrics, start_metrics_server
+
+if TYPE_CHECKING:
+    from agent.agent import IndustryAgent
+
+
+class AgentRuntime:
+    """进程级 Agent 运行时：一个常驻事件循环线程持有 Agent 及其全部异步资源。
+
+    OpenAI 客户端的 httpx 连接池、MCP 长连接和会话都绑定在这个循环上，因此能跨请求复用。
+    同步调用方（如 Streamlit 脚本线程）通过 `run` / `submit` / `stream` 线程安全地提交任务。
+    """
+
+    def __init__(self, agent_factory: Callable[[], "IndustryAgent"]):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="agent-runtime", daemon=True)
+        self._thread.start()
+        self._closed = False
+        self._warmup_task: asyncio.Task | None = None
+        # 在循环线程内构建 Agent，确保其异步资源从一开始就归属该循环
+        self.agent: "IndustryAgent" = self.run(self._create_agent(agent_factory))
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _create_agent(self, agent_factory: Callable[[], "IndustryAgent"]) -> "IndustryAgent":
+        agent = agent_factory()
+        # 预先启动 MCP 连接池和健康探测，首个请求无需等待握手
+        await agent.mcp_pool.start()
+        agent.health.start()
+        self._start_metrics_export(agent)
+        if agent.config.SESSION_IDLE_SECONDS > 0:
+            self._loop.create_task(self._evict_idle_sessions(agent, agent.config.SESSION_IDLE_SECONDS), name="session-evictor")
+        if agent.config.WARMUP_ENABLED:
+            # 后台预热，不阻塞运行时创建和页面渲染
+            self._warmup_task = self._loop.create_task(agent.warm_up(agent.config.WARMUP_QUERIES), name="agent-warmup")
+        return agent
+
+    def _start_metrics_export(self, agent: "IndustryAgent"):
+        config = agent.config
+        if config.METRICS_PORT:
+            try:
+                start_metrics_server(config.METRICS_PORT, config.METRICS_HOST)
+                agent.logger.log_interaction("system", "metrics", "endpoint_started", f"http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics")
+            except OSError as e:
+                agent.logger.log_interaction("system", "metrics", "error", f"Failed to start metrics endpoint: {e}")
+        if config.METRICS_FILE:
+            self._loop.create_task(self._write_metrics_file(config.METRICS_FILE, config.METRICS_FILE_INTERVAL))
+
+    async def _write_metrics_file(self, path: str, interval: float):
+        while True:
+            try:
+                await asyncio.to_thread(get_metrics().write_file, path)
+            except OSError:
+                pass
+            await asyncio.sleep(interval)
+
+    async def _evict_idle_sessions(self, agent: "IndustryAgent", idle_seconds: float):
+        """定期关闭空闲会话句柄；检查间隔为空闲阈值的四分之一，最长一分钟。"""
+        while True:
+            await asyncio.sleep(min(idle_seconds / 4, 60))
+            closed = agent.session_pool.evict_idle(idle_seconds)
+            if closed:
+                agent.logger.log_interaction("system", "session_pool", "idle_evicted", f"Closed {closed} idle sessions")
+
+    def submit(self, coro: Coroutine) -> "asyncio.Future":
+        """把协程提交到运行时循环，返回 `concurrent.futures.Future`。"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine, timeout: float | None = None) -> Any:
+        """提交协程并阻塞等待结果。"""
+        return self.submit(coro).result(timeout)
+
+    def stream(self, agen: AsyncIterator, timeout: float | None = None) -> Iterator:
+        """在运行时循环中消费异步生成器，以同步迭代器的形式逐个返回元素。"""
+        items: queue.Queue = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put(item)
+            except BaseException as e:
+                items.put(e)
+            finally:
+                await agen.aclose()
+                items.put(done)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item = items.get(timeout=timeout)
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # 调用方提前停止迭代时取消后台消费
+            future.cancel()
+
+    def close(self, timeout: float = 5.0):
+        if self._closed:
+            return
+        self._closed = True
+        if self._warmup_task is not None:
+            self._loop.call_soon_threadsafe(self._warmup_task.cancel)
+        try:
+            self.run(self.agent.aclose(), timeout=timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+
+_runtime: AgentRuntime | None = None
+_runtime_lock = threading.Lock()
+
+
+def get_agent_runtime(agent_factory: Callable[[], "IndustryAgent"]) -> AgentRuntime:
+    """返回进程内唯一的运行时，首次调用时用 `agent_factory` 创建 Agent。"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime(agent_factory)
+            atexit.register(_runtime.close)
+        return _runtime
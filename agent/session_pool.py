@@ -0,0 +1,192 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Callable
+
+from agents.memory import SQLiteSession
+
+
+class SessionPool:
+    """按 session_id 复用 `SQLiteSession` 句柄的会话池。
+
+    所有会话共用同一个 SQLite 文件，以 session_id 区分各自的历史。句柄按最近使用顺序保存，
+    超过 `max_sessions` 时淘汰最久未使用且当前没有查询在用的句柄（只关闭连接，历史仍保留在
+    数据库中，下次访问时重新打开）。同一 session_id 的查询通过 `lease` 依次执行。
+    句柄被淘汰（超出上限或空闲过久）时调用 `on_evict(session_id)`，调用方借此释放该会话的内存状态。
+    """
+
+    def __init__(self, db_path: str, max_sessions: int = 128, on_evict: Callable[[str], None] | None = None):
+        self.db_path = db_path
+        self.max_sessions = max_sessions
+        self.on_evict = on_evict
+        self._sessions: OrderedDict[str, SQLiteSession] = OrderedDict()
+        self._in_use: dict[str, int] = {}
+        self._last_used: dict[str, float] = {}
+        # 每个正在使用的 session_id 一把运行锁，没有查询占用或等待时删除
+        self._run_locks: dict[str, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id: str) -> SQLiteSession:
+        with self._lock:
+            return self._get_locked(session_id)
+
+    @asynccontextmanager
+    async def lease(self, session_id: str):
+        """在一次查询期间独占会话，期间该句柄不会被淘汰。
+
+        同一 session_id 的查询（如两个浏览器标签页共用一个会话）依次执行，保证检查点之后追加的
+        条目都属于本次运行，回滚时不会删掉另一次运行写入的历史。不可在同一会话的租约内再次租用。
+        """
+        with self._lock:
+            session = self._get_locked(session_id)
+            self._in_use[session_id] = self._in_use.get(session_id, 0) + 1
+            run_lock = self._run_locks.setdefault(session_id, asyncio.Lock())
+        try:
+            async with run_lock:
+                yield session
+        finally:
+            with self._lock:
+                self._in_use[session_id] -= 1
+                if not self._in_use[session_id]:
+                    del self._in_use[session_id]
+                    del self._run_locks[session_id]
+                self._last_used[session_id] = time.monotonic()
+
+    def evict_idle(self, idle_seconds: float) -> int:
+        """关闭空闲超过 `idle_seconds` 秒的句柄，返回关闭数量。"""
+        cutoff = time.monotonic() - idle_seconds
+        with self._lock:
+            idle = [sid for sid in self._sessions if sid not in self._in_use and self._last_used.get(sid, 0) < cutoff]
+            for session_id in idle:
+                self._evict_session_locked(session_id)
+            return len(idle)
+
+    def close_all(self):
+        with self._lock:
+            for session_id in list(self._sessions):
+                self._close_locked(session_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": len(self._sessions),
+                "in_use": len(self._in_use),
+                "evictions": self.evictions,
+            }
+
+    def _get_locked(self, session_id: str) -> SQLiteSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = SQLiteSession(session_id=session_id, db_path=self.db_path)
+            self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        self._last_used[session_id] = time.monotonic()
+        self._evict_locked()
+        return session
+
+    def _evict_locked(self):
+        if len(self._sessions) <= self.max_sessions:
+            return
+        # 最新访问的句柄（最后一个）刚被返回给调用方，不能淘汰
+        for session_id in list(self._sessions)[:-1]:
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if session_id not in self._in_use:
+                self._evict_session_locked(session_id)
+
+    def _evict_session_locked(self, session_id: str):
+        self._close_locked(session_id)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(session_id)
+
+    def _close_locked(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._last_used.pop(session_id, None)
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+@dataclass
+class SessionCheckpoint:
+    """会话历史在某一时刻的位置，用于出错时原地回滚本次运行追加的条目。"""
+    session_id: str
+    # 检查点时该会话最大的消息行 id（直接访问 SQLite 时使用）
+    last_row_id: int | None = None
+    # 检查点时的条目数（SDK 未暴露底层表时退化为按条目数 pop）
+    item_count: int | None = None
+
+
+# 退化路径只提示一次，避免每个查询都写一条警告
+_fallback_logged = False
+
+
+def _messages_table(session: SQLiteSession, logger=None):
+    """返回 (取连接函数, 消息表名, 锁)；SDK 版本不提供这些内部属性时返回 None。
+
+    这些是 `SQLiteSession` 的内部成员（requirements.txt 固定了验证过的 openai-agents 版本范围）。
+    取不到时退化为只用公开接口（读取全部历史计数、逐条 `pop_item`），并通过 `logger` 提示一次。
+    """
+    global _fallback_logged
+    get_connection = getattr(session, "_get_connection", None)
+    table = getattr(session, "messages_table", None)
+    lock = getattr(session, "_lock", None)
+    if get_connection is None or not table or lock is None:
+        if logger is not None and not _fallback_logged:
+            _fallback_logged = True
+            logger.log_interaction("agent", "session_pool", "warning",
+                                   f"{type(session).__name__} does not expose _get_connection/messages_table/_lock "
+                                   "(openai-agents version changed?); checkpoints fall back to reading the full history")
+        return None
+    return get_connection, table, lock
+
+
+async def checkpoint(session: SQLiteSession, logger=None) -> SessionCheckpoint:
+    """记录会话当前位置。只读一个最大行 id，不加载历史内容。"""
+    target = _messages_table(session, logger)
+    if target is None:
+        return SessionCheckpoint(session.session_id, item_count=len(await session.get_items()))
+    get_connection, table, lock = target
+
+    def read() -> int:
+        with lock:
+            row = get_connection().execute(
+                f"SELECT COALESCE(MAX(id), 0) FROM {table} WHERE session_id = ?", (session.session_id,)
+            ).fetchone()
+        return row[0]
+
+    return SessionCheckpoint(session.session_id, last_row_id=await asyncio.to_thread(read))
+
+
+async def rollback(session: SQLiteSession, point: SessionCheckpoint, logger=None) -> int:
+    """删除检查点之后追加到会话中的条目，返回删除数量；之前的历史保持不变。
+
+    调用方须在 `SessionPool.lease` 内使用，否则会连同其他运行在检查点之后写入的条目一起删除。
+    """
+    target = _messages_table(session, logger)
+    if point.last_row_id is None or target is None:
+        removed = 0
+        count = len(await session.get_items())
+        while count - removed > (point.item_count or 0):
+            if await session.pop_item() is None:
+                break
+            removed += 1
+        return removed
+    get_connection, table, lock = target
+
+    def delete() -> int:
+        with lock:
+            connection = get_connection()
+            cursor = connection.execute(
+                f"DELETE FROM {table} WHERE session_id = ? AND id > ?", (session.session_id, point.last_row_id)
+            )
+            connection.commit()
+        return cursor.rowcount
+
+    return await asyncio.to_thread(delete)
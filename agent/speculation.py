@@ -0,0 +1,116 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+from agent.tool_cache import ToolResultCache
+from agent.workflow import WorkflowError, evaluate_condition, parse_tool_output, resolve_bindings
+from utils.logger import InteractionLogger
+
+
+def predict_followups(workflows: Iterable[dict], server_name: str, tool_name: str, output: str) -> list[tuple[str, str, Any]]:
+    """根据技能工作流的声明，预测某个工具返回后模型接下来会发起的调用。
+
+    在声明了该工具的工作流中，只用这一步的结果作为作用域解析后续步骤：绑定能完整解析且
+    `when` 条件成立的步骤即为预测结果。依赖意图或其他步骤结果的步骤无法预测，直接跳过。
+    """
+    predictions = []
+    parsed = parse_tool_output(output)
+    for workflow in workflows:
+        steps = workflow.get("steps", [])
+        for index, step in enumerate(steps):
+            if step["server"] != server_name or step["tool"] != tool_name:
+                continue
+            scope = {"steps": {step["id"]: parsed}}
+            for follow in steps[index + 1:]:
+                try:
+                    if not evaluate_condition(follow.get("when"), scope):
+                        continue
+                    arguments = resolve_bindings(follow.get("arguments", {}), scope)
+                except WorkflowError:
+                    continue
+                prediction = (follow["server"], follow["tool"], arguments)
+                if prediction not in predictions:
+                    predictions.append(prediction)
+    return predictions
+
+
+class SpeculativeExecutor:
+    """投机执行预测的后续工具调用。
+
+    触发工具返回后立即在后台发起预测的调用，与模型决定下一步的那一轮推理重叠；模型随后发起
+    参数相同的调用时直接复用这个进行中的任务。超过 `ttl` 秒仍未被取用的任务会被丢弃（未完成的
+    直接取消）。任务绑定在发起它的事件循环上，换了循环的调用方不会取到它。
+    """
+
+    def __init__(
+        self,
+        logger: InteractionLogger,
+        invoke: Callable[[str, str, Any], Awaitable[str]],
+        ttl: float = 30.0,
+        max_pending: int = 8,
+    ):
+        self.logger = logger
+        self.invoke = invoke
+        self.ttl = ttl
+        self.max_pending = max_pending
+
+        self._pending: dict[tuple, tuple[float, asyncio.Task]] = {}
+        self.launched = 0
+        self.hits = 0
+        self.discarded = 0
+
+    def speculate(self, server_name: str, tool_name: str, arguments: Any) -> bool:
+        """在当前事件循环中后台发起调用；已在进行或达到并发上限时不重复发起。"""
+        self._expire()
+        key = ToolResultCache.make_key(server_name, tool_name, arguments)
+        if key in self._pending or len(self._pending) >= self.max_pending:
+            return False
+        task = asyncio.get_running_loop().create_task(
+            self.invoke(server_name, tool_name, arguments), name=f"speculate-{server_name}.{tool_name}"
+        )
+        # 未被取用的任务也要取走异常，避免 "Task exception was never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._pending[key] = (time.monotonic() + self.ttl, task)
+        self.launched += 1
+        self.logger.log_interaction("agent", "speculation", f"launched: {server_name}.{tool_name}", f"arguments: {arguments}")
+        return True
+
+    def take(self, server_name: str, tool_name: str, arguments: Any) -> asyncio.Task | None:
+        """取出与本次调用参数相同、仍有效的投机任务；没有时返回 None。"""
+        self._expire()
+        key = ToolResultCache.make_key(server_name, tool_name, arguments)
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            return None
+        task = entry[1]
+        if task.get_loop() is not asyncio.get_running_loop():
+            self._discard(task)
+            return None
+        self.hits += 1
+        self.logger.log_interaction("agent", "speculation", f"hit: {server_name}.{tool_name}", f"arguments: {arguments}")
+        return task
+
+    def cancel_all(self):
+        for _, task in self._pending.values():
+            self._discard(task)
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "launched": self.launched,
+            "hits": self.hits,
+            "discarded": self.discarded,
+        }
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, (deadline, _) in self._pending.items() if deadline <= now]:
+            self._discard(self._pending.pop(key)[1])
+
+    def _discard(self, task: asyncio.Task):
+        self.discarded += 1
+        loop = task.get_loop()
+        if not task.done() and not loop.is_closed():
+            # 跨循环取消必须交给任务所属的循环执行
+            loop.call_soon_threadsafe(task.cancel)
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class ToolResultCache:
+    """MCP 工具调用结果缓存（TTL + LRU）。
+
+    键为 `(server_name, tool_name, 规范化参数)`，参数按 key 排序后序列化，
+    因此 `{"a": 1, "b": 2}` 与 `{"b": 2, "a": 1}` 命中同一条记录。
+    非确定性工具可以通过 `exclude_tools` 关闭缓存，或将其 TTL 设为 0。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        default_ttl: float = 60.0,
+        tool_ttls: dict[str, float] | None = None,
+        exclude_tools: set[str] | None = None,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.tool_ttls = tool_ttls or {}
+        self.exclude_tools = exclude_tools or set()
+
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(server_name: str, tool_name: str, arguments: Any) -> tuple:
+        canonical = json.dumps(arguments, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return (server_name, tool_name, canonical)
+
+    def ttl_for(self, tool_name: str) -> float:
+        if tool_name in self.exclude_tools:
+            return 0
+        return self.tool_ttls.get(tool_name, self.default_ttl)
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return self.max_entries > 0 and self.ttl_for(tool_name) > 0
+
+    def get(self, server_name: str, tool_name: str, arguments: Any) -> Any | None:
+        """返回未过期的缓存值，未命中返回 None。"""
+        if not self.is_cacheable(tool_name):
+            return None
+        key = self.make_key(server_name, tool_name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, server_name: str, tool_name: str, arguments: Any, value: Any):
+        ttl = self.ttl_for(tool_name)
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        key = self.make_key(server_name, tool_name, arguments)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, server_name: str | None = None, tool_name: str | None = None):
+        """按服务器/工具清除缓存；不传参数时清空全部。"""
+        with self._lock:
+            if server_name is None and tool_name is None:
+                self._entries.clear()
+                return
+            for key in list(self._entries):
+                if (server_name is None or key[0] == server_name) and (tool_name is None or key[1] == tool_name):
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
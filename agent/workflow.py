@@ -0,0 +1,151 @@
+import json
+import re
+import unicodedata
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+_BINDING_RE = re.compile(r"\$\{([^}]+)\}")
+
+_OPERATORS = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+
+class WorkflowError(Exception):
+    """技能工作流无法执行（绑定缺失、条件非法等），调用方应回退到模型驱动的流程。"""
+
+
+def lookup(scope: dict, path: str) -> Any:
+    """按点号路径取值，如 `steps.industry.annual_output`。"""
+    value: Any = scope
+    for part in path.strip().split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            raise WorkflowError(f"无法解析绑定 '${{{path}}}'")
+    return value
+
+
+def resolve_bindings(template: Any, scope: dict) -> Any:
+    """递归替换 `${path}` 绑定。整串为单个绑定时保留原始类型（数字仍是数字）。"""
+    if isinstance(template, str):
+        whole = _BINDING_RE.fullmatch(template)
+        if whole:
+            return lookup(scope, whole.group(1))
+        return _BINDING_RE.sub(lambda m: str(lookup(scope, m.group(1))), template)
+    if isinstance(template, dict):
+        return {key: resolve_bindings(value, scope) for key, value in template.items()}
+    if isinstance(template, list):
+        return [resolve_bindings(value, scope) for value in template]
+    return template
+
+
+def evaluate_condition(condition: dict | None, scope: dict) -> bool:
+    """`{"value": "${...}", "op": ">", "threshold": 1000}`；无条件时恒为真。"""
+    if not condition:
+        return True
+    op = condition.get("op", "==")
+    if op not in _OPERATORS:
+        raise WorkflowError(f"不支持的条件运算符 '{op}'")
+    value = resolve_bindings(condition.get("value"), scope)
+    threshold = resolve_bindings(condition.get("threshold"), scope)
+    try:
+        return _OPERATORS[op](value, threshold)
+    except TypeError as e:
+        raise WorkflowError(f"条件无法比较: {value!r} {op} {threshold!r}") from e
+
+
+def fold_text(text: str) -> str:
+    """全角转半角并转小写，保留空白和标点（词边界判断依赖它们）。"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+class AliasMatcher:
+    """在查询中查找别名并映射到规范值，工作流意图识别与回答缓存共用。
+
+    文本与别名都先经 `fold_text` 处理；纯 ASCII 别名只在词边界处匹配，避免 `it` 命中 `city`、`with`，
+    中文别名按子串匹配。多个别名重叠时优先最长的。
+    """
+
+    def __init__(self, aliases: dict[str, str]):
+        self.aliases = {fold_text(alias).strip(): value for alias, value in aliases.items() if alias.strip()}
+        patterns = []
+        for alias in sorted(self.aliases, key=len, reverse=True):
+            escaped = re.escape(alias)
+            patterns.append(rf"(?<![a-z0-9]){escaped}(?![a-z0-9])" if alias.isascii() else escaped)
+        self._pattern = re.compile("|".join(patterns)) if patterns else None
+
+    def finditer(self, text: str):
+        """按出现顺序产出 (start, end, 规范值)；`text` 须已经过 `fold_text`。"""
+        if self._pattern is None:
+            return
+        for match in self._pattern.finditer(text):
+            yield match.start(), match.end(), self.aliases[match.group(0)]
+
+    def values(self, text: str) -> set:
+        return {value for _, _, value in self.finditer(fold_text(text))}
+
+
+def match_intent(workflow: dict, query: str) -> tuple[bool, dict]:
+    """用工作流声明的触发词和别名做零成本意图识别。
+
+    返回 (是否适用, 已识别的槽位)。槽位不全时调用方可再交给模型补全。
+    同一槽位命中多个不同取值（如对比多个行业）或问题包含 `exclude` 中的词（如趋势、排名）时
+    工作流不适用，交给模型选择其他工具。
+    """
+    excludes = workflow.get("exclude", [])
+    if AliasMatcher({word: word for word in excludes}).values(query):
+        return False, {}
+    slots = {}
+    for slot, spec in workflow.get("intent", {}).items():
+        values = AliasMatcher(spec.get("aliases", {})).values(query)
+        if len(values) > 1:
+            return False, {}
+        if values:
+            slots[slot] = values.pop()
+    triggers = workflow.get("triggers", [])
+    applicable = bool(slots) or bool(AliasMatcher({trigger: trigger for trigger in triggers}).values(query))
+    return applicable, slots
+
+
+def missing_slots(workflow: dict, slots: dict) -> list[str]:
+    return [
+        slot for slot, spec in workflow.get("intent", {}).items()
+        if spec.get("required") and slots.get(slot) in (None, "")
+    ]
+
+
+def parse_tool_output(output: str) -> Any:
+    """工具输出优先按 JSON 解析，否则保留为文本。"""
+    try:
+        return json.loads(output)
+    except (TypeError, ValueError):
+        return {"text": output}
+
+
+class WorkflowEngine:
+    """按技能声明的步骤直接执行工具链，不经过模型决策。
+
+    每个步骤：`{"id", "server", "tool", "arguments", "when"?}`。参数中的 `${intent.x}` /
+    `${steps.<id>.<field>}` 在执行前解析；`when` 不满足时跳过该步骤。
+    """
+
+    def __init__(self, call_tool: Callable[[str, str, Any], Awaitable[str]]):
+        self.call_tool = call_tool
+
+    async def run(self, workflow: dict, scope: dict) -> AsyncIterator[dict]:
+        """执行工作流，边执行边产出 tool_call / tool_output 事件；结果写入 `scope["steps"]`。"""
+        scope.setdefault("steps", {})
+        for step in workflow.get("steps", []):
+            step_id = step["id"]
+            if not evaluate_condition(step.get("when"), scope):
+                continue
+            arguments = resolve_bindings(step.get("arguments", {}), scope)
+            yield {"type": "tool_call", "name": f"{step['server']}.{step['tool']}", "arguments": json.dumps(arguments, ensure_ascii=False)}
+            output = await self.call_tool(step["server"], step["tool"], arguments)
+            scope["steps"][step_id] = parse_tool_output(output)
+            yield {"type": "tool_output", "name": f"{step['server']}.{step['tool']}", "output": output}
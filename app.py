@@ -1,14 +1,13 @@
 import streamlit as st
-import asyncio
 import os
 import random
-import requests
 import uuid
 import subprocess # For local openskills CLI interaction
 
-from agent.agent import IndustryAgent
 from utils.config import Config
 from utils.logger import InteractionLogger
+from utils.skill_registry import get_skill_registry
+from utils.metrics import get_metrics
 
 # Environment detection
 IS_STREAMLIT_CLOUD = os.getenv("STREAMLIT_CLOUD", "false").lower() == "true"
@@ -94,19 +93,14 @@ def _generate_skills_prompt(existing_agents_md_path, dynamic_skills_dict, is_clo
     combined_skills_xml = ""
     logger = InteractionLogger(Config().LOG_PATH)
     
-    # Add existing skills from AGENTS.md
+    # Add existing skills from AGENTS.md (parsed once and cached by the skill registry)
     if os.path.exists(existing_agents_md_path):
         logger.log_interaction("system", "agent", "loading_skills", f"Reading skills from {existing_agents_md_path}")
-        with open(existing_agents_md_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            # Extract content between <available_skills> tags
-            start_tag = "<available_skills>"
-            end_tag = "</available_skills>"
-            start_index = content.find(start_tag)
-            end_index = content.find(end_tag)
-            if start_index != -1 and end_index != -1:
-                combined_skills_xml += content[start_index + len(start_tag):end_index].strip()
-                logger.log_interaction("system", "agent", "skills_loaded", "Successfully loaded skills from AGENTS.md")
+        registry = get_skill_registry(os.path.dirname(existing_agents_md_path))
+        skills_xml = registry.agents_md_skills_xml()
+        if skills_xml:
+            combined_skills_xml += skills_xml
+            logger.log_interaction("system", "agent", "skills_loaded", "Successfully loaded skills from AGENTS.md")
     else:
         logger.log_interaction("system", "agent", "warning", f"AGENTS.md not found at {existing_agents_md_path}")
     
@@ -134,10 +128,22 @@ def log_once(sender, receiver, content, msg_type="info"):
 
 @st.cache_resource
 def ensure_mcp_servers_running():
-    """Starts the MCP servers using subprocess, ensuring global singleton execution."""
+    """Starts the MCP servers in parallel, ensuring global singleton execution.
+
+    Servers already listening on their configured port are left alone. Readiness is
+    polled with a short backoff in a background thread, so the agent (and its heavy
+    imports) can be initialised while the servers boot; the connection pool retries
+    until they accept connections.
+    """
     import sys
+    import threading
     import time
+    from utils.mcp_launcher import MCPServerSpec, launch_mcp_servers, wait_until_ready
     config = Config()
+    if config.MCP_TRANSPORT == "inprocess":
+        # 服务在 Agent 进程内挂载，无需启动子进程
+        log_once("system", "mcp_server", "MCP transport is inprocess. Skipping server startup.", "info")
+        return True
     # Using local logger for process-level events
     logger = InteractionLogger(config.LOG_PATH)
     cwd = os.getcwd()
@@ -163,62 +169,56 @@ def ensure_mcp_servers_running():
         os.makedirs(log_dir)
     
     mcp_log_path = os.path.join(log_dir, "mcp_startup.log")
-    
-    # Helper to check if a port is in use
-    import socket
-    def is_port_in_use(port):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(0.1)
-            return s.connect_ex(('127.0.0.1', port)) == 0
-
-    def kill_port_process(port):
-        try:
-            # macOS command to kill process on port
-            subprocess.run(f"lsof -ti:{port} | xargs kill -9", shell=True, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
-            time.sleep(0.5) # Wait for release
-        except:
-            pass
-
-    # Start servers
-    for name, port, script_rel_path in [
-        ("Industry Query", 8001, "mcp_servers/industry_query/server.py"),
-        ("Deep Analysis", 8002, "mcp_servers/deep_analysis/server.py")
-    ]:
-        # 1. 检查端口是否已被占用
-        if is_port_in_use(port):
-            log_once("system", "mcp_server", f"{name} MCP Server already running on port {port}. Skipping startup.", "info")
-            continue
-
-        # 2. 如果未运行，尝试新启
-        # 确保没有残留进程占用端口（虽然上面检查了，但为了保险起见，可以尝试清理一下）
-        kill_port_process(port)
-        
-        script_path = os.path.join(cwd, script_rel_path)
-        try:
-            with open(mcp_log_path, "a") as log_file:
-                log_file.write(f"\n--- Starting {name} Server at {uuid.uuid4()} ---\n")
-                subprocess.Popen([python_exec, script_path], 
-                                 stdout=log_file, 
-                                 stderr=log_file,
-                                 cwd=cwd)
-            
-            # 多轮循环等待启动成功（最多 5 秒）
-            success = False
-            for _ in range(5):
-                time.sleep(1)
-                if is_port_in_use(port):
-                    success = True
-                    break
-            
-            if success:
-                log_once("system", "mcp_server", f"{name} MCP Server started on port {port}", "started")
+
+    # 端口取自 Config，并通过环境变量传给服务进程
+    specs = [
+        MCPServerSpec("industry_query", "Industry Query", config.MCP_TOURISM_QUERY_PORT, "mcp_servers/industry_query/server.py", "MCP_TOURISM_QUERY_PORT"),
+        MCPServerSpec("deep_analysis", "Deep Analysis", config.MCP_DEEP_ANALYSIS_PORT, "mcp_servers/deep_analysis/server.py", "MCP_DEEP_ANALYSIS_PORT"),
+    ]
+    try:
+        processes = launch_mcp_servers(specs, python_exec, cwd, mcp_log_path)
+    except Exception as e:
+        logger.log_interaction("system", "mcp_server", "error", f"Failed to launch MCP Servers: {e}")
+        return False
+
+    started = [spec for spec in specs if processes.get(spec.name) is not None]
+    for spec in specs:
+        if processes.get(spec.name) is None:
+            log_once("system", "mcp_server", f"{spec.label} MCP Server already running on port {spec.port}. Skipping startup.", "info")
+
+    def report_readiness():
+        start = time.monotonic()
+        states = wait_until_ready({spec.name: spec.port for spec in started}, processes, timeout=config.MCP_STARTUP_TIMEOUT)
+        elapsed = time.monotonic() - start
+        for spec in started:
+            state = states.get(spec.name)
+            if state == "ready":
+                logger.log_interaction("system", "mcp_server", "started", f"{spec.label} MCP Server ready on port {spec.port} ({elapsed:.2f}s)")
             else:
-                log_once("system", "mcp_server", f"{name} MCP Server timeout (5s) on port {port}. Please check logs/mcp_startup.log", "warning")
-        except Exception as e:
-            logger.log_interaction("system", "mcp_server", "error", f"Failed to launch {name} MCP Server: {e}")
-    
+                logger.log_interaction("system", "mcp_server", "warning", f"{spec.label} MCP Server {state} on port {spec.port}. Please check logs/mcp_startup.log")
+
+    if started:
+        threading.Thread(target=report_readiness, name="mcp-startup", daemon=True).start()
     return True
 
+@st.cache_resource
+def get_runtime():
+    """Process-wide runtime: one event-loop thread owning the shared agent, its OpenAI
+    client, MCP connections and sessions. Browser sessions are isolated by session_id."""
+    # 在 MCP 服务启动之后才导入 Agent 模块，服务进程的启动与约 2 秒的 SDK 导入重叠（导入本身仍发生在首次运行脚本时）
+    from agent.agent import IndustryAgent
+    from agent.runtime import get_agent_runtime
+    initial_combined_skills_prompt = _generate_skills_prompt(
+        os.path.join(Config().SKILLS_PATH, "AGENTS.md"),
+        {},
+        IS_STREAMLIT_CLOUD
+    )
+    return get_agent_runtime(lambda: IndustryAgent(
+        initial_skills_system_prompt=initial_combined_skills_prompt,
+        dynamic_skills_dict={},
+        auto_reset=True
+    ))
+
 # Initialize Session State
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -230,19 +230,18 @@ if "dynamic_skills" not in st.session_state:
 ensure_mcp_servers_running()
 
 
+if "session_id" not in st.session_state:
+    # 每个浏览器会话独立的对话 ID，对应 SQLite 中独立的历史记录
+    st.session_state.session_id = f"web-{uuid.uuid4().hex}"
+
+if "skills_prompt" not in st.session_state:
+    # 仅云端动态技能需要会话级覆盖；本地技能写入 AGENTS.md，对所有会话生效
+    st.session_state.skills_prompt = None
+
 if "agent" not in st.session_state:
     with st.spinner("正在初始化智能体..."):
-        # Generate the combined skills prompt for initial agent setup
-        initial_combined_skills_prompt = _generate_skills_prompt(
-            os.path.join(Config().SKILLS_PATH, "AGENTS.md"),
-            st.session_state.dynamic_skills,
-            IS_STREAMLIT_CLOUD
-        )
-        st.session_state.agent = IndustryAgent(
-            initial_skills_system_prompt=initial_combined_skills_prompt,
-            dynamic_skills_dict=st.session_state.dynamic_skills if IS_STREAMLIT_CLOUD else {},
-            auto_reset=True
-        )
+        st.session_state.runtime = get_runtime()
+        st.session_state.agent = st.session_state.runtime.agent
 
 if "logger" not in st.session_state:
     config = Config()
@@ -254,28 +253,69 @@ def status_monitor():
     """独立的 MCP 状态监控组件，每3秒自动刷新"""
     st.subheader("🖥️ 实时监控")
     
-    # MCP Status in Monitor area
+    # MCP Status in Monitor area：读取进程级健康探测的缓存结果，不在页面刷新时发起探测
     status_container = st.container()
     with status_container:
-        m1, m2 = st.columns(2)
-        tourism_status = check_mcp_status(8001)
-        deep_status = check_mcp_status(8002)
-        with m1:
-            st.metric("行业查询", "运行中" if tourism_status else "已停止")
-        with m2:
-            st.metric("深度分析", "运行中" if deep_status else "已停止")
+        health = st.session_state.agent.health.snapshot()
+        for column, (name, label) in zip(st.columns(2), [("industry_query", "行业查询"), ("deep_analysis", "深度分析")]):
+            state = health.get(name, {})
+            with column:
+                if state.get("up") is None:
+                    st.metric(label, "检测中")
+                elif state["up"]:
+                    availability = state["availability"]
+                    st.metric(label, "运行中", f"{state['latency_ms']:.0f} ms · 可用率 {availability:.0%}", delta_color="off")
+                else:
+                    st.metric(label, "已停止", state.get("error") or "", delta_color="off")
+
+    if st.session_state.agent.warmup_status["state"] == "running":
+        st.caption("⏳ 正在预热模型与 MCP 连接…")
+
+    # 性能指标摘要（完整数据见 /metrics 端点）
+    metrics = get_metrics()
+    metrics.collect()
+    query_seconds = metrics.histogram("agent_query_seconds")
+    _, query_total, query_count = query_seconds.snapshot()
+    p95 = query_seconds.quantile(0.95)
+    model_p95 = metrics.histogram("agent_model_call_seconds").quantile(0.95)
+    tool_p95 = metrics.histogram("agent_mcp_tool_seconds").quantile(0.95)
+    tokens = metrics.counter("agent_model_tokens_total").total()
+    cache_hit_rate = metrics.gauge("agent_tool_cache_hit_rate").value()
+    q1, q2, q3 = st.columns(3)
+    with q1:
+        st.metric("查询数", int(query_count))
+        st.metric("Token 用量", int(tokens))
+    with q2:
+        st.metric("平均耗时", f"{query_total / query_count:.1f}s" if query_count else "-")
+        st.metric("模型 P95", f"{model_p95:.2f}s" if model_p95 is not None else "-")
+    with q3:
+        st.metric("查询 P95", f"{p95:.1f}s" if p95 is not None else "-")
+        st.metric("工具 P95 / 缓存命中", f"{tool_p95:.2f}s / {cache_hit_rate:.0%}" if tool_p95 is not None else "-")
     st.markdown("---")
 
 @st.fragment(run_every=1)
 def log_viewer():
     """独立的日志查看组件，每1秒自动刷新一次"""
     st.subheader("📜 交互日志")
-    logs = st.session_state.logger.read_logs()
-    
-    # 使用 HTML/CSS 渲染日志，避免 st.text_area 的状态问题
-    # 对 logs 进行简单的 HTML 转义，防止 HTML 注入
     import html
-    safe_logs = html.escape(logs).replace("\n", "<br>")
+    from collections import deque
+
+    # 按字节偏移增量读取日志文件（包括 MCP 子进程写入的行），只对新读到的行做 HTML 转义
+    logger = st.session_state.logger
+    max_lines = Config().LOG_VIEWER_MAX_LINES
+    if "log_view_lines" not in st.session_state:
+        st.session_state.log_view_lines = deque(maxlen=max_lines)
+        st.session_state.log_view_offset = logger.tail_start()
+    while True:
+        text, offset = logger.tail(st.session_state.log_view_offset)
+        st.session_state.log_view_offset = offset
+        if not text:
+            break
+        for line in text.splitlines():
+            st.session_state.log_view_lines.append(html.escape(line))
+
+    # 使用 HTML/CSS 渲染日志，避免 st.text_area 的状态问题；最多渲染最近 max_lines 行
+    safe_logs = "<br>".join(st.session_state.log_view_lines)
     
     st.markdown(f"""
         <div class="log-container">{safe_logs}</div>
@@ -289,19 +329,29 @@ def log_viewer():
     """, unsafe_allow_html=True)
 
 # Helper Functions
-def check_mcp_status(port):
-    import socket
-    for host in ['127.0.0.1', 'localhost']:
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(0.2)
-                if s.connect_ex((host, port)) == 0:
-                    return True
-        except:
-            continue
-    return False
-
-
+def _stream_response(placeholder, prompt):
+    """Consumes the agent event stream, showing tool progress and answer tokens as they arrive."""
+    steps = []
+    text = ""
+    for event in st.session_state.runtime.stream(st.session_state.agent.process_query_stream(
+        prompt,
+        session_id=st.session_state.session_id,
+        skills_prompt=st.session_state.skills_prompt
+    )):
+        if event["type"] == "tool_call":
+            # 工具调用前的文本只是中间过程，新一轮从头显示
+            text = ""
+            steps.append(f"🔧 *调用工具 `{event['name']}`...*")
+            placeholder.markdown("  \n".join(steps))
+        elif event["type"] == "tool_output":
+            steps[-1:] = [f"✅ *工具 `{event['name']}` 已返回*"] if steps else []
+            placeholder.markdown("  \n".join(steps) + "  \n⏳ *思考中...*")
+        elif event["type"] == "delta":
+            text += event["text"]
+            placeholder.markdown(text + "▌")
+        elif event["type"] == "final":
+            text = event["text"]
+    return text
 
 def _add_random_skill_in_memory():
     skill_id = str(uuid.uuid4())
@@ -326,17 +376,13 @@ def _add_random_skill_in_memory():
     }
     st.success(f"已添加动态技能: {skill_name}")
     
-    # Update existing agent with new skills
+    # Dynamic skills belong to this browser session only; the shared agent reads them per query
     with st.spinner("正在同步新技能..."):
-        combined_skills_prompt = _generate_skills_prompt(
+        st.session_state.skills_prompt = _generate_skills_prompt(
             os.path.join(Config().SKILLS_PATH, "AGENTS.md"),
             st.session_state.dynamic_skills,
             IS_STREAMLIT_CLOUD
         )
-        st.session_state.agent.update_skills(
-            new_skills_prompt=combined_skills_prompt,
-            new_dynamic_skills=st.session_state.dynamic_skills
-        )
     st.rerun()
 
 def _add_random_skill_local():
@@ -389,6 +435,8 @@ def _add_random_skill_local():
                 st.error(f"openskills sync failed: {e.stderr}")
             except FileNotFoundError:
                 st.error("openskills CLI tool not found. Please install it globally (npm install -g openskills).")
+            # 不等下一次定期检查，立即让注册表看到新技能和新的 AGENTS.md
+            get_skill_registry(Config().SKILLS_PATH).invalidate()
             
             # Update existing agent with new skills
             with st.spinner("正在同步新技能..."):
@@ -397,10 +445,17 @@ def _add_random_skill_local():
                     st.session_state.dynamic_skills,
                     IS_STREAMLIT_CLOUD
                 )
-                st.session_state.agent.update_skills(
-                    new_skills_prompt=combined_skills_prompt,
-                    new_dynamic_skills=st.session_state.dynamic_skills
-                )
+                agent = st.session_state.agent
+                dynamic_skills = st.session_state.dynamic_skills
+
+                # agent 归运行时循环所有，在循环线程中更新，避免与进行中的查询并发修改状态
+                async def _update_skills():
+                    agent.update_skills(
+                        new_skills_prompt=combined_skills_prompt,
+                        new_dynamic_skills=dynamic_skills
+                    )
+
+                st.session_state.runtime.run(_update_skills())
             st.rerun()
         else:
             st.error("Invalid AGENTS.md format: Missing </available_skills> tag.")
@@ -473,8 +528,15 @@ with col_chat:
                 with resp_placeholder.container():
                     st.markdown("⏳ *思考中...*")
                 
-                # Run agent
-                response = asyncio.run(st.session_state.agent.process_query(prompt))
+                # Run agent on the persistent runtime loop (no per-request event loop)
+                if Config().STREAM_RESPONSES:
+                    response = _stream_response(resp_placeholder, prompt)
+                else:
+                    response = st.session_state.runtime.run(st.session_state.agent.process_query(
+                        prompt,
+                        session_id=st.session_state.session_id,
+                        skills_prompt=st.session_state.skills_prompt
+                    ))
                 
                 # Final display
                 resp_placeholder.markdown(response)
@@ -498,19 +560,15 @@ with st.sidebar:
                 st.code(skill_data['name'])
     else:
         st.markdown("### 本地技能")
-        agents_file = os.path.join(Config().SKILLS_PATH, "AGENTS.md")
-        if os.path.exists(agents_file):
-            with open(agents_file, "r", encoding="utf-8") as f:
-                content = f.read()
-                import re
-                skill_names = re.findall(r'<name>(.*?)</name>', content)
-                if skill_names:
-                    for name in skill_names:
-                        st.code(name)
+        # 从内存注册表读取，AGENTS.md 仅在 mtime/size 变化时重新解析
+        skill_names = get_skill_registry(Config().SKILLS_PATH).agents_md_skill_names()
+        for name in skill_names:
+            st.code(name)
         
     st.markdown("### 已加载技能")
-    if hasattr(st.session_state.agent, 'loaded_skills') and st.session_state.agent.loaded_skills:
-        for skill in st.session_state.agent.loaded_skills:
+    loaded_skills = st.session_state.agent.get_loaded_skills(st.session_state.session_id)
+    if loaded_skills:
+        for skill in loaded_skills:
             st.code(skill)
     else:
         st.write("尚未加载。")
@@ -0,0 +1,204 @@
+"""并发压测：以泊松到达的开环负载驱动多个会话，逐级提高到达率以找到饱和点。
+
+用法（在仓库根目录）::
+
+    python -m benchmarks.load --users 200 --rates 5,10,20,40,80 --duration 30 \\
+        --mix low_output=0.5,deep_analysis=0.3,comparative=0.2 --output logs/load.json
+
+每一级输出实际吞吐量、耗时分位数、错误率（按类型）、重试次数、最大并发数以及会话池/缓存统计。
+实际吞吐量低于到达率的 `--min-throughput-ratio`、错误率超过 `--max-error-rate` 或 P95 超过
+`--slo-p95` 的第一级即视为饱和，之前一级的到达率为可持续的最大负载。
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from benchmarks.run import ERROR_PREFIXES, MODES, SCENARIOS, git_commit
+from benchmarks.stack import REPO_ROOT, LocalStack, create_agent
+from benchmarks.stats import summarize_latencies
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"未知场景 '{name}'，可选: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def run_step(agent, rate: float, duration: float, users: int, mix: dict[str, float], timeout: float,
+                   rng: random.Random) -> dict:
+    """以 `rate` 次/秒的泊松到达持续 `duration` 秒发起查询，等待全部完成后汇总。"""
+    from agent.agent import RETRIES
+
+    names, weights = list(mix), list(mix.values())
+    outcomes: list[tuple[str, str, float]] = []
+    inflight = peak = 0
+    retries_before = RETRIES.total()
+
+    async def one(scenario: str, user: int):
+        nonlocal inflight, peak
+        inflight += 1
+        peak = max(peak, inflight)
+        start = time.perf_counter()
+        try:
+            output = await asyncio.wait_for(
+                agent.process_query(SCENARIOS[scenario], session_id=f"load-user-{user}"), timeout
+            )
+            kind = "error_response" if str(output).startswith(ERROR_PREFIXES) else "ok"
+        except asyncio.TimeoutError:
+            kind = "timeout"
+        except Exception as e:
+            kind = type(e).__name__
+        finally:
+            inflight -= 1
+        outcomes.append((scenario, kind, time.perf_counter() - start))
+
+    tasks = []
+    started = time.perf_counter()
+    next_arrival = started
+    while True:
+        next_arrival += rng.expovariate(rate)
+        if next_arrival - started >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        tasks.append(asyncio.create_task(one(rng.choices(names, weights)[0], rng.randrange(users))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    ok = [latency for _, kind, latency in outcomes if kind == "ok"]
+    errors: dict[str, int] = {}
+    for _, kind, _ in outcomes:
+        if kind != "ok":
+            errors[kind] = errors.get(kind, 0) + 1
+    by_scenario = {
+        name: summarize_latencies([latency for scenario, kind, latency in outcomes if scenario == name and kind == "ok"])
+        for name in names
+    }
+    return {
+        "offered_rate": rate,
+        "arrivals": len(outcomes),
+        "completed_ok": len(ok),
+        # 含排空时间：到达停止后仍需等待在途查询完成
+        "throughput_qps": round(len(ok) / elapsed, 3) if elapsed > 0 else None,
+        "elapsed_seconds": round(elapsed, 3),
+        "latency_seconds": summarize_latencies(ok),
+        "latency_by_scenario": by_scenario,
+        "error_rate": round(1 - len(ok) / len(outcomes), 4) if outcomes else 0.0,
+        "errors": errors,
+        "retries": RETRIES.total() - retries_before,
+        "peak_in_flight": peak,
+        "session_pool": agent.session_pool.stats(),
+        "tool_cache": agent.tool_cache.stats(),
+    }
+
+
+def is_saturated(step: dict, min_throughput_ratio: float, max_error_rate: float, slo_p95: float | None) -> list[str]:
+    """返回该级判定为饱和的原因，未饱和时为空列表。"""
+    reasons = []
+    if step["arrivals"] and step["throughput_qps"] < step["offered_rate"] * min_throughput_ratio:
+        reasons.append("throughput")
+    if step["error_rate"] > max_error_rate:
+        reasons.append("errors")
+    p95 = step["latency_seconds"]["p95"]
+    if slo_p95 is not None and (p95 is None or p95 > slo_p95):
+        reasons.append("latency")
+    return reasons
+
+
+async def run_load(args, mix: dict[str, float]) -> dict:
+    agent = create_agent()
+    agent.config.WORKFLOW_ENABLED = args.mode == "workflow"
+    rng = random.Random(args.seed)
+    steps, saturation = [], None
+    try:
+        for rate in args.rates:
+            step = await run_step(agent, rate, args.duration, args.users, mix, args.timeout, rng)
+            step["saturated_by"] = is_saturated(step, args.min_throughput_ratio, args.max_error_rate, args.slo_p95)
+            steps.append(step)
+            print(f"rate={rate:<6g} ok={step['completed_ok']}/{step['arrivals']} thr={step['throughput_qps']}/s "
+                  f"p95={step['latency_seconds']['p95']}s p99={step['latency_seconds']['p99']}s "
+                  f"err={step['error_rate']:.1%} peak={step['peak_in_flight']} {step['saturated_by'] or ''}", file=sys.stderr)
+            if step["saturated_by"] and saturation is None:
+                saturation = rate
+                if not args.continue_after_saturation:
+                    break
+    finally:
+        await agent.aclose()
+        agent.logger.flush()
+
+    sustainable = [step["offered_rate"] for step in steps if not step["saturated_by"] and (saturation is None or step["offered_rate"] < saturation)]
+    return {
+        "steps": steps,
+        "saturation_rate": saturation,
+        "max_sustainable_rate": max(sustainable) if sustainable else None,
+    }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="IndustryAgent 并发压测")
+    parser.add_argument("--users", type=int, default=100, help="并发会话数（每次到达随机选择一个会话）")
+    parser.add_argument("--rates", type=lambda v: [float(x) for x in v.split(",")], default=[5, 10, 20, 40, 80],
+                        help="逐级测试的到达率（次/秒），逗号分隔")
+    parser.add_argument("--duration", type=float, default=30, help="每一级的持续时间(秒)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("low_output=0.5,deep_analysis=0.3,comparative=0.2"))
+    parser.add_argument("--mode", choices=MODES, default="agent")
+    parser.add_argument("--timeout", type=float, default=120, help="单次查询超时(秒)")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--cache", action="store_true", help="启用 mcp_call 结果缓存和回答缓存")
+    parser.add_argument("--min-throughput-ratio", type=float, default=0.9)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--slo-p95", type=float, default=None, help="P95 耗时目标(秒)，超过即视为饱和")
+    parser.add_argument("--continue-after-saturation", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="结果 JSON 写入的文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    os.environ["MCP_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ["ANSWER_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ.setdefault("LOG_PATH", "logs/load_interactions.log")
+    # 会话池需容纳全部并发会话，否则测到的是句柄淘汰而不是 SQLite 争用
+    os.environ.setdefault("SESSION_POOL_SIZE", str(max(args.users, 128)))
+
+    with LocalStack(llm_latency=args.llm_latency, llm_jitter=args.llm_jitter) as stack:
+        result = asyncio.run(run_load(args, args.mix))
+        llm_requests = stack.llm.requests
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "users": args.users,
+            "duration": args.duration,
+            "mix": args.mix,
+            "mode": args.mode,
+            "llm_latency": args.llm_latency,
+            "llm_jitter": args.llm_jitter,
+            "cache": args.cache,
+            "seed": args.seed,
+            "llm_requests": llm_requests,
+        },
+        **result,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# 用户问题中的行业关键词 -> get_industry_data 的 industry 参数
+INDUSTRY_KEYWORDS = {
+    "旅游": "tourism",
+    "文旅": "tourism",
+    "金融": "finance",
+    "银行": "finance",
+    "IT": "it",
+    "信息技术": "it",
+    "互联网": "it",
+}
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _first_json(text: str) -> Any:
+    """取出文本中第一个 JSON 对象（工具输出前面带有说明文字）。"""
+    decoder = json.JSONDecoder()
+    index = text.find("{")
+    while index != -1:
+        try:
+            return decoder.raw_decode(text, index)[0]
+        except ValueError:
+            index = text.find("{", index + 1)
+    return None
+
+
+def detect_industries(query: str) -> list[str]:
+    found = []
+    for keyword, industry in INDUSTRY_KEYWORDS.items():
+        if keyword.lower() in query.lower() and industry not in found:
+            found.append(industry)
+    return found or ["tourism"]
+
+
+def _tool_call(name: str, arguments: dict) -> dict:
+    return {
+        "id": f"call_{uuid.uuid4().hex[:12]}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)},
+    }
+
+
+def script_reply(messages: list[dict], tools: list | None) -> dict:
+    """按技能手册的流程给出确定的回复：load_skill -> 查询数据 -> (产值 > 1000 时) 深度分析 -> 报告。
+
+    返回 assistant 消息（`content` 或 `tool_calls`）。没有工具的请求视为意图抽取或报告撰写。
+    """
+    last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=0)
+    query = _text(messages[last_user].get("content")) if messages else ""
+    industries = detect_industries(query)
+
+    if not tools:
+        system = " ".join(_text(m.get("content")) for m in messages if m.get("role") == "system")
+        if "抽取" in system:
+            return {"content": json.dumps({"industry": industries[0]})}
+        return {"content": "【现状数据】经查询，该行业本地年度总产值约为：基准测试 万元。\n基准测试报告正文。"}
+
+    # 本轮用户问题之后已发生的工具调用：call_id -> (工具名, 参数)，以及按顺序的工具结果
+    calls, results = {}, []
+    for message in messages[last_user + 1:]:
+        for call in message.get("tool_calls") or []:
+            calls[call["id"]] = (call["function"]["name"], json.loads(call["function"]["arguments"] or "{}"))
+        if message.get("role") == "tool":
+            name, arguments = calls.get(message.get("tool_call_id"), ("", {}))
+            results.append((name, arguments, _text(message.get("content"))))
+
+    if not results:
+        return {"tool_calls": [_tool_call("load_skill", {"skill_name": "economic_analysis"})]}
+
+    data_results = [r for r in results if r[0] == "mcp_call" and r[1].get("server_name") == "industry_query"]
+    if not data_results:
+        if len(industries) > 1:
+            arguments = {"server_name": "industry_query", "tool_name": "get_industry_data_batch", "arguments": {"industries": industries}}
+        else:
+            arguments = {"server_name": "industry_query", "tool_name": "get_industry_data", "arguments": {"industry": industries[0]}}
+        return {"tool_calls": [_tool_call("mcp_call", arguments)]}
+
+    deep_done = any(r[0] == "mcp_call" and r[1].get("server_name") == "deep_analysis" for r in results)
+    data = _first_json(data_results[-1][2]) or {}
+    records = data.get("records", [data]) if isinstance(data, dict) else []
+    high = [r for r in records if isinstance(r, dict) and (r.get("annual_output") or 0) > 1000]
+    if high and not deep_done:
+        return {"tool_calls": [
+            _tool_call("mcp_call", {
+                "server_name": "deep_analysis",
+                "tool_name": "deep_analysis",
+                "arguments": {"data": {"annual_output": record["annual_output"]}},
+            })
+            for record in high
+        ]}
+
+    outputs = "、".join(f"{r.get('industry')} {r.get('annual_output')}" for r in records if isinstance(r, dict))
+    return {"content": f"【现状数据】经查询，该行业本地年度总产值约为：{outputs} 万元。\n基准测试报告正文。"}
+
+
+class MockLLMServer:
+    """本地 OpenAI 兼容的 `/v1/chat/completions` 服务，回复由 `script_reply` 脚本决定。
+
+    每个请求先等待 `latency` 秒（加上 ±`jitter` 的随机抖动），用于模拟模型耗时；
+    支持 `stream=true` 的 SSE 流式返回。`requests` 记录累计请求数，可用来统计每次查询的模型轮数。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 chunk_chars: int = 8):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self):
+        with self._lock:
+            self.requests += 1
+
+    def _delay(self):
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                mock._count()
+                mock._delay()
+                reply = script_reply(body.get("messages", []), body.get("tools"))
+                usage = {
+                    "prompt_tokens": len(json.dumps(body.get("messages", []), ensure_ascii=False)) // 4,
+                    "completion_tokens": len(json.dumps(reply, ensure_ascii=False)) // 4,
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                if body.get("stream"):
+                    self._stream(body.get("model", "mock"), reply, usage)
+                else:
+                    self._complete(body.get("model", "mock"), reply, usage)
+
+            def _complete(self, model: str, reply: dict, usage: dict):
+                message = {"role": "assistant", "content": reply.get("content")}
+                if reply.get("tool_calls"):
+                    message["tool_calls"] = reply["tool_calls"]
+                payload = json.dumps({
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if reply.get("tool_calls") else "stop",
+                    }],
+                    "usage": usage,
+                }, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, model: str, reply: dict, usage: dict):
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+                def chunk(delta: dict, finish_reason: str | None = None, with_usage: bool = False) -> bytes:
+                    data = {
+                        "id": chunk_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    if with_usage:
+                        data["usage"] = usage
+                    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(chunk({"role": "assistant", "content": ""}))
+                if reply.get("tool_calls"):
+                    for index, call in enumerate(reply["tool_calls"]):
+                        self.wfile.write(chunk({"tool_calls": [{**call, "index": index}]}))
+                    finish_reason = "tool_calls"
+                else:
+                    text = reply.get("content") or ""
+                    for i in range(0, len(text), mock.chunk_chars):
+                        self.wfile.write(chunk({"content": text[i:i + mock.chunk_chars]}))
+                    finish_reason = "stop"
+                self.wfile.write(chunk({}, finish_reason, with_usage=True))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,137 @@
+"""单查询基准测试：在本地模拟模型和 MCP 服务上测量 `IndustryAgent.process_query`。
+
+用法（在仓库根目录）::
+
+    python -m benchmarks.run --iterations 20 --llm-latency 0.2 --output logs/benchmark.json
+
+每个场景 × 模式输出耗时分位数、每次查询的模型轮数与工具调用数、token 用量和吞吐量，
+结果为 JSON，便于跟踪性能回归。
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.stack import REPO_ROOT, LocalStack, create_agent
+from benchmarks.stats import summarize_latencies
+
+SCENARIOS = {
+    "low_output": "本地的旅游产业发展如何？",
+    "deep_analysis": "本地金融业发展如何？",
+    "comparative": "请对比一下本地旅游、金融和IT行业的发展情况。",
+}
+MODES = ("agent", "workflow")
+ERROR_PREFIXES = ("系统繁忙", "抱歉，服务压力较大")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_scenario(agent, stack: LocalStack, name: str, query: str, mode: str, iterations: int, warmup: int) -> dict:
+    from agent.agent import MODEL_TOKENS, TOOL_CALLS
+
+    # 实例级覆盖，同一个 Agent 可以依次测量两种模式
+    agent.config.WORKFLOW_ENABLED = mode == "workflow"
+    latencies, turns, tool_calls, tokens, errors = [], [], [], [], 0
+    started = time.perf_counter()
+    for i in range(warmup + iterations):
+        llm_before, tools_before, tokens_before = stack.llm.requests, TOOL_CALLS.total(), MODEL_TOKENS.total()
+        start = time.perf_counter()
+        output = await agent.process_query(query, session_id=f"bench-{name}-{mode}-{i}-{time.time_ns()}")
+        elapsed = time.perf_counter() - start
+        if i < warmup:
+            started = time.perf_counter()
+            continue
+        latencies.append(elapsed)
+        turns.append(stack.llm.requests - llm_before)
+        tool_calls.append(TOOL_CALLS.total() - tools_before)
+        tokens.append(MODEL_TOKENS.total() - tokens_before)
+        if str(output).startswith(ERROR_PREFIXES):
+            errors += 1
+    wall = time.perf_counter() - started
+    return {
+        "scenario": name,
+        "mode": mode,
+        "query": query,
+        "iterations": iterations,
+        "latency_seconds": summarize_latencies(latencies),
+        "model_turns_per_query": round(sum(turns) / len(turns), 3) if turns else None,
+        "tool_calls_per_query": round(sum(tool_calls) / len(tool_calls), 3) if tool_calls else None,
+        "tokens_per_query": round(sum(tokens) / len(tokens), 1) if tokens else None,
+        "errors": errors,
+        "throughput_qps": round(iterations / wall, 3) if wall > 0 else None,
+    }
+
+
+async def run_benchmarks(stack: LocalStack, scenarios: list[str], modes: list[str], iterations: int, warmup: int) -> list[dict]:
+    agent = create_agent()
+    try:
+        results = []
+        for name in scenarios:
+            for mode in modes:
+                result = await run_scenario(agent, stack, name, SCENARIOS[name], mode, iterations, warmup)
+                print(f"{name:<14} {mode:<9} p50={result['latency_seconds']['p50']}s p95={result['latency_seconds']['p95']}s "
+                      f"turns={result['model_turns_per_query']} errors={result['errors']}", file=sys.stderr)
+                results.append(result)
+        return results
+    finally:
+        await agent.aclose()
+        agent.logger.flush()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="IndustryAgent 单查询基准测试")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="可重复指定，默认全部")
+    parser.add_argument("--mode", action="append", choices=MODES, help="agent=模型驱动循环，workflow=技能工作流；默认两者")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="模拟模型每次调用的耗时(秒)")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="启用 mcp_call 结果缓存和回答缓存（默认关闭以测量冷路径）")
+    parser.add_argument("--transport", choices=("sse", "inprocess"), default="sse", help="MCP 传输方式")
+    parser.add_argument("--output", help="结果 JSON 写入的文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    os.environ["MCP_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ["ANSWER_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ.setdefault("LOG_PATH", "logs/benchmark_interactions.log")
+    scenarios = args.scenario or list(SCENARIOS)
+    modes = args.mode or list(MODES)
+
+    with LocalStack(llm_latency=args.llm_latency, llm_jitter=args.llm_jitter, mcp_transport=args.transport) as stack:
+        results = asyncio.run(run_benchmarks(stack, scenarios, modes, args.iterations, args.warmup))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "llm_latency": args.llm_latency,
+            "llm_jitter": args.llm_jitter,
+            "cache": args.cache,
+            "transport": args.transport,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.mock_llm import MockLLMServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 基准场景依赖的确定产值：tourism 走低产值分支，finance 触发深度分析
+DEFAULT_FIXED_OUTPUTS = "tourism=80,finance=2000,it=140"
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 20.0, process: subprocess.Popen | None = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"进程在端口 {port} 就绪前退出，退出码 {process.returncode}")
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(0.2)
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"端口 {port} 在 {timeout:.0f} 秒内未就绪")
+
+
+class LocalStack:
+    """在本机启动模拟模型服务和两个 FastMCP 服务，并把 Agent 的配置环境变量指向它们。
+
+    `Config` 在导入时读取环境变量，因此必须先进入 `LocalStack`，再导入 `agent.agent`。
+    """
+
+    def __init__(self, llm_latency: float = 0.0, llm_jitter: float = 0.0, fixed_outputs: str = DEFAULT_FIXED_OUTPUTS,
+                 log_dir: str | None = None, mcp_transport: str = "sse"):
+        self.llm = MockLLMServer(latency=llm_latency, jitter=llm_jitter)
+        self.fixed_outputs = fixed_outputs
+        # inprocess 时 MCP 服务由 Agent 在进程内挂载，不启动子进程
+        self.mcp_transport = mcp_transport
+        self.log_dir = log_dir or os.path.join(REPO_ROOT, "logs")
+        self.ports = {"industry_query": free_port(), "deep_analysis": free_port()}
+        self._processes: list[subprocess.Popen] = []
+        self._log_files = []
+
+    def __enter__(self) -> "LocalStack":
+        self.llm.start()
+        os.makedirs(self.log_dir, exist_ok=True)
+        env = {
+            **os.environ,
+            "MCP_TOURISM_QUERY_PORT": str(self.ports["industry_query"]),
+            "MCP_DEEP_ANALYSIS_PORT": str(self.ports["deep_analysis"]),
+            "INDUSTRY_QUERY_FIXED_OUTPUTS": self.fixed_outputs,
+        }
+        servers = () if self.mcp_transport == "inprocess" else ("industry_query", "deep_analysis")
+        try:
+            for name in servers:
+                log_file = open(os.path.join(self.log_dir, f"benchmark_{name}.log"), "w")
+                self._log_files.append(log_file)
+                process = subprocess.Popen(
+                    [sys.executable, os.path.join(REPO_ROOT, "mcp_servers", name, "server.py")],
+                    stdout=log_file, stderr=log_file, cwd=REPO_ROOT, env=env,
+                )
+                self._processes.append(process)
+                wait_for_port(self.ports[name], process=process)
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+
+        os.environ.update({
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": self.llm.base_url,
+            "MODEL_NAME": os.environ.get("BENCHMARK_MODEL_NAME", "mock-model"),
+            "MCP_TOURISM_QUERY_URL": f"http://127.0.0.1:{self.ports['industry_query']}/sse",
+            "MCP_DEEP_ANALYSIS_URL": f"http://127.0.0.1:{self.ports['deep_analysis']}/sse",
+            "MCP_TRANSPORT": self.mcp_transport,
+            "INDUSTRY_QUERY_FIXED_OUTPUTS": self.fixed_outputs,
+            # 不向外部上报 trace
+            "OPENAI_AGENTS_DISABLE_TRACING": "1",
+        })
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for log_file in self._log_files:
+            log_file.close()
+        self.llm.stop()
+
+
+def build_skills_prompt(skills_path: str) -> str:
+    """由技能目录中的 SKILL.md 生成 `<available_skills>` 列表，不依赖 AGENTS.md。"""
+    from utils.skill_registry import get_skill_registry
+
+    blocks = [
+        f"<skill>\n<name>{skill.name}</name>\n<description>{skill.description}</description>\n<location>project</location>\n</skill>"
+        for skill in get_skill_registry(skills_path).all()
+    ]
+    return "<available_skills>\n" + "\n".join(blocks) + "\n</available_skills>"
+
+
+def create_agent():
+    """在 `LocalStack` 内创建 Agent：技能列表取自技能目录，不清空共享的会话数据库。"""
+    from agent.agent import IndustryAgent
+    from utils.config import Config
+
+    return IndustryAgent(
+        initial_skills_system_prompt=build_skills_prompt(Config.SKILLS_PATH),
+        dynamic_skills_dict={},
+        auto_reset=False,
+    )
@@ -0,0 +1,24 @@
+import math
+
+
+def percentile(sorted_values: list[float], q: float) -> float | None:
+    """线性插值分位数，`q` 取 0~100；输入需已排序。"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize_latencies(values: list[float]) -> dict:
+    """耗时（秒）的统计摘要，保留 4 位小数便于 diff。"""
+    ordered = sorted(values)
+    summary = {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else None,
+        "min": ordered[0] if ordered else None,
+        "max": ordered[-1] if ordered else None,
+    }
+    for q in (50, 90, 95, 99):
+        summary[f"p{q}"] = percentile(ordered, q)
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in summary.items()}
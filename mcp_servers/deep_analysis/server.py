@@ -1,12 +1,29 @@
+import json
+import os
+import sys
 from fastmcp import FastMCP
-from typing import Dict
+from typing import Any, Dict, List
+
+# 进程内挂载时脚本目录不在 sys.path 中
+_SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+if _SERVER_DIR not in sys.path:
+    sys.path.insert(0, _SERVER_DIR)
+from trend_analytics import analyze
 
 # Create MCP server
 mcp = FastMCP("DeepAnalysis")
 
 @mcp.tool()
 def deep_analysis(data: Dict) -> str:
-    """对行业数据进行深入分析"""
+    """对行业数据进行深入分析。
+
+    data 为单条记录（含 annual_output）时返回分析报告；含 records（记录列表）或
+    series（列式数据）时返回与 analyze_trends 相同的结构化结果（JSON）。
+    """
+    if "records" in data or "series" in data:
+        result = analyze(data.get("series") or data.get("records") or [], data.get("metric", "annual_output"), data.get("threshold", 1000))
+        return json.dumps(result, ensure_ascii=False)
+
     annual_output = data.get("annual_output", 0)
 
     if annual_output > 1000:
@@ -25,7 +42,26 @@ def deep_analysis(data: Dict) -> str:
    - 聚焦细分市场，打造特色品牌。
    - 争取政策扶持，完善基础设施建设。"""
 
+
+@mcp.tool()
+def analyze_trends(records: List[Dict[str, Any]] = None, series: Dict[str, List[Any]] = None,
+                   metric: str = "annual_output", threshold: float = 1000) -> Dict[str, Any]:
+    """批量计算多个行业/地区历年数据的增长率、复合年增长率(CAGR)、波动率、同批百分位排名和发展阶段。
+
+    Args:
+        records: 记录列表，每条含 industry、location（或 region）、year 和指标值，
+                 可直接传入 get_industry_trend / get_industry_data_batch 返回的 records
+        series: 可选，列式数据 {"industry": [...], "location": [...], "year": [...], metric: [...]}，大批量时使用
+        metric: 分析的指标，默认 annual_output
+        threshold: 阶段划分阈值，最新值超过该值为 mature，否则为 developing
+
+    返回 entities（每个行业×地区一条：latest、yoy_growth、mean_growth、cagr、volatility、
+    percentile、stage）以及 summary 汇总。
+    """
+    return analyze(series if series else (records or []), metric, threshold)
+
+
 if __name__ == "__main__":
     # Use SSE transport for compatibility with most clients over HTTP
     # Listen on all interfaces
-    mcp.run(transport="sse", host="0.0.0.0", port=8002)
+    mcp.run(transport="sse", host="0.0.0.0", port=int(os.getenv("MCP_DEEP_ANALYSIS_PORT", 8002)))
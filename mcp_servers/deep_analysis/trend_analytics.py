@@ -0,0 +1,185 @@
+"""行业时间序列的向量化指标。
+
+所有计算都在 (实体 × 年份) 的二维矩阵上按列/行整体进行，缺失值为 NaN：
+一个批量报告里的成百上千个行业/地区只需几次数组运算，而不是逐个实体的 Python 循环。
+"""
+import numpy as np
+
+
+def records_to_columns(records: list[dict], metric: str = "annual_output") -> dict:
+    """把 {industry, location|region, year, metric} 记录转为列式 dict，跳过没有该指标的记录。"""
+    columns = {"industry": [], "location": [], "year": [], metric: []}
+    for r in records:
+        if isinstance(r, dict) and isinstance(r.get(metric), (int, float)):
+            columns["industry"].append(r.get("industry", ""))
+            columns["location"].append(r.get("location", r.get("region", "")))
+            columns["year"].append(r.get("year"))
+            columns[metric].append(r[metric])
+    return columns
+
+
+def column_length_error(columns: dict, metric: str = "annual_output") -> str | None:
+    """列式数据各列长度不一致时返回错误说明，否则返回 None。缺省的 industry/location/year 列不参与比较。"""
+    names = [metric] + [name for name in ("industry", "location", "region", "year") if columns.get(name)]
+    lengths = {name: len(columns.get(name) or []) for name in names}
+    if len(set(lengths.values())) > 1:
+        return "series 各列长度不一致: " + ", ".join(f"{name}={length}" for name, length in lengths.items())
+    return None
+
+
+def build_matrix(columns: dict, metric: str = "annual_output"):
+    """把列式数据 {industry, location, year, metric: [...]} 整理成 (实体 × 年份) 矩阵。
+
+    返回 (entities, years, matrix)，entities 为 (industry, location) 列表；同一实体同一年份重复时取最后一条。
+    各列长度须一致（见 `column_length_error`），否则抛出 ValueError。
+    """
+    error = column_length_error(columns, metric)
+    if error:
+        raise ValueError(error)
+    values = np.asarray(columns.get(metric, []), dtype=float)
+    if not len(values):
+        return [], np.array([], dtype=np.int64), np.empty((0, 0))
+    industries = columns.get("industry") or [""] * len(values)
+    locations = columns.get("location") or columns.get("region") or [""] * len(values)
+    # 没有年份的记录视为同一期
+    years = np.array([0 if year is None else year for year in (columns.get("year") or [None] * len(values))], dtype=np.int64)
+    entity_ids: dict[tuple, int] = {}
+    entity_index = np.fromiter(
+        (entity_ids.setdefault((str(industry), str(location)), len(entity_ids)) for industry, location in zip(industries, locations)),
+        dtype=np.int64, count=len(values),
+    )
+    year_values, year_index = np.unique(years, return_inverse=True)
+    matrix = np.full((len(entity_ids), len(year_values)), np.nan)
+    matrix[entity_index, year_index] = values
+    return list(entity_ids), year_values, matrix
+
+
+def _first_last(matrix: np.ndarray):
+    """每行第一个和最后一个非缺失值的列号；整行缺失时为 -1。"""
+    valid = ~np.isnan(matrix)
+    has_any = valid.any(axis=1)
+    first = np.where(has_any, valid.argmax(axis=1), -1)
+    last = np.where(has_any, matrix.shape[1] - 1 - valid[:, ::-1].argmax(axis=1), -1)
+    return first, last
+
+
+def growth_rates(matrix: np.ndarray) -> np.ndarray:
+    """相邻年份的增长率矩阵（列数少一），上一年为 0 或缺失时为 NaN。"""
+    if matrix.shape[1] < 2:
+        return np.empty((matrix.shape[0], 0))
+    previous, current = matrix[:, :-1], matrix[:, 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, current / previous - 1, np.nan)
+
+
+def cagr(matrix: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """首尾两个非缺失年份之间的复合年增长率。"""
+    rows = np.arange(matrix.shape[0])
+    first, last = _first_last(matrix)
+    ok = (first >= 0) & (last > first)
+    first_value = matrix[rows, np.maximum(first, 0)]
+    last_value = matrix[rows, np.maximum(last, 0)]
+    span = (years[np.maximum(last, 0)] - years[np.maximum(first, 0)]).astype(float)
+    ok &= (first_value > 0) & (last_value >= 0) & (span > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ok, (last_value / first_value) ** (1 / np.where(span > 0, span, 1)) - 1, np.nan)
+
+
+def volatility(growth: np.ndarray) -> np.ndarray:
+    """增长率的样本标准差；有效增长率少于两个时为 NaN。"""
+    counts = (~np.isnan(growth)).sum(axis=1)
+    result = np.full(growth.shape[0], np.nan)
+    enough = counts >= 2
+    if enough.any():
+        result[enough] = np.nanstd(growth[enough], axis=1, ddof=1)
+    return result
+
+
+def latest_values(matrix: np.ndarray, years: np.ndarray):
+    """每行最后一个非缺失值及其年份。"""
+    rows = np.arange(matrix.shape[0])
+    _, last = _first_last(matrix)
+    value = np.where(last >= 0, matrix[rows, np.maximum(last, 0)], np.nan)
+    year = np.where(last >= 0, years[np.maximum(last, 0)] if len(years) else 0, -1)
+    return value, year
+
+
+def percentile_rank(values: np.ndarray) -> np.ndarray:
+    """每个值在同批非缺失值中的百分位（0-100，并列取平均位次）。"""
+    valid = ~np.isnan(values)
+    peers = np.sort(values[valid])
+    result = np.full(values.shape, np.nan)
+    if len(peers) == 0:
+        return result
+    below = np.searchsorted(peers, values[valid], side="left")
+    at_or_below = np.searchsorted(peers, values[valid], side="right")
+    result[valid] = (below + (at_or_below - below) / 2) / len(peers) * 100
+    return result
+
+
+def classify(values: np.ndarray, threshold: float) -> np.ndarray:
+    """按阈值划分发展阶段：超过阈值为 mature，否则为 developing，缺失为 unknown。"""
+    return np.where(np.isnan(values), "unknown", np.where(values > threshold, "mature", "developing"))
+
+
+def analyze(data: list[dict] | dict, metric: str = "annual_output", threshold: float = 1000) -> dict:
+    """对一批记录计算增长率、CAGR、波动率、同批百分位和阶段划分，返回可直接序列化的结构。
+
+    `data` 可以是记录列表，也可以是列式 dict（大批量时省去逐条解析）。
+    """
+    columns = data if isinstance(data, dict) else records_to_columns(data, metric)
+    error = column_length_error(columns, metric)
+    if error:
+        return {"metric": metric, "threshold": threshold, "error": error}
+    entities, years, matrix = build_matrix(columns, metric)
+    if not entities:
+        return {"metric": metric, "threshold": threshold, "years": [], "entities": [],
+                "summary": {"count": 0, "mature": 0, "median_latest": None, "median_cagr": None}}
+    growth = growth_rates(matrix)
+    latest, latest_year = latest_values(matrix, years)
+    last_growth = np.full(len(entities), np.nan)
+    if growth.shape[1]:
+        # 最近一期增长率：最新年份与前一列都存在时才有值
+        rows = np.arange(len(entities))
+        _, last = _first_last(matrix)
+        column = np.clip(last - 1, 0, growth.shape[1] - 1)
+        last_growth = np.where(last >= 1, growth[rows, column], np.nan)
+    with np.errstate(invalid="ignore"):
+        mean_growth = np.full(len(entities), np.nan)
+        has_growth = (~np.isnan(growth)).any(axis=1) if growth.shape[1] else np.zeros(len(entities), dtype=bool)
+        if has_growth.any():
+            mean_growth[has_growth] = np.nanmean(growth[has_growth], axis=1)
+    metrics = {
+        "latest": np.round(latest, 2),
+        "yoy_growth": np.round(last_growth, 4),
+        "mean_growth": np.round(mean_growth, 4),
+        "cagr": np.round(cagr(matrix, years), 4),
+        "volatility": np.round(volatility(growth), 4),
+        "percentile": np.round(percentile_rank(latest), 2),
+    }
+    stages = classify(latest, threshold)
+
+    # 整列转为 Python 列表后再组装记录，NaN 转为 None
+    as_lists = {name: [None if v != v else v for v in values.tolist()] for name, values in metrics.items()}
+    as_lists["latest_year"] = [year or None for year in latest_year.tolist()]
+    as_lists["stage"] = stages.tolist()
+    names = list(as_lists)
+    results = [
+        {"industry": industry, "location": location, **dict(zip(names, row))}
+        for (industry, location), *row in zip(entities, *as_lists.values())
+    ]
+
+    valid_latest = latest[~np.isnan(latest)]
+    valid_cagr = metrics["cagr"][~np.isnan(metrics["cagr"])]
+    return {
+        "metric": metric,
+        "threshold": threshold,
+        "years": [int(year) for year in years if year],
+        "entities": results,
+        "summary": {
+            "count": len(results),
+            "mature": int((stages == "mature").sum()),
+            "median_latest": round(float(np.median(valid_latest)), 2) if len(valid_latest) else None,
+            "median_cagr": round(float(np.median(valid_cagr)), 4) if len(valid_cagr) else None,
+        },
+    }
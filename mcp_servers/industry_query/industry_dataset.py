@@ -0,0 +1,350 @@
+"""行业 × 地区 × 年份 统计数据的列式存储。
+
+数据文件（.icol）布局::
+
+    b"ICOL0001" | uint64 头部长度 | JSON 头部 | 按 8 字节对齐的各列原始数组
+
+行按 (行业, 地区, 年份) 排序，行业与地区以字典编码保存为整数列，指标列为 float64。
+同一 (行业, 地区) 的行是连续的一段，分组表 (行业码, 地区码, 起始行, 结束行) 也作为列存储。
+加载时只 `mmap` 文件并把各列转换为 `memoryview`，不逐行解析；分组索引在首次查询时构建一次，
+之后点查询为一次字典查找加一次年份二分查找。
+
+由 CSV 构建数据文件（首行为表头，至少包含 industry、region、year，其余数值列均作为指标）::
+
+    python mcp_servers/industry_query/industry_dataset.py build stats.csv stats.icol
+
+生成用于压测的合成数据::
+
+    python mcp_servers/industry_query/industry_dataset.py generate stats.icol --industries 50 --regions 3000 --years 20
+"""
+import argparse
+import bisect
+import csv
+import heapq
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+from array import array
+
+MAGIC = b"ICOL0001"
+_HEADER_LEN = struct.Struct("<Q")
+# 各列的 array 类型码：字典编码与行号用无符号整数，指标统一为 float64
+CODE_TYPE, ROW_TYPE, YEAR_TYPE, METRIC_TYPE = "I", "Q", "H", "d"
+KEY_COLUMNS = ("industry", "region", "year")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_dataset(path: str, rows, metric_units: dict[str, str] | None = None):
+    """把 (industry, region, year, {metric: value}) 行写成列式数据文件。
+
+    `rows` 可以是任意可迭代对象（包括逐行读取的生成器），先追加到紧凑数组中，再按
+    (行业, 地区, 年份) 排序；同一键重复时保留最后一行。
+    """
+    industry_ids: dict[str, int] = {}
+    region_ids: dict[str, int] = {}
+    raw = {"industry": array(CODE_TYPE), "region": array(CODE_TYPE), "year": array(YEAR_TYPE)}
+    metric_values: dict[str, array] = {}
+    count = 0
+    for industry, region, year, values in rows:
+        raw["industry"].append(industry_ids.setdefault(industry, len(industry_ids)))
+        raw["region"].append(region_ids.setdefault(region, len(region_ids)))
+        raw["year"].append(int(year))
+        for name in values:
+            if name not in metric_values:
+                # 新出现的指标：之前的行补缺失值
+                metric_values[name] = array(METRIC_TYPE, [float("nan")]) * count
+        for name, column in metric_values.items():
+            value = values.get(name)
+            column.append(float("nan") if value is None else float(value))
+        count += 1
+
+    industries = sorted(industry_ids)
+    regions = sorted(region_ids)
+    # 首次出现顺序的编码 -> 排序后的编码
+    industry_rank = array(CODE_TYPE, [0]) * len(industries)
+    for code, name in enumerate(industries):
+        industry_rank[industry_ids[name]] = code
+    region_rank = array(CODE_TYPE, [0]) * len(regions)
+    for code, name in enumerate(regions):
+        region_rank[region_ids[name]] = code
+
+    keys = array("Q", (
+        ((industry_rank[i] * len(regions) + region_rank[r]) << 16) | y
+        for i, r, y in zip(raw["industry"], raw["region"], raw["year"])
+    ))
+    # 稳定排序：相同键中最后写入的一行排在最后，去重时保留它
+    order = sorted(range(count), key=keys.__getitem__)
+    order = [row for n, row in enumerate(order) if n + 1 == len(order) or keys[order[n + 1]] != keys[row]]
+
+    columns = {
+        "industry": array(CODE_TYPE, (industry_rank[raw["industry"][row]] for row in order)),
+        "region": array(CODE_TYPE, (region_rank[raw["region"][row]] for row in order)),
+        "year": array(YEAR_TYPE, (raw["year"][row] for row in order)),
+        **{name: array(METRIC_TYPE, (values[row] for row in order)) for name, values in metric_values.items()},
+    }
+    groups = {"group_industry": array(CODE_TYPE), "group_region": array(CODE_TYPE),
+              "group_start": array(ROW_TYPE), "group_end": array(ROW_TYPE)}
+    previous = None
+    for row, (industry, region) in enumerate(zip(columns["industry"], columns["region"])):
+        if (industry, region) != previous:
+            if previous is not None:
+                groups["group_end"].append(row)
+            groups["group_industry"].append(industry)
+            groups["group_region"].append(region)
+            groups["group_start"].append(row)
+            previous = (industry, region)
+    if previous is not None:
+        groups["group_end"].append(len(order))
+    metric_names = list(metric_values)
+
+    arrays = {**columns, **groups}
+    header = {
+        "rows": len(order),
+        "groups": len(groups["group_start"]),
+        "byteorder": sys.byteorder,
+        "industries": industries,
+        "regions": regions,
+        "metrics": metric_names,
+        "units": {name: (metric_units or {}).get(name, "") for name in metric_names},
+        "columns": {},
+    }
+    # 头部长度依赖各列偏移：预留余量后反复计算，直到头部能放进第一列之前
+    reserved = 0
+    while True:
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        data_start = len(MAGIC) + _HEADER_LEN.size + len(header_bytes)
+        if header["columns"] and data_start <= reserved:
+            break
+        reserved = offset = _align(data_start + 64)
+        for name, values in arrays.items():
+            header["columns"][name] = {"type": values.typecode, "offset": offset, "length": len(values)}
+            offset = _align(offset + len(values) * values.itemsize)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LEN.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for name, values in arrays.items():
+            f.write(b"\0" * (header["columns"][name]["offset"] - f.tell()))
+            values.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def read_csv_rows(path: str):
+    """逐行读取 CSV，产出 (industry, region, year, {metric: value})；空单元格视为缺失。"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [name for name in KEY_COLUMNS if name not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path} 缺少列: {', '.join(missing)}")
+        metric_names = [name for name in reader.fieldnames if name not in KEY_COLUMNS]
+        for record in reader:
+            yield (
+                record["industry"].strip(),
+                record["region"].strip(),
+                int(record["year"]),
+                {name: float(record[name]) for name in metric_names if record[name] not in ("", None)},
+            )
+
+
+def build_from_csv(csv_path: str, out_path: str, metric_units: dict[str, str] | None = None):
+    write_dataset(out_path, read_csv_rows(csv_path), metric_units)
+
+
+class IndustryDataset:
+    """只读的列式行业数据集，支持点查询、年份范围查询和按指标取前 N 个地区。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} 不是行业数据文件")
+        (header_len,) = _HEADER_LEN.unpack_from(self._mmap, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LEN.size
+        header = json.loads(self._mmap[start:start + header_len].decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} 的字节序为 {header['byteorder']}，与本机不一致，请重新构建")
+        self.rows: int = header["rows"]
+        self.industries: list[str] = header["industries"]
+        self.regions: list[str] = header["regions"]
+        self.metrics: list[str] = header["metrics"]
+        self.units: dict[str, str] = header["units"]
+        self._view = memoryview(self._mmap)
+        self._columns = {
+            name: self._view[spec["offset"]:spec["offset"] + spec["length"] * array(spec["type"]).itemsize].cast(spec["type"])
+            for name, spec in header["columns"].items()
+        }
+        self._industry_codes = {name: code for code, name in enumerate(self.industries)}
+        self._region_codes = {name: code for code, name in enumerate(self.regions)}
+        self._index_lock = threading.Lock()
+        self._groups: dict[tuple[int, int], tuple[int, int]] | None = None
+        self._industry_groups: dict[int, list[tuple[int, int, int]]] | None = None
+
+    def close(self):
+        # 先释放所有导出的视图，否则 mmap 无法关闭
+        for column in self._columns.values():
+            column.release()
+        self._columns.clear()
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def _ensure_index(self):
+        if self._groups is not None:
+            return
+        with self._index_lock:
+            if self._groups is not None:
+                return
+            groups, by_industry = {}, {}
+            columns = self._columns
+            for industry, region, start, end in zip(columns["group_industry"], columns["group_region"],
+                                                    columns["group_start"], columns["group_end"]):
+                groups[(industry, region)] = (start, end)
+                by_industry.setdefault(industry, []).append((region, start, end))
+            self._industry_groups = by_industry
+            self._groups = groups
+
+    def _group(self, industry: str, region: str) -> tuple[int, int] | None:
+        industry_code = self._industry_codes.get(industry)
+        region_code = self._region_codes.get(region)
+        if industry_code is None or region_code is None:
+            return None
+        self._ensure_index()
+        return self._groups.get((industry_code, region_code))
+
+    def _row_for_year(self, start: int, end: int, year: int | None) -> int | None:
+        """组内按年份二分查找；`year` 为 None 时返回最新一年。"""
+        if start >= end:
+            return None
+        if year is None:
+            return end - 1
+        years = self._columns["year"]
+        row = bisect.bisect_left(years, year, start, end)
+        return row if row < end and years[row] == year else None
+
+    def _record(self, row: int) -> dict:
+        columns = self._columns
+        record = {
+            "industry": self.industries[columns["industry"][row]],
+            "region": self.regions[columns["region"][row]],
+            "year": columns["year"][row],
+        }
+        for name in self.metrics:
+            value = columns[name][row]
+            # NaN 表示缺失
+            record[name] = None if value != value else (int(value) if value.is_integer() else value)
+        return record
+
+    def years(self, industry: str, region: str) -> list[int]:
+        group = self._group(industry, region)
+        return list(self._columns["year"][group[0]:group[1]]) if group else []
+
+    def get(self, industry: str, region: str, year: int | None = None) -> dict | None:
+        """点查询：返回 (行业, 地区, 年份) 对应的记录，`year` 省略时为最新一年。"""
+        group = self._group(industry, region)
+        if group is None:
+            return None
+        row = self._row_for_year(*group, year)
+        return None if row is None else self._record(row)
+
+    def range(self, industry: str, region: str, start_year: int | None = None, end_year: int | None = None) -> list[dict]:
+        """范围查询：返回 [start_year, end_year] 内按年份升序的记录。"""
+        group = self._group(industry, region)
+        if group is None:
+            return []
+        start, end = group
+        years = self._columns["year"]
+        lo = start if start_year is None else bisect.bisect_left(years, start_year, start, end)
+        hi = end if end_year is None else bisect.bisect_right(years, end_year, start, end)
+        return [self._record(row) for row in range(lo, hi)]
+
+    def top_regions(self, industry: str, year: int | None = None, metric: str = "annual_output", limit: int = 10) -> list[dict]:
+        """取某行业在某年（省略时为各地区最新一年）指标最高的前 `limit` 个地区。"""
+        if metric not in self._columns or metric not in self.metrics:
+            raise KeyError(metric)
+        industry_code = self._industry_codes.get(industry)
+        if industry_code is None:
+            return []
+        self._ensure_index()
+        values = self._columns[metric]
+        candidates = []
+        for _, start, end in self._industry_groups.get(industry_code, ()):
+            row = self._row_for_year(start, end, year)
+            if row is not None and values[row] == values[row]:
+                candidates.append(row)
+        return [self._record(row) for row in heapq.nlargest(limit, candidates, key=values.__getitem__)]
+
+
+_datasets: dict[str, IndustryDataset] = {}
+_datasets_lock = threading.Lock()
+
+
+def open_dataset(path: str) -> IndustryDataset:
+    """按路径打开并缓存数据集。`.csv` 在首次使用时转换为同目录下的 `.icol`，CSV 更新后自动重建。"""
+    with _datasets_lock:
+        dataset = _datasets.get(path)
+        if dataset is None:
+            data_path = path
+            if path.endswith(".csv"):
+                data_path = path[:-4] + ".icol"
+                if not os.path.exists(data_path) or os.path.getmtime(data_path) < os.path.getmtime(path):
+                    build_from_csv(path, data_path, {"annual_output": "万元"})
+            dataset = _datasets[path] = IndustryDataset(data_path)
+        return dataset
+
+
+def _generate_rows(industries: int, regions: int, years: int, first_year: int, seed: int, default_region: str = "本地"):
+    """合成数据；第一个地区命名为 `default_region`，与服务的默认地区一致，快捷问题可以直接命中。"""
+    rng = random.Random(seed)
+    names = ["tourism", "finance", "it", "manufacturing", "agriculture", "logistics", "retail", "energy"]
+    industry_names = (names + [f"industry_{i}" for i in range(len(names), industries)])[:industries]
+    for industry in industry_names:
+        for r in range(regions):
+            output = rng.uniform(50, 2500)
+            for y in range(years):
+                output *= rng.uniform(0.95, 1.12)
+                yield industry, default_region if r == 0 else f"region_{r:05d}", first_year + y, {
+                    "annual_output": round(output, 1),
+                    "enterprise_count": rng.randint(5, 500),
+                    "employment": rng.randint(100, 50000),
+                }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="行业统计列式数据文件工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="由 CSV 构建 .icol 数据文件")
+    build.add_argument("csv")
+    build.add_argument("output")
+    generate = commands.add_parser("generate", help="生成合成数据（压测用）")
+    generate.add_argument("output")
+    generate.add_argument("--industries", type=int, default=8)
+    generate.add_argument("--regions", type=int, default=1000)
+    generate.add_argument("--years", type=int, default=20)
+    generate.add_argument("--first-year", type=int, default=2005)
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--default-region", default=os.getenv("INDUSTRY_DEFAULT_REGION", "本地"),
+                          help="第一个地区的名称，应与服务的 INDUSTRY_DEFAULT_REGION 一致")
+    args = parser.parse_args(argv)
+
+    units = {"annual_output": "万元", "enterprise_count": "家", "employment": "人"}
+    if args.command == "build":
+        build_from_csv(args.csv, args.output, units)
+    else:
+        write_dataset(args.output, _generate_rows(args.industries, args.regions, args.years, args.first_year, args.seed, args.default_region), units)
+    dataset = IndustryDataset(args.output)
+    print(f"{args.output}: {dataset.rows} rows, {len(dataset.industries)} industries, {len(dataset.regions)} regions, metrics {dataset.metrics}")
+    dataset.close()
+
+
+if __name__ == "__main__":
+    main()
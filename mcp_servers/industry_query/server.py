@@ -1,34 +1,146 @@
 from fastmcp import FastMCP
+import os
 import random
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, List, Optional
+
+# 进程内挂载时脚本目录不在 sys.path 中
+_SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+if _SERVER_DIR not in sys.path:
+    sys.path.insert(0, _SERVER_DIR)
+from industry_dataset import open_dataset
 
 # Create MCP server - 使用更明确的名字
 mcp = FastMCP("industry_query_server")
 
+# 可选：按行业固定产值（如 "tourism=80,finance=2000"），用于基准测试等需要确定结果的场景
+FIXED_OUTPUTS = {
+    key.strip(): int(value)
+    for key, value in (item.split("=", 1) for item in os.getenv("INDUSTRY_QUERY_FIXED_OUTPUTS", "").split(",") if "=" in item)
+}
+
+
+# 行业统计数据文件（.icol 或 .csv，见 industry_dataset.py）；未配置时使用随机产值
+DATASET_PATH = os.getenv("INDUSTRY_DATASET", "")
+# 未指定地区时查询的默认地区
+DEFAULT_REGION = os.getenv("INDUSTRY_DEFAULT_REGION", "本地")
+
+
+def _dataset():
+    """首次查询时才打开数据文件（mmap），之后复用同一个实例。"""
+    return open_dataset(DATASET_PATH) if DATASET_PATH else None
+
+
+def _dataset_record(row: Dict[str, Any], units: Dict[str, str]) -> Dict[str, Any]:
+    location, industry, year = row["region"], row["industry"], row["year"]
+    return {
+        "location": location,
+        "industry": industry,
+        "year": year,
+        **{name: value for name, value in row.items() if name not in ("region", "industry", "year")},
+        "unit": units.get("annual_output") or "万元",
+        "description": f"{location}{industry}行业{year}年总产值",
+    }
+
+
+def _industry_record(industry: str, region: Optional[str] = None, year: Optional[int] = None) -> Dict[str, Any]:
+    dataset = _dataset()
+    if dataset is not None and industry not in FIXED_OUTPUTS:
+        row = dataset.get(industry, region or DEFAULT_REGION, year)
+        if row is None:
+            when = f"{year}年" if year is not None else ""
+            return {"location": region or DEFAULT_REGION, "industry": industry, "error": f"没有{region or DEFAULT_REGION}{industry}行业{when}的数据"}
+        return _dataset_record(row, dataset.units)
+
+    location = region or DEFAULT_REGION
+    # 未固定产值的行业从预设的随机产值中选择
+    annual_output = FIXED_OUTPUTS.get(industry) or random.choice([60, 80, 140, 1200, 2000])
+    # annual_output = 2000 # Force 2000 for testing deep_analysis logic
+
+    record = {
+        "location": location,
+        "industry": industry,
+        "annual_output": annual_output,
+        "unit": "万元",
+        "description": f"{location}{industry}行业年度总产值"
+    }
+    if year is not None:
+        record["year"] = year
+        record["description"] = f"{location}{industry}行业{year}年总产值"
+    return record
+
+
 @mcp.tool()
-def get_industry_data(industry: str = "tourism", industry_name: str = None) -> Dict[str, Any]:
+def get_industry_data(industry: str = "tourism", industry_name: str = None, region: str = None, year: int = None) -> Dict[str, Any]:
     """获取本地行业的发展数据。
-    
+
     Args:
         industry: 行业名称 (如 tourism, finance, it)
         industry_name: 兼容性参数，行业名称的另一种写法
+        region: 可选，地区名称，默认为本地
+        year: 可选，统计年份
     """
     # 兼容性处理
     actual_industry = industry_name if industry_name else industry
-    
-    location = "本地"
-    # 始终从预设的随机产值中选择
-    annual_output = random.choice([60, 80, 140, 1200, 2000])
-    # annual_output = 2000 # Force 2000 for testing deep_analysis logic
+    return _industry_record(actual_industry, region, year)
+
+
+@mcp.tool()
+def get_industry_data_batch(industries: List[str], regions: List[str] = None, years: List[int] = None) -> Dict[str, Any]:
+    """一次获取多个行业（及可选的多个地区/年份）的发展数据，用于行业对比。
+
+    Args:
+        industries: 行业名称列表 (如 ["tourism", "finance", "it"])
+        regions: 可选，地区名称列表，默认为本地
+        years: 可选，统计年份列表
+
+    返回的 records 按 行业 → 地区 → 年份 的嵌套顺序排列。
+    """
+    records = [
+        _industry_record(industry, region, year)
+        for industry in industries
+        for region in (regions or [None])
+        for year in (years or [None])
+    ]
+    return {"records": records, "count": len(records)}
+
+
+@mcp.tool()
+def get_industry_trend(industry: str, region: str = None, start_year: int = None, end_year: int = None) -> Dict[str, Any]:
+    """获取某行业在某地区逐年的发展数据（按年份升序）。
+
+    Args:
+        industry: 行业名称 (如 tourism, finance, it)
+        region: 可选，地区名称，默认为本地
+        start_year: 可选，起始年份（含）
+        end_year: 可选，结束年份（含）
+    """
+    dataset = _dataset()
+    if dataset is None:
+        return {"records": [], "count": 0, "error": "未配置行业数据集 (INDUSTRY_DATASET)"}
+    records = [_dataset_record(row, dataset.units) for row in dataset.range(industry, region or DEFAULT_REGION, start_year, end_year)]
+    return {"records": records, "count": len(records)}
+
+
+@mcp.tool()
+def get_top_regions(industry: str, year: int = None, metric: str = "annual_output", limit: int = 10) -> Dict[str, Any]:
+    """获取某行业某指标最高的前 N 个地区，用于区域排名。
+
+    Args:
+        industry: 行业名称 (如 tourism, finance, it)
+        year: 可选，统计年份，默认取各地区最新一年
+        metric: 排名指标，默认 annual_output
+        limit: 返回的地区数量
+    """
+    dataset = _dataset()
+    if dataset is None:
+        return {"records": [], "count": 0, "error": "未配置行业数据集 (INDUSTRY_DATASET)"}
+    if metric not in dataset.metrics:
+        return {"records": [], "count": 0, "error": f"未知指标 '{metric}'，可选: {', '.join(dataset.metrics)}"}
+    records = [_dataset_record(row, dataset.units) for row in dataset.top_regions(industry, year, metric, max(1, min(limit, 100)))]
+    return {"records": records, "count": len(records)}
 
-    return {
-        "location": location,
-        "industry": actual_industry,
-        "annual_output": annual_output,
-        "unit": "万元",
-        "description": f"{location}{actual_industry}行业年度总产值"
-    }
 
 if __name__ == "__main__":
     # Use SSE transport
-    mcp.run(transport="sse", host="0.0.0.0", port=8001)
+    mcp.run(transport="sse", host="0.0.0.0", port=int(os.getenv("MCP_TOURISM_QUERY_PORT", 8001)))
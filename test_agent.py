@@ -42,6 +42,7 @@ async def test():
     print(response)
     
     print("\nLogs:")
+    agent.logger.flush()
     with open(log_path, "r") as f:
         print(f.read())
 
@@ -0,0 +1,30 @@
+from agent.answer_cache import AnswerCache, EntityExtractor, normalize_query
+
+EXTRACTOR = EntityExtractor({"旅游": "tourism", "文旅": "tourism", "tourism": "tourism", "IT": "it", "金融": "finance"})
+
+
+def test_equivalent_phrasings_share_one_key():
+    assert EXTRACTOR.extract("本地的旅游产业发展如何？") == ("本地<tourism>产业发展如何", ("tourism",))
+    assert EXTRACTOR.extract("请问本地文旅产业发展如何呢") == ("本地<tourism>产业发展如何", ("tourism",))
+
+
+def test_english_aliases_match_before_spaces_are_removed():
+    assert EXTRACTOR.extract("How is tourism doing?") == ("howis<tourism>doing", ("tourism",))
+    assert EXTRACTOR.extract("How is IT doing") == ("howis<it>doing", ("it",))
+    assert EXTRACTOR.extract("city quality with growth")[1] == ()
+
+
+def test_normalize_keeps_de_inside_words():
+    assert normalize_query("目的地旅游") == "目的地旅游"
+    assert normalize_query("ＡＢＣ，  de？") == "abcde"
+
+
+def test_answer_cache_invalidates_by_server_and_respects_ttl():
+    cache = AnswerCache(max_entries=2, default_ttl=60)
+    cache.put(("a",), "A", {"industry_query"})
+    cache.put(("b",), "B", {"deep_analysis"})
+    cache.put(("c",), "C", {"industry_query"}, ttl=0)
+    assert cache.get(("c",)) is None
+    assert cache.invalidate("industry_query") == 1
+    assert cache.get(("a",)) is None
+    assert cache.get(("b",)) == "B"
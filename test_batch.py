@@ -0,0 +1,57 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from agent.batch import INDUSTRY_BATCH, has_error_records, merge_records, parse_batch_records
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_servers", "industry_query")
+
+
+def _industry_server():
+    spec = importlib.util.spec_from_file_location("industry_query_server", os.path.join(SERVER_DIR, "server.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_expand_follows_declared_nesting_order():
+    items = INDUSTRY_BATCH.expand({"industries": ["tourism", "it"], "regions": ["本地", "x"], "years": 2020})
+    assert items == [
+        {"industry": "tourism", "region": "本地", "year": 2020},
+        {"industry": "tourism", "region": "x", "year": 2020},
+        {"industry": "it", "region": "本地", "year": 2020},
+        {"industry": "it", "region": "x", "year": 2020},
+    ]
+    assert INDUSTRY_BATCH.expand({"industries": ["finance"]}) == [{"industry": "finance"}]
+
+
+def test_chunks_split_only_the_first_list_parameter():
+    args = {"industries": ["a", "b", "c"], "regions": ["本地"]}
+    chunks = INDUSTRY_BATCH.chunks(args, ["a", "b", "c"], 2)
+    assert chunks == [{"industries": ["a", "b"], "regions": ["本地"]}, {"industries": ["c"], "regions": ["本地"]}]
+    assert INDUSTRY_BATCH.chunks(args, ["a"], 0) == [{"industries": ["a"], "regions": ["本地"]}]
+
+
+def test_expanded_items_line_up_with_server_records():
+    server = _industry_server()
+    request = {"industries": ["tourism", "finance", "it"], "regions": ["本地", "x"], "years": [2020, 2021]}
+    records = server.get_industry_data_batch(**request)["records"]
+    items = INDUSTRY_BATCH.expand(request)
+    assert len(items) == len(records)
+    for item, record in zip(items, records):
+        assert (record["industry"], record["location"], record["year"]) == (item["industry"], item["region"], item["year"])
+
+
+def test_parse_and_merge_records():
+    output = merge_records([{"industry": "it"}])
+    assert json.loads(output) == {"records": [{"industry": "it"}], "count": 1}
+    assert parse_batch_records(output) == [{"industry": "it"}]
+    with pytest.raises(ValueError):
+        parse_batch_records('{"rows": []}')
+
+
+def test_error_records_are_detected():
+    assert has_error_records([{"industry": "it"}, {"industry": "x", "error": "没有数据"}])
+    assert not has_error_records([{"industry": "it"}, "text"])
@@ -0,0 +1,62 @@
+import asyncio
+
+from agent.history import CompactingSession, HistoryCompactor, estimate_tokens, item_tokens, split_turns
+
+
+def _turn(i: int, tool: str = "mcp_call", output: str = "x" * 500) -> list:
+    return [
+        {"role": "user", "content": f"question {i}"},
+        {"type": "function_call", "call_id": f"c{i}", "name": tool, "arguments": "{}"},
+        {"type": "function_call_output", "call_id": f"c{i}", "output": output},
+        {"role": "assistant", "content": f"answer {i}"},
+    ]
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("旅游产业") == 4
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("") == 0
+
+
+def test_split_turns_starts_a_turn_at_each_user_message():
+    items = [{"role": "system", "content": "s"}] + _turn(0) + _turn(1)
+    turns = split_turns(items)
+    assert [len(turn) for turn in turns] == [5, 4]
+
+
+def test_older_turns_are_summarized_and_recent_turns_kept_verbatim():
+    items = _turn(0, tool="load_skill") + _turn(1) + _turn(2)
+    compacted = HistoryCompactor(keep_turns=1, summary_chars=10, token_budget=0).compact(items)
+    assert len(compacted) == len(items)
+    assert compacted[2]["output"].startswith("[技能指南已在之前加载")
+    assert compacted[6]["output"] == "x" * 10 + "…[已压缩，原文 500 字]"
+    assert compacted[8:] == _turn(2)
+
+
+def test_token_budget_drops_whole_oldest_turns_but_keeps_latest():
+    items = _turn(0) + _turn(1) + _turn(2)
+    turn_tokens = sum(item_tokens(item) for item in _turn(2))
+    compacted = HistoryCompactor(keep_turns=3, token_budget=turn_tokens * 2).compact(items)
+    assert compacted == _turn(1) + _turn(2)
+    # 预算小于一轮时仍保留最近一轮，工具调用与输出成对出现
+    assert HistoryCompactor(keep_turns=3, token_budget=1).compact(items) == _turn(2)
+
+
+def test_compacting_session_only_changes_reads():
+    class MemorySession:
+        session_id = "s"
+
+        def __init__(self):
+            self.items = []
+
+        async def get_items(self, limit=None):
+            return list(self.items)
+
+        async def add_items(self, items):
+            self.items.extend(items)
+
+    inner = MemorySession()
+    session = CompactingSession(inner, HistoryCompactor(keep_turns=1, summary_chars=10, token_budget=0))
+    asyncio.run(session.add_items(_turn(0) + _turn(1)))
+    assert inner.items == _turn(0) + _turn(1)
+    assert asyncio.run(session.get_items())[2]["output"].endswith("[已压缩，原文 500 字]")
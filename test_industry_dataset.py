@@ -0,0 +1,92 @@
+import importlib.util
+import math
+import os
+
+import pytest
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_servers", "industry_query")
+
+
+def _dataset_module():
+    spec = importlib.util.spec_from_file_location("industry_dataset", os.path.join(SERVER_DIR, "industry_dataset.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+industry_dataset = _dataset_module()
+
+ROWS = [
+    ("tourism", "本地", 2021, {"annual_output": 120.0}),
+    ("tourism", "本地", 2019, {"annual_output": 100.0}),
+    ("tourism", "本地", 2020, {"annual_output": 110.5}),
+    ("tourism", "east", 2021, {"annual_output": 300.0}),
+    ("tourism", "west", 2021, {"annual_output": 300.0}),
+    ("tourism", "north", 2021, {"annual_output": math.nan}),
+    ("tourism", "south", 2021, {"annual_output": 50.0}),
+    ("finance", "本地", 2021, {"annual_output": 2000.0, "enterprise_count": 12}),
+    # 重复的 (行业, 地区, 年份)：保留最后一行
+    ("tourism", "本地", 2020, {"annual_output": 115.0}),
+]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = str(tmp_path / "stats.icol")
+    industry_dataset.write_dataset(path, iter(ROWS), {"annual_output": "万元"})
+    dataset = industry_dataset.IndustryDataset(path)
+    yield dataset
+    dataset.close()
+
+
+def test_build_load_round_trip(dataset):
+    assert dataset.rows == len(ROWS) - 1
+    assert dataset.industries == ["finance", "tourism"]
+    assert dataset.metrics == ["annual_output", "enterprise_count"]
+    assert dataset.units == {"annual_output": "万元", "enterprise_count": ""}
+    assert dataset.get("finance", "本地", 2021) == {
+        "industry": "finance", "region": "本地", "year": 2021, "annual_output": 2000, "enterprise_count": 12,
+    }
+    assert dataset.get("tourism", "本地", 2019)["annual_output"] == 100
+    # 省略年份时为最新一年；之前的行补齐的新指标为缺失
+    assert dataset.get("tourism", "本地") == {
+        "industry": "tourism", "region": "本地", "year": 2021, "annual_output": 120, "enterprise_count": None,
+    }
+
+
+def test_duplicate_key_keeps_last_value(dataset):
+    assert dataset.years("tourism", "本地") == [2019, 2020, 2021]
+    assert dataset.get("tourism", "本地", 2020)["annual_output"] == 115
+
+
+def test_nan_is_missing_and_skipped_by_top_regions(dataset):
+    assert dataset.get("tourism", "north", 2021)["annual_output"] is None
+    regions = [record["region"] for record in dataset.top_regions("tourism", 2021, limit=10)]
+    assert "north" not in regions
+
+
+def test_range_bounds_are_inclusive(dataset):
+    years = lambda records: [record["year"] for record in records]
+    assert years(dataset.range("tourism", "本地", 2020, 2021)) == [2020, 2021]
+    assert years(dataset.range("tourism", "本地", 2020, 2020)) == [2020]
+    assert years(dataset.range("tourism", "本地", None, 2019)) == [2019]
+    assert years(dataset.range("tourism", "本地", 2018, None)) == [2019, 2020, 2021]
+    assert dataset.range("tourism", "本地", 2022, 2030) == []
+
+
+def test_top_regions_order_and_ties(dataset):
+    records = dataset.top_regions("tourism", 2021, limit=3)
+    # 同值按地区名排序，结果稳定
+    assert [(r["region"], r["annual_output"]) for r in records] == [("east", 300), ("west", 300), ("本地", 120)]
+    assert [r["region"] for r in dataset.top_regions("tourism", 2021, limit=10)] == ["east", "west", "本地", "south"]
+    with pytest.raises(KeyError):
+        dataset.top_regions("tourism", 2021, metric="profit")
+
+
+def test_missing_keys_return_none(dataset):
+    assert dataset.get("energy", "本地") is None
+    assert dataset.get("tourism", "nowhere") is None
+    assert dataset.get("tourism", "本地", 1999) is None
+    assert dataset.get("finance", "east") is None
+    assert dataset.range("energy", "本地") == []
+    assert dataset.top_regions("energy") == []
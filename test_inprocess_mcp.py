@@ -0,0 +1,37 @@
+import asyncio
+import json
+
+from agent.inprocess_mcp import InProcessMCPServer, load_fastmcp_app
+
+
+def test_create_streams_yields_read_write_pair():
+    async def run():
+        server = InProcessMCPServer(name="industry_query", script="mcp_servers/industry_query/server.py")
+        async with server.create_streams() as streams:
+            return len(streams)
+
+    # SDK 的 connect() 按 (read, write[, get_session_id]) 解包
+    assert asyncio.run(run()) in (2, 3)
+
+
+def test_inprocess_server_lists_and_calls_tools():
+    async def run():
+        server = InProcessMCPServer(name="industry_query", script="mcp_servers/industry_query/server.py", cache_tools_list=True)
+        await server.connect()
+        try:
+            tools = {tool.name for tool in await server.list_tools()}
+            result = await server.call_tool("get_industry_data", {"industry": "finance"})
+            return tools, result
+        finally:
+            await server.cleanup()
+
+    tools, result = asyncio.run(run())
+    assert {"get_industry_data", "get_industry_data_batch"} <= tools
+    assert not getattr(result, "is_error", None)
+    record = json.loads(result.content[0].text)
+    assert record["industry"] == "finance"
+
+
+def test_app_is_loaded_once_per_script():
+    script = "mcp_servers/deep_analysis/server.py"
+    assert load_fastmcp_app(script) is load_fastmcp_app(script)
@@ -0,0 +1,39 @@
+from utils.logger import InteractionLogger
+
+
+def test_tail_advances_past_line_longer_than_max_bytes(tmp_path):
+    path = tmp_path / "interactions.log"
+    path.write_bytes(b"x" * 100 + b"\nshort\npartial")
+    logger = InteractionLogger(str(path))
+
+    text, offset = logger.tail(0, max_bytes=40)
+    assert (text, offset) == ("x" * 40 + "\n", 40)
+    text, offset = logger.tail(offset, max_bytes=40)
+    assert offset == 80
+    text, offset = logger.tail(offset, max_bytes=40)
+    assert (text, offset) == ("x" * 20 + "\nshort\n", 107)
+    # 尚未写完的行留到下次读取
+    assert logger.tail(offset, max_bytes=40) == ("", 107)
+
+
+def test_tail_start_skips_to_first_complete_line_near_the_end(tmp_path):
+    path = tmp_path / "interactions.log"
+    path.write_bytes(b"".join(b"line %02d\n" % i for i in range(10)))
+    logger = InteractionLogger(str(path))
+
+    assert logger.tail_start(max_bytes=1000) == 0
+    offset = logger.tail_start(max_bytes=20)
+    assert logger.tail(offset) == ("line 08\nline 09\n", 80)
+
+
+def test_tail_sees_lines_written_by_other_processes(tmp_path):
+    path = tmp_path / "interactions.log"
+    logger = InteractionLogger(str(path), async_mode=False)
+    logger.log_interaction("agent", "user", "hello")
+    text, offset = logger.tail(0)
+    # 另一个进程（如 MCP 服务）追加到同一文件
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("[2026-01-01 00:00:00] [mcp_server -> agent] (info): ready\n")
+    text, offset = logger.tail(offset)
+    assert text == "[2026-01-01 00:00:00] [mcp_server -> agent] (info): ready\n"
+    assert offset == path.stat().st_size
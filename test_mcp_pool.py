@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+from agent.agent import IndustryAgent
+from agent.mcp_pool import MCPConnectionPool
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.records = []
+
+    def log_interaction(self, *args):
+        self.records.append(args)
+
+
+class FakeServer:
+    """每次连接后工具列表可能不同的 MCP 服务器；模拟 SDK 在对象上缓存工具列表的行为。"""
+
+    def __init__(self, tool_sets):
+        self.tool_sets = list(tool_sets)
+        self.connects = 0
+        self._tools = None
+        self.call_error = None
+
+    async def connect(self):
+        self.connects += 1
+
+    def invalidate_tools_cache(self):
+        self._tools = None
+
+    async def list_tools(self):
+        if self._tools is None:
+            self._tools = [SimpleNamespace(name=name) for name in self.tool_sets[min(self.connects, len(self.tool_sets)) - 1]]
+        return self._tools
+
+    async def call_tool(self, tool_name, arguments):
+        raise self.call_error
+
+    async def cleanup(self):
+        pass
+
+
+def _pool(server):
+    return MCPConnectionPool(RecordingLogger(), [{"name": "industry_query"}], lambda config: server, min_backoff=0.01)
+
+
+def test_tool_list_is_refreshed_after_reconnect():
+    server = FakeServer([["get_industry_data"], ["get_industry_data", "get_industry_trend"]])
+
+    async def run():
+        pool = _pool(server)
+        await pool.get("industry_query")
+        before = [tool.name for tool in pool.cached_tools("industry_query")]
+        pool.mark_broken("industry_query", "server restarted")
+        await pool.get("industry_query")
+        after = [tool.name for tool in pool.cached_tools("industry_query")]
+        await pool.close()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before == ["get_industry_data"]
+    assert after == ["get_industry_data", "get_industry_trend"]
+    assert server.connects == 2
+
+
+def _call_with_error(error):
+    server = FakeServer([["get_industry_data"]])
+    server.call_error = error
+
+    async def run():
+        pool = _pool(server)
+        agent = SimpleNamespace(mcp_pool=pool)
+        try:
+            await IndustryAgent._call_pooled_tool(agent, "industry_query", "get_industry_data", {})
+        except Exception as e:
+            raised = e
+        connected = pool.connected_server("industry_query") is not None
+        await pool.close()
+        return raised, connected
+
+    return asyncio.run(run())
+
+
+def test_tool_errors_do_not_break_the_connection():
+    raised, connected = _call_with_error(ValueError("Unknown parameter 'regionn'"))
+    assert isinstance(raised, ValueError)
+    assert connected
+
+
+def test_transport_errors_mark_the_connection_broken():
+    raised, connected = _call_with_error(RuntimeError("Failed to call tool: Connection lost. The server may have disconnected."))
+    assert isinstance(raised, RuntimeError)
+    assert not connected
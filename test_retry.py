@@ -0,0 +1,200 @@
+import asyncio
+import time
+
+import pytest
+
+from agent.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RetryPolicy,
+    call_with_retry,
+    is_transient,
+    request_deadline,
+    retry_after,
+    time_remaining,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int, headers: dict | None = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+def test_is_transient_classification():
+    assert is_transient(StatusError(429))
+    assert is_transient(StatusError(503))
+    assert not is_transient(StatusError(400))
+    assert not is_transient(StatusError(401))
+    assert is_transient(TimeoutError())
+    assert is_transient(ConnectionResetError())
+    assert is_transient(APIConnectionError("boom"))
+    assert is_transient(RuntimeError("upstream returned 502"))
+    assert not is_transient(ValueError("bad argument"))
+    assert not is_transient(CircuitOpenError("openai", 5))
+    assert not is_transient(DeadlineExceeded())
+
+
+def test_retry_after_headers():
+    assert retry_after(StatusError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(StatusError(429, {"retry-after": "3"})) == 3.0
+    assert retry_after(StatusError(429, {"retry-after": "soon"})) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_policy_delay_is_bounded():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=2)
+    for attempt in range(1, 6):
+        assert 0 <= policy.delay(attempt) <= min(2, 0.5 * 2 ** (attempt - 1))
+    assert policy.delay(1, server_hint=10) == 2
+    assert policy.delay(1, server_hint=0.2) == 0.2
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_half_open():
+    breaker = CircuitBreaker("mcp", failure_threshold=2, reset_timeout=0.05)
+    breaker.before_call()
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is True
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    # half_open 只放行一个探测调用
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.stats() == {"state": "closed", "failures": 0, "trips": 1, "rejected": 2}
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker("mcp", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.record_failure() is True
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+
+
+def test_call_with_retry_retries_transient_errors():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise StatusError(503)
+        return "ok"
+
+    retries = []
+    result = asyncio.run(call_with_retry(flaky, RetryPolicy(3, 0.001, 0.001), on_retry=lambda *args: retries.append(args[0])))
+    assert result == "ok"
+    assert retries == [1, 2]
+
+
+def test_call_with_retry_does_not_retry_or_trip_on_client_errors():
+    breaker = CircuitBreaker("openai", failure_threshold=1)
+    calls = []
+
+    async def bad_request():
+        calls.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        asyncio.run(call_with_retry(bad_request, RetryPolicy(3, 0.001, 0.001), breaker))
+    assert len(calls) == 1
+    assert breaker.state == "closed"
+
+
+def test_call_with_retry_trips_breaker_and_rejects_next_call():
+    breaker = CircuitBreaker("openai", failure_threshold=2, reset_timeout=60)
+    trips = []
+
+    async def down():
+        raise StatusError(503)
+
+    with pytest.raises(StatusError):
+        asyncio.run(call_with_retry(down, RetryPolicy(2, 0.001, 0.001), breaker, on_trip=trips.append))
+    assert trips == [breaker]
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_retry(down, RetryPolicy(2, 0.001, 0.001), breaker))
+
+
+def test_call_with_retry_respects_request_deadline():
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def run():
+        with request_deadline(0.05):
+            assert 0 < time_remaining() <= 0.05
+            await call_with_retry(slow, RetryPolicy(3, 0.001, 0.001))
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert time.monotonic() - start < 0.5
+    assert time_remaining() is None
+
+
+def _metered_model(monkeypatch, get_response=None, stream_response=None):
+    from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
+    from openai import AsyncOpenAI
+
+    from agent.agent import MeteredChatCompletionsModel
+
+    if get_response is not None:
+        monkeypatch.setattr(OpenAIChatCompletionsModel, "get_response", get_response)
+    if stream_response is not None:
+        monkeypatch.setattr(OpenAIChatCompletionsModel, "stream_response", stream_response)
+    return MeteredChatCompletionsModel(
+        model="test-model",
+        openai_client=AsyncOpenAI(api_key="test", base_url="http://127.0.0.1:9"),
+        retry_policy=RetryPolicy(3, 0.001, 0.001),
+        breaker=CircuitBreaker("openai", failure_threshold=5),
+    )
+
+
+def test_metered_model_retries_blocking_calls(monkeypatch):
+    calls = []
+
+    async def get_response(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise StatusError(429)
+        return type("Response", (), {"usage": None})()
+
+    model = _metered_model(monkeypatch, get_response=get_response)
+    asyncio.run(model.get_response())
+    assert len(calls) == 2
+
+
+def test_metered_model_retries_stream_only_before_first_event(monkeypatch):
+    attempts = []
+
+    async def stream_response(self, *args, **kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise StatusError(503)
+        yield "first"
+        raise StatusError(503)
+
+    model = _metered_model(monkeypatch, stream_response=stream_response)
+
+    async def consume():
+        events = []
+        with pytest.raises(StatusError):
+            async for event in model.stream_response():
+                events.append(event)
+        return events
+
+    assert asyncio.run(consume()) == ["first"]
+    # 第一次在首个事件前失败被重试；首个事件之后的失败直接抛出，不再重放
+    assert len(attempts) == 2
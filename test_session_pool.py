@@ -0,0 +1,147 @@
+import asyncio
+
+import agent.session_pool as session_pool
+from agent.session_pool import SessionPool, checkpoint, rollback
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.records = []
+
+    def log_interaction(self, *args):
+        self.records.append(args)
+
+
+class PublicOnlySession:
+    """只暴露公开接口的会话，模拟 SDK 内部成员不可用的情况。"""
+
+    def __init__(self, session):
+        self._session = session
+        self.session_id = session.session_id
+
+    async def get_items(self, limit=None):
+        return await self._session.get_items(limit)
+
+    async def pop_item(self):
+        return await self._session.pop_item()
+
+
+def _message(i: int) -> dict:
+    return {"role": "user", "content": f"message {i}"}
+
+
+def test_rollback_removes_only_items_added_after_checkpoint(tmp_path):
+    async def run():
+        pool = SessionPool(str(tmp_path / "sessions.db"))
+        session, other = pool.get("a"), pool.get("b")
+        await session.add_items([_message(0), _message(1)])
+        await other.add_items([_message(9)])
+        point = await checkpoint(session)
+        assert point.last_row_id is not None
+        await session.add_items([_message(2), _message(3), _message(4)])
+        await other.add_items([_message(10)])
+        removed = await rollback(session, point)
+        items = [item["content"] for item in await session.get_items()]
+        others = [item["content"] for item in await other.get_items()]
+        pool.close_all()
+        return removed, items, others
+
+    removed, items, others = asyncio.run(run())
+    assert removed == 3
+    assert items == ["message 0", "message 1"]
+    assert others == ["message 9", "message 10"]
+
+
+def test_rollback_falls_back_to_public_api_and_logs_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_pool, "_fallback_logged", False)
+    logger = RecordingLogger()
+
+    async def run():
+        pool = SessionPool(str(tmp_path / "sessions.db"))
+        session = PublicOnlySession(pool.get("a"))
+        await pool.get("a").add_items([_message(0)])
+        point = await checkpoint(session, logger)
+        assert point.last_row_id is None and point.item_count == 1
+        await pool.get("a").add_items([_message(1), _message(2)])
+        removed = await rollback(session, point, logger)
+        items = await session.get_items()
+        pool.close_all()
+        return removed, items
+
+    removed, items = asyncio.run(run())
+    assert removed == 2
+    assert items == [_message(0)]
+    assert len(logger.records) == 1 and logger.records[0][2] == "warning"
+
+
+def test_pool_evicts_least_recently_used_idle_handle(tmp_path):
+    async def run():
+        pool = SessionPool(str(tmp_path / "sessions.db"), max_sessions=2)
+        async with pool.lease("a"):
+            pool.get("b")
+            pool.get("c")
+            # "a" 正在使用，不会被淘汰
+            assert pool.stats() == {"open": 2, "in_use": 1, "evictions": 1}
+        pool.close_all()
+
+    asyncio.run(run())
+
+
+def test_interleaved_runs_on_one_session_do_not_roll_back_each_other(tmp_path):
+    events = []
+
+    async def run():
+        pool = SessionPool(str(tmp_path / "sessions.db"))
+        await pool.get("a").add_items([_message(0)])
+        a_started = asyncio.Event()
+
+        async def failing_run():
+            async with pool.lease("a") as session:
+                events.append("a:start")
+                point = await checkpoint(session)
+                await session.add_items([_message(1)])
+                a_started.set()
+                # 让出事件循环，另一次运行此时尝试写入同一会话
+                await asyncio.sleep(0.05)
+                await rollback(session, point)
+                events.append("a:rolled_back")
+
+        async def succeeding_run():
+            await a_started.wait()
+            async with pool.lease("a") as session:
+                events.append("b:start")
+                point = await checkpoint(session)
+                await session.add_items([_message(2), _message(3)])
+                assert point.last_row_id is not None
+
+        await asyncio.gather(failing_run(), succeeding_run())
+        items = [item["content"] for item in await pool.get("a").get_items()]
+        stats = pool.stats()
+        pool.close_all()
+        return items, stats, dict(pool._run_locks)
+
+    items, stats, run_locks = asyncio.run(run())
+    assert events == ["a:start", "a:rolled_back", "b:start"]
+    assert items == ["message 0", "message 2", "message 3"]
+    assert stats["in_use"] == 0 and run_locks == {}
+
+
+def test_evicted_sessions_are_reported_to_on_evict(tmp_path, monkeypatch):
+    evicted = []
+    pool = SessionPool(str(tmp_path / "sessions.db"), max_sessions=2, on_evict=evicted.append)
+    pool.get("a")
+    pool.get("b")
+    pool.get("c")
+    assert evicted == ["a"]
+
+    clock = [1000.0]
+    monkeypatch.setattr(session_pool.time, "monotonic", lambda: clock[0])
+    pool.get("c")
+    clock[0] += 10
+    pool.get("b")
+    assert pool.evict_idle(5) == 1
+    assert evicted == ["a", "c"]
+    assert pool.stats() == {"open": 1, "in_use": 0, "evictions": 2}
+    pool.close_all()
+    # 关闭全部句柄不视为淘汰
+    assert evicted == ["a", "c"]
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from agent.agent import IndustryAgent
+from utils.skill_index import SkillIndex
+
+
+def _catalog(n: int) -> str:
+    skills = [
+        f"<skill>\n<name>skill_{i}</name>\n<description>第 {i} 号技能，用于分析市场趋势。</description>\n</skill>"
+        for i in range(n)
+    ]
+    skills.append("<skill>\n<name>economic_analysis</name>\n<description>分析本地产业发展。</description>\n</skill>")
+    return "<available_skills>\n" + "\n".join(skills) + "\n</available_skills>"
+
+
+def test_select_returns_hits_plus_pinned():
+    index = SkillIndex.from_xml(_catalog(20))
+    selected, matched = index.select("skill_7", 3, ["economic_analysis"])
+    assert matched
+    assert selected[0].name == "skill_7"
+    assert selected[-1].name == "economic_analysis"
+    assert len(selected) <= 4
+
+
+def test_select_without_hits_falls_back_to_bounded_defaults():
+    index = SkillIndex.from_xml(_catalog(20))
+    selected, matched = index.select("weather tomorrow", 3, ["economic_analysis", "missing"])
+    assert not matched
+    assert [doc.name for doc in selected] == ["skill_0", "skill_1", "skill_2", "economic_analysis"]
+
+
+def _prompt_for(catalog: str, query: str) -> str:
+    agent = SimpleNamespace(
+        config=SimpleNamespace(SKILL_RETRIEVAL_TOP_K=5),
+        _skill_index=lambda prompt: SkillIndex.from_xml(prompt),
+        skill_registry=SimpleNamespace(workflows=lambda: {"economic_analysis": None}),
+        get_loaded_skills=lambda session_id: ["skill_42"],
+        logger=SimpleNamespace(log_interaction=lambda *args: None),
+    )
+    return IndustryAgent._select_skills_prompt(agent, catalog, query, "s1")
+
+
+def test_unmatched_query_prompt_does_not_grow_with_catalog():
+    small = _prompt_for(_catalog(100), "weather tomorrow")
+    large = _prompt_for(_catalog(5000), "weather tomorrow")
+    # 5 个兜底技能 + 工作流技能 + 会话已加载技能
+    assert small.count("<skill>") == large.count("<skill>") == 7
+    assert abs(len(large) - len(small)) < 100
@@ -0,0 +1,74 @@
+import os
+
+from utils.skill_registry import SkillRegistry
+
+
+class _NullLogger:
+    def log_interaction(self, *args):
+        pass
+
+
+def _write_skill(root, name: str, description: str):
+    os.makedirs(root / name, exist_ok=True)
+    (root / name / "SKILL.md").write_text(f"---\nname: {name}\ndescription: {description}\n---\n# {name}\n", encoding="utf-8")
+
+
+def _registry(root, rescan_interval: float = 0) -> SkillRegistry:
+    return SkillRegistry(str(root), logger=_NullLogger(), rescan_interval=rescan_interval)
+
+
+def test_added_skill_is_picked_up(tmp_path):
+    _write_skill(tmp_path, "alpha", "first")
+    registry = _registry(tmp_path)
+    before = registry.signature()
+    _write_skill(tmp_path, "beta", "second")
+    assert registry.names() == ["alpha", "beta"]
+    assert registry.signature() != before
+
+
+def test_in_place_edit_is_picked_up(tmp_path):
+    _write_skill(tmp_path, "alpha", "first")
+    registry = _registry(tmp_path)
+    before = registry.signature()
+    _write_skill(tmp_path, "alpha", "rewritten description")
+    assert registry.all()[0].description == "rewritten description"
+    assert registry.signature() != before
+
+
+def test_deleted_skill_is_dropped(tmp_path):
+    _write_skill(tmp_path, "alpha", "first")
+    _write_skill(tmp_path, "beta", "second")
+    registry = _registry(tmp_path)
+    before = registry.signature()
+    os.remove(tmp_path / "beta" / "SKILL.md")
+    assert registry.names() == ["alpha"]
+    assert registry.signature() != before
+
+
+def test_unchanged_scan_reuses_entries_and_signature(tmp_path, monkeypatch):
+    _write_skill(tmp_path, "alpha", "first")
+    registry = _registry(tmp_path)
+    signature = registry.signature()
+    entries = registry.all()
+    loads = []
+    original_load = SkillRegistry._load
+    monkeypatch.setattr(SkillRegistry, "_load", lambda self, *args: loads.append(args) or original_load(self, *args))
+    assert registry.signature() is signature
+    assert registry.all() == entries
+    assert loads == []
+
+
+def test_no_filesystem_access_within_rescan_interval(tmp_path, monkeypatch):
+    _write_skill(tmp_path, "alpha", "first")
+    registry = _registry(tmp_path, rescan_interval=60)
+    signature = registry.signature()
+    _write_skill(tmp_path, "beta", "second")
+    stats = []
+    original_stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda *args, **kwargs: stats.append(args) or original_stat(*args, **kwargs))
+    assert registry.signature() is signature
+    assert registry.names() == ["alpha"]
+    assert stats == []
+    monkeypatch.undo()
+    registry.invalidate()
+    assert registry.names() == ["alpha", "beta"]
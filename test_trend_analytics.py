@@ -0,0 +1,80 @@
+import importlib.util
+import math
+import os
+
+import numpy as np
+import pytest
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_servers", "deep_analysis")
+
+
+def _trend_module():
+    spec = importlib.util.spec_from_file_location("trend_analytics", os.path.join(SERVER_DIR, "trend_analytics.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+trend = _trend_module()
+nan = math.nan
+
+
+def _series(*rows, years=(2019, 2020, 2021)):
+    return np.array(rows, dtype=float), np.array(years)
+
+
+def test_growth_cagr_and_volatility_match_hand_computed_values():
+    matrix, years = _series([100, 110, 121], [100, 150, 120])
+    growth = trend.growth_rates(matrix)
+    np.testing.assert_allclose(growth, [[0.1, 0.1], [0.5, -0.2]])
+    np.testing.assert_allclose(trend.cagr(matrix, years), [0.1, math.sqrt(1.2) - 1])
+    # 样本标准差：[0.5, -0.2] 的离差为 ±0.35，sqrt(2 * 0.35² / 1)
+    np.testing.assert_allclose(trend.volatility(growth), [0.0, 0.35 * math.sqrt(2)], atol=1e-12)
+
+
+def test_single_point_has_no_growth_cagr_or_volatility():
+    matrix, years = _series([250], years=(2021,))
+    growth = trend.growth_rates(matrix)
+    assert growth.shape == (1, 0)
+    assert np.isnan(trend.cagr(matrix, years)).all()
+    assert np.isnan(trend.volatility(growth)).all()
+    value, year = trend.latest_values(matrix, years)
+    assert value.tolist() == [250] and year.tolist() == [2021]
+
+
+def test_cagr_is_undefined_for_zero_or_negative_start():
+    matrix, years = _series([0, 50, 100], [-10, 5, 20])
+    assert np.isnan(trend.cagr(matrix, years)).all()
+    growth = trend.growth_rates(matrix)
+    # 上一年为 0 或负数时增长率缺失
+    assert np.isnan(growth[0, 0]) and growth[0, 1] == pytest.approx(1.0)
+    assert np.isnan(growth[1, 0]) and growth[1, 1] == pytest.approx(3.0)
+    assert np.isnan(trend.volatility(growth)).all()
+
+
+def test_gaps_use_first_and_last_observed_years():
+    matrix, years = _series([100, nan, nan, 133.1], [100, 110, nan, 121], [nan, nan, nan, nan], years=(2019, 2020, 2021, 2022))
+    np.testing.assert_allclose(trend.cagr(matrix, years)[:2], [0.1, 1.21 ** (1 / 3) - 1])
+    assert np.isnan(trend.cagr(matrix, years)[2])
+    growth = trend.growth_rates(matrix)
+    # 相邻年份缺失时没有增长率
+    assert np.isnan(growth[0]).all()
+    assert growth[1, 0] == pytest.approx(0.1) and np.isnan(growth[1, 1:]).all()
+    value, year = trend.latest_values(matrix, years)
+    assert value[:2].tolist() == [133.1, 121] and year.tolist() == [2022, 2022, -1]
+
+
+def test_analyze_reports_hand_computed_metrics():
+    records = [
+        {"industry": "tourism", "location": "本地", "year": 2019, "annual_output": 800},
+        {"industry": "tourism", "location": "本地", "year": 2020, "annual_output": 1000},
+        {"industry": "tourism", "location": "本地", "year": 2021, "annual_output": 1250},
+        {"industry": "it", "location": "本地", "year": 2021, "annual_output": 300},
+    ]
+    result = trend.analyze(records, threshold=1000)
+    tourism, it = result["entities"]
+    assert tourism["cagr"] == 0.25 and tourism["yoy_growth"] == 0.25 and tourism["volatility"] == 0.0
+    assert tourism["stage"] == "mature" and tourism["percentile"] == 75.0
+    assert it["cagr"] is None and it["volatility"] is None and it["stage"] == "developing"
+    assert result["years"] == [2019, 2020, 2021]
+    assert result["summary"] == {"count": 2, "mature": 1, "median_latest": 775.0, "median_cagr": 0.25}
@@ -0,0 +1,54 @@
+import json
+
+from agent.answer_cache import EntityExtractor
+from agent.workflow import AliasMatcher, match_intent
+
+WORKFLOW = {
+    "triggers": ["发展"],
+    "intent": {
+        "industry": {
+            "required": True,
+            "aliases": {"旅游": "tourism", "文旅": "tourism", "金融": "finance", "IT": "it", "tourism": "tourism"},
+        },
+    },
+}
+
+
+def test_ascii_alias_matches_only_at_word_boundary():
+    matcher = AliasMatcher({"IT": "it"})
+    assert matcher.values("本地IT行业发展如何？") == {"it"}
+    assert matcher.values("How is IT doing") == {"it"}
+    assert matcher.values("city quality with growth") == set()
+
+
+def test_match_intent_ignores_alias_inside_words():
+    assert match_intent(WORKFLOW, "tourism quality in the city") == (True, {"industry": "tourism"})
+    assert match_intent(WORKFLOW, "本地金融和旅游对比") == (False, {})
+
+
+def test_entity_extractor_shares_alias_matching():
+    extractor = EntityExtractor.from_workflows([WORKFLOW])
+    assert extractor.extract("city quality") == ("cityquality", ())
+    assert extractor.extract("本地it行业")[1] == ("it",)
+
+
+def _economic_workflow() -> dict:
+    with open("skills/economic_analysis/workflow.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_economic_workflow_routes_status_questions():
+    workflow = _economic_workflow()
+    assert match_intent(workflow, "本地的旅游产业发展如何？") == (True, {"industry": "tourism"})
+    assert match_intent(workflow, "本地IT行业发展如何？") == (True, {"industry": "it"})
+    # 没有别名命中但明确在问产业现状，交给模型补全行业
+    assert match_intent(workflow, "本地农业的产业发展如何？") == (True, {})
+
+
+def test_economic_workflow_hands_trend_and_ranking_questions_to_the_model():
+    workflow = _economic_workflow()
+    assert match_intent(workflow, "金融行业历年趋势") == (False, {})
+    assert match_intent(workflow, "旅游产值排名前五的地区") == (False, {})
+    assert match_intent(workflow, "旅游和金融产业发展对比") == (False, {})
+    # 泛泛提到“发展”不再触发工作流，也不会多一次意图抽取调用
+    assert match_intent(workflow, "公司未来发展规划怎么写？") == (False, {})
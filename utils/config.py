@@ -3,15 +3,118 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _parse_float_map(value: str) -> dict:
+    """Parse "a=1,b=2.5" into {"a": 1.0, "b": 2.5}."""
+    result = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, raw = item.split("=", 1)
+            result[key.strip()] = float(raw)
+    return result
+
+
+def _parse_set(value: str) -> set:
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+def _parse_list(value: str, sep: str = "|") -> list:
+    """Parse "a|b" into ["a", "b"], keeping order; "|" since queries may contain commas."""
+    return [item.strip() for item in value.split(sep) if item.strip()]
+
+
 class Config:
     MCP_TOURISM_QUERY_PORT = int(os.getenv("MCP_TOURISM_QUERY_PORT", 8001))
     MCP_DEEP_ANALYSIS_PORT = int(os.getenv("MCP_DEEP_ANALYSIS_PORT", 8002))
     # Note: FastMCP default uses SSE transport for HTTP
-    MCP_TOURISM_QUERY_URL = os.getenv("MCP_TOURISM_QUERY_URL", "http://localhost:8001/sse")
-    MCP_DEEP_ANALYSIS_URL = os.getenv("MCP_DEEP_ANALYSIS_URL", "http://localhost:8002/sse")
+    # 默认连接本机上述端口，只改端口时启动器与 Agent 保持一致；服务部署在别处时再单独设置 URL
+    MCP_TOURISM_QUERY_URL = os.getenv("MCP_TOURISM_QUERY_URL", f"http://localhost:{MCP_TOURISM_QUERY_PORT}/sse")
+    MCP_DEEP_ANALYSIS_URL = os.getenv("MCP_DEEP_ANALYSIS_URL", f"http://localhost:{MCP_DEEP_ANALYSIS_PORT}/sse")
+    # MCP 传输方式：sse 经 HTTP 连接独立进程（可远程部署）；inprocess 在 Agent 进程内经内存流挂载同机的 FastMCP 应用
+    MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse").lower()
+    # 启动 MCP 服务时等待端口就绪的最长秒数
+    MCP_STARTUP_TIMEOUT = float(os.getenv("MCP_STARTUP_TIMEOUT", 10))
+    # MCP 连接池：等待(重)连接完成的最长秒数
+    MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", 10))
+    # 健康探测：MCP ping 间隔与超时(秒)、保留的延迟历史条数；离线时 mcp_call 是否立即失败
+    HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 5))
+    HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", 2))
+    HEALTH_HISTORY_SIZE = int(os.getenv("HEALTH_HISTORY_SIZE", 60))
+    MCP_FAIL_FAST = os.getenv("MCP_FAIL_FAST", "true").lower() == "true"
+    # 重试与熔断：单次查询的整体时限(秒)、每次模型/MCP 调用的最大尝试次数与退避区间(秒)，
+    # 以及后端（模型端点、每个 MCP 服务器）连续失败多少次后熔断、熔断持续秒数
+    REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", 120))
+    RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 3))
+    RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 0.5))
+    RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 8))
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+    BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", 30))
+    # mcp_call 结果缓存：默认 TTL(秒)、LRU 容量、按工具覆盖的 TTL 以及不缓存的工具。
+    # 注意：未配置 INDUSTRY_DATASET 时 get_industry_data 返回随机产值，缓存期间同一查询会得到相同的值；
+    # 需要每次取新值时设置 MCP_CACHE_EXCLUDE=get_industry_data（回答缓存随之对这类回答失效）
+    MCP_CACHE_ENABLED = os.getenv("MCP_CACHE_ENABLED", "true").lower() == "true"
+    MCP_CACHE_MAX_ENTRIES = int(os.getenv("MCP_CACHE_MAX_ENTRIES", 256))
+    MCP_CACHE_DEFAULT_TTL = float(os.getenv("MCP_CACHE_DEFAULT_TTL", 60))
+    MCP_CACHE_TOOL_TTLS = _parse_float_map(os.getenv("MCP_CACHE_TOOL_TTLS", "get_industry_data=60,deep_analysis=300"))
+    MCP_CACHE_EXCLUDE = _parse_set(os.getenv("MCP_CACHE_EXCLUDE", ""))
+    # 查询级回答缓存：规范化后相同的问题在 TTL(秒) 内直接返回上次的回答（不超过所用工具的缓存 TTL）
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 60))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 256))
+    # 启动预热（后台执行，不阻塞界面）：建立模型与 MCP 连接、预加载技能；
+    # WARMUP_QUERIES 以 | 分隔，预先回答这些固定问题并写入回答缓存（会消耗模型 token）。
+    # 预先回答只保留 ANSWER_CACHE_TTL 秒（默认 60，且不超过所用工具的缓存 TTL），不会定期刷新；
+    # 希望部署后更长时间内命中时需同时调大这两个 TTL
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_QUERIES = _parse_list(os.getenv("WARMUP_QUERIES", ""))
+    WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", 60))
+    # 批量工具：单个批量请求最多包含的行业数，超出时分片并发请求
+    MCP_BATCH_MAX_SIZE = int(os.getenv("MCP_BATCH_MAX_SIZE", 10))
     
+    # 投机执行（默认关闭）：工具返回后按技能工作流预测并提前发起后续调用，未被取用的结果保留秒数与并发上限
+    SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "false").lower() == "true"
+    SPECULATION_TTL = float(os.getenv("SPECULATION_TTL", 30))
+    SPECULATION_MAX_PENDING = int(os.getenv("SPECULATION_MAX_PENDING", 8))
+
+    # 聊天界面是否流式显示工具进度与回答文本
+    STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+
+    # 技能声明了 workflow.json 时直接执行工具链，模型仅用于意图补全和撰写报告
+    WORKFLOW_ENABLED = os.getenv("WORKFLOW_ENABLED", "true").lower() == "true"
+
+    # 会话池：同时保持打开的 SQLiteSession 句柄上限
+    SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", 128))
+    # 空闲超过该秒数的会话句柄由运行时定期关闭(0 为只在超出上限时淘汰)
+    SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", 1800))
+    # 历史压缩：原样保留的最近轮数、更早工具输出的摘要长度、每次请求的历史 token 预算(0 为不限)
+    HISTORY_COMPACTION_ENABLED = os.getenv("HISTORY_COMPACTION_ENABLED", "true").lower() == "true"
+    HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", 3))
+    HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", 200))
+    HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 6000))
+
+    # 指标导出：Prometheus 文本格式的 /metrics 端口(0 为关闭)，以及可选的定期写入文件
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_FILE = os.getenv("METRICS_FILE", "")
+    METRICS_FILE_INTERVAL = float(os.getenv("METRICS_FILE_INTERVAL", 15))
+
     LOG_PATH = os.getenv("LOG_PATH", "logs/interactions.log")
+    # 日志后台批量写入：队列容量、批大小、刷新间隔(秒)、轮转大小(字节)与队列满时的策略(drop/block)
+    LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 200))
+    LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 0.2))
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 3))
+    LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop")
+    # 实时日志面板单次渲染的最大行数
+    LOG_VIEWER_MAX_LINES = int(os.getenv("LOG_VIEWER_MAX_LINES", 300))
     SKILLS_PATH = os.getenv("SKILLS_PATH", "skills")
+    # 技能注册表最多每隔这么多秒 stat 一遍技能目录，发现新增、删除或修改的技能
+    SKILLS_RESCAN_INTERVAL = float(os.getenv("SKILLS_RESCAN_INTERVAL", 2))
+    # 技能检索：按问题用 BM25 挑选注入提示词的技能数量，技能总数不超过该值时全部注入
+    SKILL_RETRIEVAL_ENABLED = os.getenv("SKILL_RETRIEVAL_ENABLED", "true").lower() == "true"
+    SKILL_RETRIEVAL_TOP_K = int(os.getenv("SKILL_RETRIEVAL_TOP_K", 5))
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
     MODEL_NAME = os.getenv("MODEL_NAME")
@@ -1,14 +1,162 @@
 import os
 import datetime
 import json
+import atexit
+import queue
+import threading
+import time
+
+from utils.config import Config
+
+
+class _BackgroundLogWriter:
+    """Process-wide batched writer for one log file.
+
+    Records are put on a bounded queue and a daemon thread appends them in
+    batches, flushing when `batch_size` records are pending or every
+    `flush_interval` seconds. The file is rotated once it exceeds `max_bytes`.
+    When the queue is full, `overflow_policy` decides whether to drop the new
+    record ("drop") or block the caller for up to `block_timeout` seconds
+    ("block") before dropping it.
+    """
+
+    def __init__(self, log_path: str, queue_size: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 0.2, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 3, overflow_policy: str = "drop", block_timeout: float = 0.05):
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{os.path.basename(log_path)}", daemon=True)
+        self._thread.start()
+
+    def submit(self, line: str):
+        try:
+            if self.overflow_policy == "block":
+                self._queue.put(line, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(line)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+
+    def flush(self, timeout: float = 5.0):
+        """Block until every queued record has been written (or timeout)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "rotations": self.rotations,
+                "errors": self.errors,
+            }
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch: list):
+        try:
+            self._maybe_rotate()
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("".join(batch))
+            with self._stats_lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+            print(f"Failed to write log: {e}")
+
+    def _maybe_rotate(self):
+        if self.max_bytes <= 0:
+            return
+        try:
+            if os.path.getsize(self.log_path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.log_path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.log_path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        else:
+            os.remove(self.log_path)
+        with self._stats_lock:
+            self.rotations += 1
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def _get_writer(log_path: str) -> _BackgroundLogWriter:
+    key = os.path.abspath(log_path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            config = Config()
+            writer = _writers[key] = _BackgroundLogWriter(
+                log_path,
+                queue_size=config.LOG_QUEUE_SIZE,
+                batch_size=config.LOG_BATCH_SIZE,
+                flush_interval=config.LOG_FLUSH_INTERVAL,
+                max_bytes=config.LOG_MAX_BYTES,
+                backup_count=config.LOG_BACKUP_COUNT,
+                overflow_policy=config.LOG_OVERFLOW_POLICY,
+            )
+        return writer
+
+
+@atexit.register
+def _flush_all_writers():
+    for writer in list(_writers.values()):
+        writer.flush(timeout=2.0)
+
 
 class InteractionLogger:
     _last_log_entry = None
     _last_log_time = None
+    _dedup_lock = threading.Lock()
 
-    def __init__(self, log_path: str = "logs/interactions.log"):
+    def __init__(self, log_path: str = "logs/interactions.log", async_mode: bool = None):
         self.log_path = log_path
         self._ensure_log_dir()
+        if async_mode is None:
+            async_mode = Config().LOG_ASYNC
+        self._writer = _get_writer(log_path) if async_mode else None
 
     def _ensure_log_dir(self):
         log_dir = os.path.dirname(self.log_path)
@@ -22,29 +170,95 @@ class InteractionLogger:
         """
         now = datetime.datetime.now()
         timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
-        
+
         clean_content = str(content).strip()
-        
+
         # Construct the log content (excluding timestamp for deduplication check)
         log_content_signature = f"[{sender} -> {receiver}] ({msg_type}): {clean_content}"
-        
-        # Enhanced Deduplication logic: 
+
+        # Enhanced Deduplication logic:
         # 1. If the content is identical to the last log entry (regardless of time), skip it.
         # This prevents the exact same initialization sequence from flooding the logs.
-        if InteractionLogger._last_log_entry == log_content_signature:
-            return
+        with InteractionLogger._dedup_lock:
+            if InteractionLogger._last_log_entry == log_content_signature:
+                return
+
+            InteractionLogger._last_log_entry = log_content_signature
+            InteractionLogger._last_log_time = now
 
-        InteractionLogger._last_log_entry = log_content_signature
-        InteractionLogger._last_log_time = now
-        
         log_entry = f"[{timestamp}] {log_content_signature}\n"
-        
+
+        # Background mode: hand off to the writer thread, never touch the disk here
+        if self._writer is not None:
+            self._writer.submit(log_entry)
+            return
+
         try:
             with open(self.log_path, "a", encoding="utf-8") as f:
                 f.write(log_entry)
         except Exception as e:
             print(f"Failed to write log: {e}")
 
+    def flush(self, timeout: float = 5.0):
+        """Waits until all queued records are on disk (no-op in synchronous mode)."""
+        if self._writer is not None:
+            self._writer.flush(timeout)
+
+    def writer_stats(self) -> dict:
+        """Queue/written/dropped counters of the background writer ({} in synchronous mode)."""
+        return self._writer.stats() if self._writer is not None else {}
+
+    def tail_start(self, max_bytes: int = 256 * 1024) -> int:
+        """Offset of the first complete line within the last `max_bytes` of the log file.
+
+        Viewers start tailing here so the first render shows recent lines
+        without reading the whole file.
+        """
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+        if size <= max_bytes:
+            return 0
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(size - max_bytes)
+                f.readline()
+                return f.tell()
+        except OSError:
+            return 0
+
+    def tail(self, offset: int = 0, max_bytes: int = 256 * 1024) -> tuple:
+        """Reads complete lines appended to the log file after byte `offset`.
+
+        Returns (text, new_offset). If the file was truncated or rotated the
+        read restarts from the beginning of the current file. At most
+        `max_bytes` are read per call; callers simply call again with the
+        returned offset.
+        """
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            return "", 0
+        if offset > size:
+            offset = 0
+        if offset == size:
+            return "", offset
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read(max_bytes)
+        except Exception as e:
+            return f"Error reading logs: {e}", offset
+        # Only hand out complete lines; a partially written line is picked up next call
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            if len(chunk) < max_bytes:
+                return "", offset
+            # A single line longer than max_bytes: hand out the truncated piece and move on
+            return chunk.decode("utf-8", errors="replace") + "\n", offset + len(chunk)
+        return chunk[:end].decode("utf-8", errors="replace"), offset + end
+
     def read_logs(self):
         """Reads the entire log file."""
         if not os.path.exists(self.log_path):
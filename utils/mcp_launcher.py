@@ -0,0 +1,79 @@
+import os
+import socket
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass
+
+
+@dataclass
+class MCPServerSpec:
+    name: str
+    label: str
+    port: int
+    # Script path relative to the working directory
+    script: str
+    # Environment variable the server reads its port from
+    port_env: str
+
+
+def is_port_open(port: int, host: str = "127.0.0.1", timeout: float = 0.05) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        return s.connect_ex((host, port)) == 0
+
+
+def launch_mcp_servers(specs: list[MCPServerSpec], python_exec: str, cwd: str, log_path: str) -> dict[str, subprocess.Popen | None]:
+    """Start every server whose port is not already listening, without waiting.
+
+    Returns ``{name: process}``; servers that were already running map to None.
+    All processes are spawned back to back so their start-up overlaps.
+    """
+    launched: dict[str, subprocess.Popen | None] = {}
+    with open(log_path, "a") as log_file:
+        for spec in specs:
+            if is_port_open(spec.port):
+                launched[spec.name] = None
+                continue
+            log_file.write(f"\n--- Starting {spec.label} Server on port {spec.port} at {uuid.uuid4()} ---\n")
+            log_file.flush()
+            launched[spec.name] = subprocess.Popen(
+                [python_exec, os.path.join(cwd, spec.script)],
+                stdout=log_file,
+                stderr=log_file,
+                cwd=cwd,
+                env={**os.environ, spec.port_env: str(spec.port)},
+            )
+    return launched
+
+
+def wait_until_ready(ports: dict[str, int], processes: dict[str, subprocess.Popen | None] | None = None,
+                     timeout: float = 10.0, min_delay: float = 0.02, max_delay: float = 0.25) -> dict[str, str]:
+    """Poll all ports together with a short exponential backoff until each accepts connections.
+
+    Returns ``{name: "ready" | "exited" | "timeout"}``. A process that exits early is
+    reported immediately instead of waiting out the timeout.
+    """
+    processes = processes or {}
+    pending = dict(ports)
+    result: dict[str, str] = {}
+    deadline = time.monotonic() + timeout
+    delay = min_delay
+    while pending:
+        for name, port in list(pending.items()):
+            process = processes.get(name)
+            if is_port_open(port):
+                result[name] = "ready"
+            elif process is not None and process.poll() is not None:
+                result[name] = "exited"
+            else:
+                continue
+            del pending[name]
+        if not pending:
+            break
+        if time.monotonic() >= deadline:
+            result.update({name: "timeout" for name in pending})
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+    return result
@@ -0,0 +1,98 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+_SKILL_RE = re.compile(r"<skill>.*?</skill>", re.S)
+_TAG_RE = {tag: re.compile(rf"<{tag}>(.*?)</{tag}>", re.S) for tag in ("name", "description")}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CJK_RUN_RE = re.compile(r"[\u3400-\u9fff]+")
+
+
+@dataclass
+class SkillDoc:
+    name: str
+    description: str
+    # 原始的 ``<skill>...</skill>`` 块，被选中时原样注入提示词
+    xml: str
+
+
+def parse_skills_xml(skills_xml: str) -> list[SkillDoc]:
+    """从 ``<available_skills>`` 技能目录中提取每个 ``<skill>`` 块。"""
+    docs = []
+    for block in _SKILL_RE.findall(skills_xml):
+        fields = {tag: (m.group(1).strip() if (m := regex.search(block)) else "") for tag, regex in _TAG_RE.items()}
+        docs.append(SkillDoc(name=fields["name"], description=fields["description"], xml=block))
+    return docs
+
+
+def tokenize(text: str) -> list[str]:
+    """分词：小写的 ASCII 单词加中文字符二元组（单个汉字的片段保留单字）。
+
+    ``local_skill_5859`` 这样的技能名会拆成 ``local``/``skill``/``5859``。
+    """
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class SkillIndex:
+    """基于技能名称和描述的 BM25 索引。
+
+    按词保存倒排表，检索只访问与问题有共同词的技能，技能目录增长到上千个时依然很快。
+    名称按两倍权重计入，直接提到技能名时排在仅描述重合的技能之前。
+    """
+
+    def __init__(self, docs: list[SkillDoc], k1: float = 1.5, b: float = 0.75):
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.by_name = {doc.name: doc for doc in docs}
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths: list[int] = []
+        for doc_id, doc in enumerate(docs):
+            terms = tokenize(doc.name) * 2 + tokenize(doc.description)
+            self._lengths.append(len(terms))
+            for term, freq in Counter(terms).items():
+                self._postings.setdefault(term, []).append((doc_id, freq))
+        self._avg_length = sum(self._lengths) / len(docs) if docs else 0.0
+
+    @classmethod
+    def from_xml(cls, skills_xml: str) -> "SkillIndex":
+        return cls(parse_skills_xml(skills_xml))
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int) -> list[tuple[SkillDoc, float]]:
+        """得分为正的前 ``k`` 个技能，按得分从高到低排列。"""
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf(term)
+            for doc_id, freq in self._postings.get(term, ()):
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.docs[doc_id], score) for doc_id, score in ranked]
+
+    def select(self, query: str, k: int, pinned: list[str] = ()) -> tuple[list[SkillDoc], bool]:
+        """挑选注入提示词的技能，返回 (技能列表, 检索是否命中)。
+
+        检索到的 top-k 技能之后追加 `pinned` 中的技能（工作流技能、会话已加载技能）；
+        没有任何命中时用目录中的前 k 个技能兜底，结果数量始终不超过 k + len(pinned)。
+        """
+        selected = [doc for doc, _ in self.search(query, k)]
+        matched = bool(selected)
+        if not matched:
+            selected = self.docs[:k]
+        for name in pinned:
+            doc = self.by_name.get(name)
+            if doc is not None and doc not in selected:
+                selected.append(doc)
+        return selected, matched
@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+
+from utils.config import Config
+from utils.logger import InteractionLogger
+
+
+@dataclass
+class SkillEntry:
+    name: str
+    description: str
+    content: str
+    body: str
+    path: str
+    mtime_ns: int
+    size: int
+    metadata: dict = field(default_factory=dict)
+    # 可选的机器可读工具链，来自 ``skills/<name>/workflow.json``
+    workflow: dict | None = None
+    workflow_mtime_ns: int | None = None
+
+
+def parse_skill_markdown(dir_name: str, content: str) -> tuple[dict, str, str, str]:
+    """把 SKILL.md 拆成 (frontmatter, name, description, body)。
+
+    没有 frontmatter 的技能（如自动生成的 ``local_skill_*``）以目录名作为名称，
+    以第一个非标题段落作为描述。
+    """
+    metadata = {}
+    body = content
+    if content.startswith("---"):
+        end = content.find("\n---", 3)
+        if end != -1:
+            for line in content[3:end].splitlines():
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    metadata[key.strip()] = value.strip()
+            body = content[end + 4:].lstrip("\n")
+
+    name = metadata.get("name") or dir_name
+    description = metadata.get("description", "")
+    if not description:
+        for paragraph in body.split("\n\n"):
+            paragraph = paragraph.strip()
+            if paragraph and not paragraph.startswith("#"):
+                description = paragraph
+                break
+    return metadata, name, description, body
+
+
+class SkillRegistry:
+    """``skills/<name>/SKILL.md`` 与 ``AGENTS.md`` 的内存索引。
+
+    查询路径上的 all()/workflows()/signature() 只读内存；距上次检查超过 ``rescan_interval`` 秒时
+    才 stat 一遍技能目录、每个 SKILL.md/workflow.json 和 AGENTS.md，发现新增、删除或原地修改
+    才重新读取对应条目并作废版本戳。get() 单个技能时仍按需 stat，保证加载到的是最新内容。
+    """
+
+    def __init__(self, skills_path: str, logger: InteractionLogger | None = None, rescan_interval: float | None = None):
+        self.skills_path = skills_path
+        config = Config()
+        self.logger = logger or InteractionLogger(config.LOG_PATH)
+        self.rescan_interval = config.SKILLS_RESCAN_INTERVAL if rescan_interval is None else rescan_interval
+        self._entries: dict[str, SkillEntry] = {}
+        self._agents_md: tuple[int, int, str, list[str]] | None = None
+        self._checked_at: float | None = None
+        self._signature: tuple | None = None
+        self._lock = threading.RLock()
+
+    def _skill_file(self, name: str) -> str:
+        return os.path.join(self.skills_path, name, "SKILL.md")
+
+    def _workflow_file(self, name: str) -> str:
+        return os.path.join(self.skills_path, name, "workflow.json")
+
+    def _workflow_mtime_ns(self, name: str) -> int | None:
+        try:
+            return os.stat(self._workflow_file(name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _is_fresh(self, entry: SkillEntry | None, stat: os.stat_result, name: str) -> bool:
+        return (
+            entry is not None
+            and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size)
+            and entry.workflow_mtime_ns == self._workflow_mtime_ns(name)
+        )
+
+    def _load(self, name: str, stat: os.stat_result) -> SkillEntry:
+        path = self._skill_file(name)
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        metadata, skill_name, description, body = parse_skill_markdown(name, content)
+
+        workflow = None
+        workflow_mtime_ns = self._workflow_mtime_ns(name)
+        if workflow_mtime_ns is not None:
+            try:
+                with open(self._workflow_file(name), "r", encoding="utf-8") as f:
+                    workflow = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.log_interaction("system", "skill_registry", "warning",
+                                            f"技能 {name} 的 workflow.json 无效，已忽略: {e}")
+        # 任何条目重新读取都意味着技能内容变了
+        self._signature = None
+        return SkillEntry(
+            name=skill_name,
+            description=description,
+            content=content,
+            body=body,
+            path=path,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            metadata=metadata,
+            workflow=workflow,
+            workflow_mtime_ns=workflow_mtime_ns,
+        )
+
+    def _refresh(self):
+        """距上次检查不足 ``rescan_interval`` 秒时直接返回，否则检查整个目录是否有变化。"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.rescan_interval:
+            return
+        self._checked_at = now
+        self._rescan()
+        self._read_agents_md()
+
+    def _rescan(self):
+        seen = set()
+        try:
+            with os.scandir(self.skills_path) as it:
+                for dir_entry in it:
+                    if not dir_entry.is_dir():
+                        continue
+                    try:
+                        stat = os.stat(self._skill_file(dir_entry.name))
+                    except FileNotFoundError:
+                        continue
+                    seen.add(dir_entry.name)
+                    if not self._is_fresh(self._entries.get(dir_entry.name), stat, dir_entry.name):
+                        self._entries[dir_entry.name] = self._load(dir_entry.name, stat)
+        except FileNotFoundError:
+            pass
+        for name in set(self._entries) - seen:
+            del self._entries[name]
+            self._signature = None
+
+    def invalidate(self):
+        """让下一次访问立即重新检查目录（程序自身写入技能文件后调用）。"""
+        with self._lock:
+            self._checked_at = None
+
+    def get(self, name: str) -> SkillEntry | None:
+        """返回技能条目；仅当 SKILL.md 在磁盘上发生变化时才重新读取。"""
+        with self._lock:
+            try:
+                stat = os.stat(self._skill_file(name))
+            except (FileNotFoundError, NotADirectoryError):
+                if self._entries.pop(name, None) is not None:
+                    self._signature = None
+                return None
+            cached = self._entries.get(name)
+            if self._is_fresh(cached, stat, name):
+                return cached
+            entry = self._load(name, stat)
+            self._entries[name] = entry
+            return entry
+
+    def all(self) -> list[SkillEntry]:
+        with self._lock:
+            self._refresh()
+            return [self._entries[name] for name in sorted(self._entries)]
+
+    def workflows(self) -> dict[str, SkillEntry]:
+        """声明了工作流的技能，按目录名索引。"""
+        with self._lock:
+            self._refresh()
+            return {name: entry for name, entry in self._entries.items() if entry.workflow}
+
+    def names(self) -> list[str]:
+        return [entry.name for entry in self.all()]
+
+    def signature(self) -> tuple:
+        """任一 SKILL.md、workflow.json 或 AGENTS.md 变化时都会改变的版本戳。
+
+        只在检查到变化后重新计算一次，平时直接返回缓存值；用作依赖技能内容的缓存的键。
+        """
+        with self._lock:
+            self._refresh()
+            if self._signature is None:
+                stamps = tuple(
+                    (name, entry.mtime_ns, entry.size, entry.workflow_mtime_ns)
+                    for name, entry in sorted(self._entries.items())
+                )
+                self._signature = stamps, self._agents_md[:2] if self._agents_md else None
+            return self._signature
+
+    def _read_agents_md(self) -> tuple[str, list[str]]:
+        path = os.path.join(self.skills_path, "AGENTS.md")
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if self._agents_md is not None:
+                self._agents_md = None
+                self._signature = None
+            return "", []
+        if self._agents_md and self._agents_md[:2] == (stat.st_mtime_ns, stat.st_size):
+            return self._agents_md[2], self._agents_md[3]
+
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        start_tag, end_tag = "<available_skills>", "</available_skills>"
+        start_index = content.find(start_tag)
+        end_index = content.find(end_tag)
+        skills_xml = ""
+        if start_index != -1 and end_index != -1:
+            skills_xml = content[start_index + len(start_tag):end_index].strip()
+        names = re.findall(r"<name>(.*?)</name>", content)
+        self._agents_md = (stat.st_mtime_ns, stat.st_size, skills_xml, names)
+        self._signature = None
+        return skills_xml, names
+
+    def _agents_md_cached(self) -> tuple[str, list[str]]:
+        self._refresh()
+        return (self._agents_md[2], self._agents_md[3]) if self._agents_md else ("", [])
+
+    def agents_md_skills_xml(self) -> str:
+        """AGENTS.md 中 ``<available_skills>`` 块的内容（不存在时为 ""）。"""
+        with self._lock:
+            return self._agents_md_cached()[0]
+
+    def agents_md_skill_names(self) -> list[str]:
+        with self._lock:
+            return self._agents_md_cached()[1]
+
+
+_registries: dict[str, SkillRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_skill_registry(skills_path: str) -> SkillRegistry:
+    """每个技能目录对应一个进程级共享的注册表。"""
+    key = os.path.abspath(skills_path)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = SkillRegistry(skills_path)
+        return registry